@@ -0,0 +1,252 @@
+"""
+End-to-end benchmark against a local FakeBilibiliServer,
+metadata resolution of each video type, parsing of a large season response,
+and throughput of downloading large streams
+
+Each case runs in a fresh process, so that peak RSS is its own.
+Results are saved as JSON by --save, and compared with a saved baseline by --compare,
+which exits with 1 when any metric regresses beyond --tolerance
+
+python -m benchmarks.bench_e2e [--cases meta_video download ...] [--repeat 200] [--episodes 500]
+                               [--media-mb 256] [--downloads 3]
+                               [--save BASELINE.json] [--compare BASELINE.json] [--tolerance 0.2]
+"""
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import importlib.metadata
+import json
+import math
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from bilidownload.proxy import (
+    AsyncProxyService,
+    GetBangumiDetailLiteResponse,
+    GetBangumiDetailResponse,
+    ProxyService
+)
+from bilidownload.testing import build_payload, FakeBilibiliServer
+from bilidownload.video import VideoService
+from bilidownload.video.constants import VideoQualityNumber, VideoType
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+
+WORK_URLS = {
+    VideoType.VIDEO: 'https://www.bilibili.com/video/BV1xx411c7mD',
+    VideoType.BANGUMI: 'https://www.bilibili.com/bangumi/play/ss1',
+    VideoType.CHEESE: 'https://www.bilibili.com/cheese/play/ss1'
+}
+HIGHER_IS_BETTER = ('ops_per_sec', 'mb_per_sec')
+LOWER_IS_BETTER = ('p50_ms', 'p99_ms', 'peak_rss_mb')
+MB = 1024 * 1024
+
+
+def get_peak_rss() -> Optional[float]:
+    """
+    peak resident set size of this process in MiB, None when unknown
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB elsewhere
+    return peak / MB if sys.platform == 'darwin' else peak / 1024
+
+
+def get_percentile(timings: List[float], percent: float) -> float:
+    """
+    nearest-rank percentile of sorted timings
+    """
+    index = max(0, math.ceil(percent / 100 * len(timings)) - 1)
+    return timings[index]
+
+
+def summarize(timings: List[float], size: int = 0) -> Dict[str, float]:
+    timings = sorted(timings)
+    total = sum(timings)
+    summary = {
+        'ops_per_sec': len(timings) / total,
+        'p50_ms': get_percentile(timings, 50) * 1000,
+        'p99_ms': get_percentile(timings, 99) * 1000
+    }
+    if size:
+        summary['mb_per_sec'] = size / MB / total
+    return summary
+
+
+def measure(func: Callable[[], Any], repeat: int) -> List[float]:
+    func()  # warm up
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+@contextmanager
+def serve(**kwargs: Any) -> Iterator[FakeBilibiliServer]:
+    with FakeBilibiliServer(**kwargs) as server:
+        ProxyService.disable_rate_limiter()
+        ProxyService.configure_session_pool(adapter_factory=server.create_adapter)
+        AsyncProxyService.configure(transport_factory=server.create_async_transport)
+        yield server
+
+
+def bench_meta(video_type: VideoType, args: argparse.Namespace) -> Dict[str, float]:
+    with serve(episodes=args.episodes):
+        timings = measure(lambda: VideoService.get_video_meta(WORK_URLS[video_type]), args.repeat)
+    return summarize(timings)
+
+
+def bench_parse_season(args: argparse.Namespace, lite: bool = False) -> Dict[str, float]:
+    payload = build_payload(GetBangumiDetailResponse, {'episodes': args.episodes, 'section': 1})
+    content = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    model = GetBangumiDetailLiteResponse if lite else GetBangumiDetailResponse
+    timings = measure(lambda: model.model_validate_json(content), args.repeat)
+    return summarize(timings)
+
+
+def get_download_kwargs() -> Dict[str, Any]:
+    meta = VideoService.get_video_meta(WORK_URLS[VideoType.VIDEO])
+    page = meta.work_pages[0]
+    return {
+        'video_type_name': page.video_type,
+        'cid': page.cid,
+        'bvid': page.bvid,
+        'aid': page.aid,
+        'qn': VideoQualityNumber.P1080.value,
+        'title': 'bench'
+    }
+
+
+def get_directory_size(path: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(path))
+
+
+def bench_download(args: argparse.Namespace, is_async: bool = False) -> Dict[str, float]:
+    timings: List[float] = []
+    size = 0
+    with serve(media_size=args.media_mb * MB), tempfile.TemporaryDirectory() as location_path:
+        kwargs = get_download_kwargs()
+        for _ in range(args.downloads):
+            start = time.perf_counter()
+            if is_async:
+                asyncio.run(VideoService.download_data_async(location_path, **kwargs))
+            else:
+                VideoService.download_data(location_path, **kwargs)
+            timings.append(time.perf_counter() - start)
+            size += get_directory_size(location_path)
+    return summarize(timings, size)
+
+
+CASES: Dict[str, Callable[[argparse.Namespace], Dict[str, float]]] = {
+    **{
+        f'meta_{video_type.value}': lambda args, video_type=video_type: bench_meta(video_type, args)
+        for video_type in VideoType
+    },
+    'parse_season': bench_parse_season,
+    'parse_season_lite': lambda args: bench_parse_season(args, lite=True),
+    'download': bench_download,
+    'download_async': lambda args: bench_download(args, is_async=True)
+}
+
+
+def run_case(name: str, args: argparse.Namespace) -> Dict[str, float]:
+    result = CASES[name](args)
+    peak_rss = get_peak_rss()
+    if peak_rss is not None:
+        result['peak_rss_mb'] = peak_rss
+    return result
+
+
+def run_isolated(name: str, args: argparse.Namespace) -> Dict[str, float]:
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_case, name, args).result()
+
+
+def get_version() -> str:
+    try:
+        return importlib.metadata.version('bilidownload')
+    except importlib.metadata.PackageNotFoundError:
+        return 'unknown'
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float
+) -> List[str]:
+    """
+    descriptions of metrics worse than baseline by more than tolerance
+    """
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            expected = baseline.get(name, {}).get(metric)
+            if not expected:
+                continue
+            if metric in HIGHER_IS_BETTER and value < expected * (1 - tolerance) or \
+                    metric in LOWER_IS_BETTER and value > expected * (1 + tolerance):
+                regressions.append(f'{name}.{metric}: {expected:.2f} -> {value:.2f}')
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--repeat', type=int, default=200, help='calls of each meta and parse case')
+    parser.add_argument('--episodes', type=int, default=500, help='pages or episodes of each work')
+    parser.add_argument('--media-mb', type=int, default=256, help='MiB of each video and audio stream')
+    parser.add_argument('--downloads', type=int, default=3, help='downloads of each download case')
+    parser.add_argument('--save', help='path to save results as a baseline')
+    parser.add_argument('--compare', help='path of a baseline to compare results with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='relative change regarded as regression')
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, float]] = {}
+    print(f'{"case":<20}{"ops/s":>10}{"p50 ms":>10}{"p99 ms":>10}{"MB/s":>10}{"RSS MiB":>10}')
+    for name in args.cases:
+        result = results[name] = run_isolated(name, args)
+        columns = [result.get(key) for key in ('ops_per_sec', 'p50_ms', 'p99_ms', 'mb_per_sec', 'peak_rss_mb')]
+        print(f'{name:<20}' + ''.join(f'{value:>10.2f}' if value is not None else f'{"-":>10}' for value in columns))
+
+    if args.save:
+        report = {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'version': get_version(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'params': {
+                key: value for key, value in vars(args).items()
+                if key in ('repeat', 'episodes', 'media_mb', 'downloads')
+            },
+            'results': results
+        }
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Micro-benchmark on the write path of stream downloads,
+the legacy iter_content loop of UNIT_CHUNK bytes against adaptive blocks
+read into one reusable buffer, in throughput and client CPU time per GiB
+
+FakeBilibiliServer runs in another process, so CPU time is of the client alone
+
+python -m benchmarks.bench_io [--media-mb 512] [--repeat 5]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+from typing import Awaitable, BinaryIO, Callable, List, Tuple
+
+from bilidownload.download import AdaptiveBlockSize, aiter_blocks, iter_blocks
+from bilidownload.proxy import AsyncProxyService, ProxyService
+from bilidownload.testing import FakeBilibiliServer
+from bilidownload.video.constants import UNIT_CHUNK
+
+
+MB = 1024 * 1024
+GB = 1024 * MB
+MEDIA_PATH = '/cdn/video-80.m4s'
+
+
+def serve(media_size: int, urls: 'multiprocessing.Queue', stop: 'multiprocessing.Event') -> None:
+    with FakeBilibiliServer(media_size=media_size) as server:
+        urls.put(server.url)
+        stop.wait()
+
+
+def write_block(f: BinaryIO, block: memoryview) -> None:
+    """
+    write the whole block to an unbuffered file, which may take it in parts
+    """
+    while block:
+        block = block[f.write(block):]
+
+
+def legacy_download(url: str, file_path: str) -> None:
+    with ProxyService.get_video_stream_response(url) as response, open(file_path, 'wb') as f:
+        for chunk in response.iter_content(chunk_size=UNIT_CHUNK):
+            f.write(chunk)
+
+
+def block_download(url: str, file_path: str) -> None:
+    buffer = bytearray(AdaptiveBlockSize().max_size)
+    with ProxyService.get_video_stream_response(url) as response, open(file_path, 'wb', buffering=0) as f:
+        for block in iter_blocks(response, buffer, AdaptiveBlockSize(UNIT_CHUNK)):
+            write_block(f, block)
+
+
+async def legacy_download_async(url: str, file_path: str) -> None:
+    async with AsyncProxyService.get_video_stream_response(url) as response:
+        with open(file_path, 'wb') as f:
+            async for chunk in response.aiter_bytes(chunk_size=UNIT_CHUNK):
+                f.write(chunk)
+
+
+async def block_download_async(url: str, file_path: str) -> None:
+    buffer = bytearray(AdaptiveBlockSize().max_size)
+    async with AsyncProxyService.get_video_stream_response(url) as response:
+        with open(file_path, 'wb', buffering=0) as f:
+            async for block in aiter_blocks(response, buffer, AdaptiveBlockSize(UNIT_CHUNK)):
+                write_block(f, block)
+
+
+def measure(func: Callable[[], None], repeat: int) -> Tuple[float, float]:
+    """
+    median wall and CPU seconds per call
+    """
+    func()  # warm up
+    walls: List[float] = []
+    cpus: List[float] = []
+    for _ in range(repeat):
+        wall, cpu = time.perf_counter(), time.process_time()
+        func()
+        walls.append(time.perf_counter() - wall)
+        cpus.append(time.process_time() - cpu)
+    walls.sort()
+    cpus.sort()
+    return walls[len(walls) // 2], cpus[len(cpus) // 2]
+
+
+def run_async(func: Callable[[str, str], Awaitable[None]], url: str, file_path: str) -> None:
+    asyncio.run(func(url, file_path))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--media-mb', type=int, default=512, help='MiB of the stream')
+    parser.add_argument('--repeat', type=int, default=5, help='downloads of each case')
+    args = parser.parse_args()
+
+    size = args.media_mb * MB
+    context = multiprocessing.get_context('spawn')
+    urls, stop = context.Queue(), context.Event()
+    server = context.Process(target=serve, args=(size, urls, stop), daemon=True)
+    server.start()
+    ProxyService.disable_rate_limiter()
+    ProxyService.disable_prewarmer()
+    try:
+        url = urls.get() + MEDIA_PATH
+        cases = [
+            ('legacy', lambda file_path: legacy_download(url, file_path)),
+            ('blocks', lambda file_path: block_download(url, file_path)),
+            ('legacy_async', lambda file_path: run_async(legacy_download_async, url, file_path)),
+            ('blocks_async', lambda file_path: run_async(block_download_async, url, file_path))
+        ]
+        print(f'{"case":<16}{"MB/s":>10}{"CPU s/GiB":>12}')
+        with tempfile.TemporaryDirectory() as location_path:
+            file_path = os.path.join(location_path, 'stream.m4s')
+            for name, download in cases:
+                wall, cpu = measure(lambda: download(file_path), args.repeat)
+                assert os.path.getsize(file_path) == size
+                print(f'{name:<16}{size / MB / wall:>10.1f}{cpu * GB / size:>12.3f}')
+    finally:
+        stop.set()
+        server.join()
+
+
+if __name__ == '__main__':
+    main()
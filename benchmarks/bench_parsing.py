@@ -0,0 +1,94 @@
+"""
+Micro-benchmark on validating work info responses,
+legacy decode + json.loads + model_validate against model_validate_json,
+and full models against lite projection ones in time and peak memory
+
+python -m benchmarks.bench_parsing [--episodes 500] [--repeat 20]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Callable, List, Type
+
+from pydantic import BaseModel
+
+from bilidownload.proxy import (
+    GetBangumiDetailLiteResponse,
+    GetBangumiDetailResponse,
+    GetCheeseDetailLiteResponse,
+    GetCheeseDetailResponse,
+    GetVideoInfoLiteResponse,
+    GetVideoInfoResponse
+)
+from bilidownload.testing import build_payload
+
+
+def legacy_parse(content: bytes, model: Type[BaseModel]) -> BaseModel:
+    data = json.loads(content.decode('utf-8'))
+    return model.model_validate(data)
+
+
+def json_mode_parse(content: bytes, model: Type[BaseModel]) -> BaseModel:
+    return model.model_validate_json(content)
+
+
+def measure(func: Callable[[], BaseModel], repeat: int) -> float:
+    """
+    median seconds per call
+    """
+    func()  # warm up
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def measure_peak(func: Callable[[], BaseModel]) -> int:
+    """
+    peak bytes allocated by one call, result included
+    """
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--episodes', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    cases = [
+        ('bangumi', GetBangumiDetailResponse, GetBangumiDetailLiteResponse,
+         {'episodes': args.episodes, 'section': 1}),
+        ('cheese', GetCheeseDetailResponse, GetCheeseDetailLiteResponse, {'episodes': args.episodes}),
+        ('video', GetVideoInfoResponse, GetVideoInfoLiteResponse, {'pages': args.episodes})
+    ]
+    print(
+        f'{"payload":<10}{"size KiB":>10}{"legacy ms":>12}{"json ms":>10}{"lite ms":>10}'
+        f'{"json KiB":>10}{"lite KiB":>10}'
+    )
+    for name, model, lite_model, list_sizes in cases:
+        content = json.dumps(build_payload(model, list_sizes), ensure_ascii=False).encode('utf-8')
+        legacy = measure(lambda: legacy_parse(content, model), args.repeat)
+        json_mode = measure(lambda: json_mode_parse(content, model), args.repeat)
+        lite = measure(lambda: json_mode_parse(content, lite_model), args.repeat)
+        json_peak = measure_peak(lambda: json_mode_parse(content, model))
+        lite_peak = measure_peak(lambda: json_mode_parse(content, lite_model))
+        print(
+            f'{name:<10}{len(content) / 1024:>10.1f}{legacy * 1000:>12.2f}'
+            f'{json_mode * 1000:>10.2f}{lite * 1000:>10.2f}'
+            f'{json_peak / 1024:>10.1f}{lite_peak / 1024:>10.1f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
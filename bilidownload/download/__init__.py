@@ -0,0 +1,16 @@
+"""
+Media stream download module
+"""
+from .blocks import AdaptiveBlockSize, aiter_blocks, iter_blocks  # NOQA
+from .checkpoint import Checkpoint, StreamChangedError  # NOQA
+from .downloader import (
+    DownloadCancelledError,  # NOQA
+    IncompleteStreamError,  # NOQA
+    SlowStreamError,  # NOQA
+    StreamDownloader,  # NOQA
+    StreamStatusError  # NOQA
+)
+from .mirrors import get_mirror_selector, MirrorSelector, set_mirror_selector  # NOQA
+from .retry import RetryPolicy  # NOQA
+from .segmented import SegmentedDownloader  # NOQA
+from .sink import Extents, FileSink  # NOQA
@@ -0,0 +1,156 @@
+"""
+Reading of stream bodies in large blocks into one reusable buffer
+"""
+import http.client
+import time
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+import requests
+from requests import Response
+from urllib3.response import HTTPResponse
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+from .constants import DEFAULT_BLOCK_DURATION, DEFAULT_CHUNK_SIZE, DEFAULT_MAX_BLOCK_SIZE
+
+
+__all__ = ['AdaptiveBlockSize', 'aiter_blocks', 'iter_blocks']
+
+
+class AdaptiveBlockSize:
+    """
+    Bytes to read at a time, sized so that a read takes about duration seconds
+    at the throughput observed, in powers of 2 between min_size and max_size.
+    A slow stream is read in small blocks, which keeps checks of throughput and stop
+    frequent, while a fast one is read and written in few large ones
+    """
+
+    def __init__(
+        self,
+        min_size: int = DEFAULT_CHUNK_SIZE,
+        max_size: int = DEFAULT_MAX_BLOCK_SIZE,
+        duration: float = DEFAULT_BLOCK_DURATION
+    ):
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.duration = duration
+        self.size = self.min_size
+
+    def update(self, size: int, elapsed: float) -> None:
+        """
+        record size bytes read in elapsed seconds
+        """
+        if elapsed <= 0:
+            wanted = self.size * 2
+        else:
+            wanted = size / elapsed * self.duration
+        next_size = self.min_size
+        while next_size * 2 <= min(wanted, self.max_size):
+            next_size *= 2
+        # grows at most by doubling, so one fast read of buffered bytes does not overshoot
+        self.size = min(next_size, self.size * 2)
+
+
+def _get_readinto(response: Response) -> Optional[Callable[[memoryview], int]]:
+    """
+    readinto of the HTTP response under urllib3, which fills a buffer
+    from the socket without allocating bytes, None when the body needs decoding
+    or the response is of another backend
+    """
+    raw = response.raw
+    is_encoded = response.headers.get('Content-Encoding', 'identity') != 'identity'
+    if not isinstance(raw, HTTPResponse) or is_encoded:
+        return None
+    fp = getattr(raw, '_fp', None)
+    if not isinstance(fp, http.client.HTTPResponse):
+        return None
+
+    def readinto(block: memoryview) -> int:
+        # errors as requests raises on the same failures, which callers retry
+        try:
+            return fp.readinto(block)
+        except TimeoutError as e:
+            raise requests.ReadTimeout(str(e)) from e
+        except (OSError, http.client.HTTPException) as e:
+            raise requests.ConnectionError(str(e)) from e
+
+    return readinto
+
+
+def _get_expected_size(response: Response) -> Optional[int]:
+    length = response.headers.get('Content-Length')
+    return int(length) if length is not None and length.isdigit() else None
+
+
+def iter_blocks(
+    response: Response,
+    buffer: bytearray,
+    block_size: AdaptiveBlockSize
+) -> Iterator[memoryview]:
+    """
+    Body of a streamed response in blocks of block_size, each a view of buffer
+    valid until the next one is taken. buffer holds block_size.max_size bytes at least.
+
+    Read by the socket straight into buffer when the default backend sent the response,
+    otherwise chunks of block_size.min_size are gathered into buffer
+    """
+    view = memoryview(buffer)
+    readinto = _get_readinto(response)
+    received = 0
+    if readinto is not None:
+        while True:
+            started_at = time.monotonic()
+            size = readinto(view[:block_size.size])
+            if not size:
+                break
+            block_size.update(size, time.monotonic() - started_at)
+            received += size
+            yield view[:size]
+        expected = _get_expected_size(response)
+        if expected is not None and received < expected:
+            # http.client takes a connection closed early as the end of the body
+            raise requests.exceptions.ChunkedEncodingError(
+                f'IncompleteRead({received} bytes read, {expected - received} more expected)'
+            )
+        # read up to its end, so the connection is kept alive for the next request
+        response.raw.release_conn()
+        return
+
+    filled, started_at = 0, time.monotonic()
+    for chunk in response.iter_content(chunk_size=block_size.min_size):
+        view[filled:filled + len(chunk)] = chunk
+        filled += len(chunk)
+        if filled + block_size.min_size > block_size.size:
+            block_size.update(filled, time.monotonic() - started_at)
+            yield view[:filled]
+            filled, started_at = 0, time.monotonic()
+    if filled:
+        yield view[:filled]
+
+
+async def aiter_blocks(
+    response: 'httpx.Response',
+    buffer: bytearray,
+    block_size: AdaptiveBlockSize
+) -> AsyncIterator[memoryview]:
+    """
+    asynchronous version of iter_blocks, chunks as httpx receives them are gathered into buffer
+    """
+    view = memoryview(buffer)
+    filled, started_at = 0, time.monotonic()
+    async for chunk in response.aiter_bytes():
+        while chunk:
+            # a chunk may be larger than what buffer has left
+            size = min(len(chunk), block_size.max_size - filled)
+            view[filled:filled + size] = chunk[:size]
+            filled += size
+            chunk = chunk[size:]
+            if filled >= block_size.size:
+                block_size.update(filled, time.monotonic() - started_at)
+                yield view[:filled]
+                filled, started_at = 0, time.monotonic()
+    if filled:
+        yield view[:filled]
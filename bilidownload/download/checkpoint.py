@@ -0,0 +1,200 @@
+"""
+Checkpoints of partial downloads, saved beside their .part files
+"""
+import contextlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .constants import CHECKPOINT_SUFFIX, DEFAULT_CHECKPOINT_INTERVAL, PART_SUFFIX
+from .sink import Extents
+
+
+__all__ = ['Checkpoint', 'get_part_path', 'StreamChangedError']
+
+
+CHECKPOINT_VERSION = 1
+
+
+class StreamChangedError(IOError):
+    """
+    validators or size of the stream differ from the ones its partial download was made of
+    """
+
+    def __init__(self, url: str):
+        super().__init__(f'stream of {url} changed since its partial download')
+        self.url = url
+
+
+def get_part_path(file_path: str) -> str:
+    return f'{file_path}{PART_SUFFIX}'
+
+
+def get_total_size(status_code: int, headers: Mapping[str, str]) -> Optional[int]:
+    """
+    bytes of the whole stream told by a response, None when unknown
+    """
+    if status_code == 206:
+        _, _, total = (headers.get('Content-Range') or '').rpartition('/')
+    else:
+        total = headers.get('Content-Length') or ''
+    return int(total) if total.isdigit() else None
+
+
+class Checkpoint:
+    """
+    Byte ranges of a stream already written to its .part file, i.e. extents
+    a FileSink records, along with what identifies the stream, i.e. path of its URL,
+    which stays the same across mirrors and refreshed stream metas, its size and validators.
+    Saved as JSON every interval bytes and when the download stops,
+    so that a download started again resumes by Range requests
+    instead of fetching the stream from its first byte.
+    The .part file is flushed to disk before each save, as it is preallocated to its full size,
+    whose bytes never written would otherwise pass for written ones after a crash.
+
+    path: file the checkpoint is saved to
+    identity: what the checkpoint is valid for, a saved one of another identity is ignored
+    interval: bytes written between two saves
+    """
+
+    def __init__(self, path: str, identity: str, interval: int = DEFAULT_CHECKPOINT_INTERVAL):
+        self.path = path
+        self.identity = identity
+        self.interval = interval
+        self.size: Optional[int] = None
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.extents = Extents()
+        self._saved_size = 0  # bytes the extents covered when saved
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # saves one at a time, in the order of their snapshots
+
+    @classmethod
+    def get_path(cls, file_path: str) -> str:
+        return f'{get_part_path(file_path)}{CHECKPOINT_SUFFIX}'
+
+    @property
+    def part_path(self) -> str:
+        return self.path[:-len(CHECKPOINT_SUFFIX)]
+
+    @classmethod
+    def get_identity(cls, url: str) -> str:
+        return urlsplit(url).path
+
+    @classmethod
+    def load(cls, file_path: str, url: str, interval: int = DEFAULT_CHECKPOINT_INTERVAL) -> 'Checkpoint':
+        """
+        checkpoint of downloading url to file_path, an empty one
+        when none is saved, or the saved one is of another stream or outlived its .part file
+        """
+        checkpoint = cls(cls.get_path(file_path), cls.get_identity(url), interval)
+        try:
+            with open(checkpoint.path, encoding='utf-8') as f:
+                data: Dict[str, Any] = json.load(f)
+            part_size = os.path.getsize(get_part_path(file_path))
+        except (OSError, ValueError):
+            return checkpoint
+        if data.get('version') != CHECKPOINT_VERSION or data.get('identity') != checkpoint.identity:
+            return checkpoint
+        try:
+            checkpoint.size = data['size']
+            checkpoint.etag = data['etag']
+            checkpoint.last_modified = data['last_modified']
+            for start, end in data['ranges']:
+                # bytes claimed beyond the .part file were never written
+                checkpoint.extents.add(start, min(end, part_size))
+        except (KeyError, TypeError, ValueError):
+            checkpoint.reset()
+        checkpoint._saved_size = checkpoint.extents.size
+        return checkpoint
+
+    @property
+    def ranges(self) -> List[Tuple[int, int]]:
+        return self.extents.ranges
+
+    def get_prefix(self) -> int:
+        return self.extents.get_prefix()
+
+    def get_gaps(self, size: int) -> List[Tuple[int, int]]:
+        return self.extents.get_gaps(size)
+
+    @property
+    def is_due(self) -> bool:
+        """
+        whether interval bytes were written since the last save
+        """
+        return self.extents.size - self._saved_size >= self.interval
+
+    @property
+    def is_dirty(self) -> bool:
+        """
+        whether bytes were written since the last save, or since loading
+        """
+        return self.extents.size > self._saved_size
+
+    def check(self, status_code: int, headers: Mapping[str, str]) -> bool:
+        """
+        whether a response is of the same stream the written bytes are,
+        its size and validators are recorded when not known yet
+        """
+        size = get_total_size(status_code, headers)
+        etag, last_modified = headers.get('ETag'), headers.get('Last-Modified')
+        with self._lock:
+            for name, value in (('size', size), ('etag', etag), ('last_modified', last_modified)):
+                if value is None:
+                    continue
+                if getattr(self, name) is None:
+                    setattr(self, name, value)
+                elif getattr(self, name) != value:
+                    return False
+        return True
+
+    def reset(self) -> None:
+        with self._lock:
+            self.size = self.etag = self.last_modified = None
+            self.extents.clear()
+            self._saved_size = 0
+
+    def _sync_part(self) -> None:
+        """
+        flush bytes written to the .part file to disk, by whichever sink wrote them
+        """
+        try:
+            fd = os.open(self.part_path, os.O_RDWR | getattr(os, 'O_BINARY', 0))
+        except FileNotFoundError:
+            return
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def save(self) -> None:
+        """
+        write the checkpoint by replacing the saved one, so it is never half written,
+        once the ranges it records are on disk
+        """
+        with self._save_lock:
+            with self._lock:
+                saved_size = self.extents.size
+                data = {
+                    'version': CHECKPOINT_VERSION,
+                    'identity': self.identity,
+                    'size': self.size,
+                    'etag': self.etag,
+                    'last_modified': self.last_modified,
+                    'ranges': [list(item) for item in self.extents.ranges]
+                }
+                self._saved_size = saved_size
+            # out of the lock, so writers go on recording extents while the part file is flushed.
+            # Ranges are recorded after their bytes are written, so the flush covers all of them
+            self._sync_part()
+            temp_path = f'{self.path}.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+
+    def remove(self) -> None:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.path)
@@ -0,0 +1,34 @@
+"""
+Stream download constants
+"""
+
+
+DEFAULT_CHUNK_SIZE = 8192                # bytes read from a stream at a time at least
+DEFAULT_MAX_BLOCK_SIZE = 1024 * 1024     # bytes read at a time at most, as the buffer of each connection
+DEFAULT_BLOCK_DURATION = 0.25            # seconds a read of a block is sized to take
+DEFAULT_SEGMENTS = 4                     # byte ranges of a stream fetched in parallel
+DEFAULT_MIN_SEGMENT_SIZE = 1024 * 1024   # bytes, smaller streams are split into fewer segments
+STOP_POLL_INTERVAL = 0.1                 # seconds between checks of the stop event of a segmented download
+
+
+PART_SUFFIX = '.part'                           # of a file being downloaded, renamed without it when done
+CHECKPOINT_SUFFIX = '.json'                     # of the checkpoint beside a .part file
+DEFAULT_CHECKPOINT_INTERVAL = 16 * 1024 * 1024  # bytes written between two saves of a checkpoint
+
+
+DEFAULT_MIRROR_PROBE_SIZE = 256 * 1024    # bytes a probe of a mirror fetches by a Range request
+DEFAULT_MIRROR_PROBE_WORKERS = 4          # threads probing mirrors at a time
+DEFAULT_MIRROR_SCORE_TTL = 600            # seconds a score of a host is trusted without new samples
+DEFAULT_MIRROR_SCORE_WEIGHT = 0.3         # weight of a new sample in the moving averages of a score
+MIRROR_MIN_SAMPLE_SIZE = 64 * 1024        # bytes of a response at least to tell throughput from latency
+MIRROR_REFERENCE_SIZE = 4 * 1024 * 1024   # bytes whose estimated fetch time ranks hosts
+MIRROR_MAX_HOSTS = 1024                   # hosts scored at most
+
+
+DEFAULT_RETRY_ATTEMPTS = 5            # tries of a stream in total, over all of its mirrors
+DEFAULT_RETRY_BACKOFF = 0.5           # seconds before the second try, doubled per try
+DEFAULT_RETRY_MAX_BACKOFF = 10        # seconds
+DEFAULT_RETRY_JITTER = 1              # fraction of each delay randomized, 1 is full jitter
+DEFAULT_RETRY_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+DEFAULT_FAILOVER_AFTER = 2            # consecutive failures on one URL before the next mirror
+DEFAULT_THROUGHPUT_WINDOW = 10        # seconds over which throughput of a stream is measured
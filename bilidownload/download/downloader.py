@@ -0,0 +1,446 @@
+"""
+Download of media streams with retries and mirror failover
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import List, Mapping, Optional, Sequence
+
+import requests
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+from .blocks import AdaptiveBlockSize, aiter_blocks, iter_blocks
+from .checkpoint import Checkpoint, get_part_path, StreamChangedError
+from .constants import DEFAULT_CHECKPOINT_INTERVAL, DEFAULT_CHUNK_SIZE, DEFAULT_MAX_BLOCK_SIZE
+from .mirrors import get_mirror_selector
+from .sink import FileSink
+from .retry import RetryPolicy
+from ..proxy import AsyncProxyService, ProxyService
+from ..proxy.constants import ENDPOINT_VIDEO_STREAM
+
+
+__all__ = [
+    'DownloadCancelledError',
+    'IncompleteStreamError',
+    'SlowStreamError',
+    'StreamDownloader',
+    'StreamStatusError'
+]
+
+
+class StreamStatusError(IOError):
+
+    def __init__(self, url: str, status_code: int):
+        super().__init__(f'HTTP {status_code} from {url}')
+        self.url = url
+        self.status_code = status_code
+
+
+class SlowStreamError(IOError):
+
+    def __init__(self, url: str, throughput: float):
+        super().__init__(f'{throughput:.0f} B/s from {url}')
+        self.url = url
+        self.throughput = throughput
+
+
+class IncompleteStreamError(IOError):
+
+    def __init__(self, url: str, received: int, expected: int):
+        super().__init__(f'{received} of {expected} bytes from {url}')
+        self.url = url
+        self.received = received
+        self.expected = expected
+
+
+class DownloadCancelledError(Exception):
+    """
+    download stopped by its stop event, e.g. as the other stream of the same work failed
+    """
+
+    def __init__(self, file_path: str):
+        super().__init__(f'download of {file_path} cancelled')
+        self.file_path = file_path
+
+
+RETRYABLE_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    StreamStatusError,
+    SlowStreamError,
+    IncompleteStreamError
+)
+ASYNC_RETRYABLE_ERRORS = (
+    (httpx.TransportError,) if httpx is not None else ()
+) + (StreamStatusError, SlowStreamError, IncompleteStreamError)
+
+
+class _Failover:
+    """
+    which URL of a stream to try next, and when to give up
+    """
+
+    def __init__(self, urls: Sequence[str], policy: RetryPolicy):
+        self._urls: List[str] = list(dict.fromkeys(urls))
+        self._policy = policy
+        self._index = 0
+        self._failures = 0
+        self._attempts = 0
+
+    @property
+    def url(self) -> str:
+        return self._urls[self._index]
+
+    @property
+    def has_mirror(self) -> bool:
+        return len(self._urls) > 1
+
+    def _next_mirror(self) -> None:
+        self._index = (self._index + 1) % len(self._urls)
+        self._failures = 0
+
+    def on_error(self, error: Exception) -> float:
+        """
+        seconds to wait before the next try, error is raised when no try is left
+        """
+        selector = get_mirror_selector()
+        if selector is not None:
+            selector.record_failure(self.url)
+        self._attempts += 1
+        if self._attempts >= self._policy.attempts:
+            raise error
+        if isinstance(error, StreamStatusError) and not self._policy.is_retryable_status(error.status_code):
+            # e.g. 403 or 404 from one mirror, which is no use retrying
+            del self._urls[self._index]
+            if not self._urls:
+                raise error
+            self._index %= len(self._urls)
+            self._failures = 0
+            return 0
+        if isinstance(error, SlowStreamError):
+            self._next_mirror()
+            return 0
+        self._failures += 1
+        if self._failures >= self._policy.failover_after:
+            self._next_mirror()
+        return self._policy.get_delay(self._attempts)
+
+
+def _record_retry() -> None:
+    metrics = ProxyService.get_metrics()
+    if metrics is not None:
+        metrics.record_retry(ENDPOINT_VIDEO_STREAM)
+
+
+class _ThroughputMeter:
+    """
+    throughput of a response, checked against min_throughput every window seconds,
+    and reported to the mirror selector along with its TTFB once the response ends
+    """
+
+    def __init__(self, url: str, min_throughput: Optional[float], window: float, requested_at: float):
+        self._url = url
+        self._min_throughput = min_throughput
+        self._window = window
+        self._requested_at = requested_at
+        self._responded_at = self._started_at = time.monotonic()
+        self._size = 0
+        self._received = 0
+
+    def __enter__(self) -> '_ThroughputMeter':
+        return self
+
+    def __exit__(self, *args) -> None:
+        selector = get_mirror_selector()
+        if selector is not None:
+            now = time.monotonic()
+            selector.record(
+                self._url, self._received, now - self._responded_at, self._responded_at - self._requested_at
+            )
+
+    def update(self, size: int) -> None:
+        self._received += size
+        if self._min_throughput is None:
+            return
+        self._size += size
+        now = time.monotonic()
+        elapsed = now - self._started_at
+        if elapsed < self._window:
+            return
+        throughput = self._size / elapsed
+        if throughput < self._min_throughput:
+            raise SlowStreamError(self._url, throughput)
+        self._started_at, self._size = now, 0
+
+
+class StreamDownloader:
+    """
+    Stream is fetched from its first URL into a .part file, a failed try is resumed
+    from the bytes already written by a Range request, on the same URL
+    or on the next mirror as retry_policy decides.
+
+    Bytes written are recorded by a Checkpoint beside the .part file,
+    so a download started again, e.g. after the process died, resumes as well,
+    unless size or validators of the stream changed meanwhile.
+    The .part file is renamed to the file wanted once the stream is complete.
+
+    Each connection reads into its own buffer of max_block_size bytes, in blocks
+    growing from chunk_size as fast as the throughput allows, each written by one call
+    at its offset of a FileSink, preallocated once the size of the stream is known.
+
+    Mirrors are tried in the order the process-wide MirrorSelector ranks them,
+    fastest first by throughput and TTFB of past responses from their hosts,
+    or of small probes when those are not recent, each response scoring its host in turn
+
+    chunk_size: bytes read at a time at least
+    checkpoint_interval: bytes written between two saves of the checkpoint
+    max_block_size: bytes read and written at a time at most
+    """
+
+    def __init__(
+        self,
+        retry_policy: Optional[RetryPolicy] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+        max_block_size: int = DEFAULT_MAX_BLOCK_SIZE
+    ):
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.chunk_size = chunk_size
+        self.checkpoint_interval = checkpoint_interval
+        self.max_block_size = max_block_size
+
+    def _get_buffer(self) -> bytearray:
+        return bytearray(max(self.chunk_size, self.max_block_size))
+
+    def _get_block_size(self) -> AdaptiveBlockSize:
+        return AdaptiveBlockSize(self.chunk_size, self.max_block_size)
+
+    def _check_status(self, url: str, status_code: int) -> None:
+        if status_code >= 400:
+            raise StreamStatusError(url, status_code)
+
+    def _check_stream(
+        self,
+        url: str,
+        status_code: int,
+        headers: Mapping[str, str],
+        checkpoint: Checkpoint,
+        sink: Optional[FileSink] = None
+    ) -> None:
+        if not checkpoint.check(status_code, headers):
+            raise StreamChangedError(url)
+        if sink is not None and checkpoint.size is not None:
+            sink.preallocate(checkpoint.size)
+
+    def _prepare_file(self, sink: FileSink, start: int, status_code: int, checkpoint: Checkpoint) -> None:
+        if start and status_code != 206:
+            # Range is ignored, the stream starts over
+            sink.truncate()
+            checkpoint.reset()
+
+    def _write(self, sink: FileSink, position: int, block: memoryview, checkpoint: Checkpoint) -> None:
+        sink.write(position, block)
+        if checkpoint.is_due:
+            checkpoint.save()
+
+    def _get_meter(self, failover: _Failover, requested_at: float) -> _ThroughputMeter:
+        min_throughput = self.retry_policy.min_throughput if failover.has_mirror else None
+        window = self.retry_policy.throughput_window
+        return _ThroughputMeter(failover.url, min_throughput, window, requested_at)
+
+    def _rank(self, urls: Sequence[str]) -> List[str]:
+        """
+        urls by scores the mirror selector has now, without probing
+        """
+        selector = get_mirror_selector()
+        return selector.rank(urls) if selector is not None else list(urls)
+
+    def _select(self, urls: Sequence[str]) -> List[str]:
+        selector = get_mirror_selector()
+        return selector.select(urls) if selector is not None else list(urls)
+
+    async def _select_async(self, urls: Sequence[str]) -> List[str]:
+        selector = get_mirror_selector()
+        return await selector.select_async(urls) if selector is not None else list(urls)
+
+    def _open_part(self, part_path: str, checkpoint: Checkpoint) -> FileSink:
+        """
+        sink recording extents of the checkpoint, a .part file without any of them starts empty
+        """
+        return FileSink(part_path, checkpoint.extents, truncate=not checkpoint.ranges)
+
+    def _fetch(
+        self,
+        failover: _Failover,
+        sink: FileSink,
+        checkpoint: Checkpoint,
+        buffer: bytearray,
+        stop: Optional[threading.Event] = None
+    ) -> None:
+        # bytes after a gap, if any, are fetched again
+        url, start, requested_at = failover.url, checkpoint.get_prefix(), time.monotonic()
+        with ProxyService.get_video_stream_response(url, start) as response:
+            self._check_status(url, response.status_code)
+            self._prepare_file(sink, start, response.status_code, checkpoint)
+            self._check_stream(url, response.status_code, response.headers, checkpoint, sink)
+            position = checkpoint.get_prefix()
+            with self._get_meter(failover, requested_at) as meter:
+                for block in iter_blocks(response, buffer, self._get_block_size()):
+                    if stop is not None and stop.is_set():
+                        raise DownloadCancelledError(sink.path)
+                    self._write(sink, position, block, checkpoint)
+                    position += len(block)
+                    meter.update(len(block))
+
+    def _is_complete(self, checkpoint: Checkpoint) -> bool:
+        return checkpoint.size is not None and checkpoint.get_prefix() >= checkpoint.size
+
+    def _save_on_error(self, checkpoint: Checkpoint) -> None:
+        """
+        save the checkpoint of a failed download when bytes were written since its last save,
+        so a download failed before its first byte leaves no checkpoint behind
+        """
+        if not checkpoint.is_dirty:
+            return
+        try:
+            checkpoint.save()
+        except OSError:
+            # e.g. disk full, the error of the download is the one raised,
+            # a download started again resumes from the last checkpoint saved
+            pass
+
+    def _check_complete(self, url: str, checkpoint: Checkpoint) -> None:
+        """
+        raise IncompleteStreamError when bytes of a stream of known size are missing,
+        e.g. a hole left in a preallocated .part file, which is never renamed into place
+        """
+        if checkpoint.size is not None and checkpoint.get_gaps(checkpoint.size):
+            raise IncompleteStreamError(url, checkpoint.extents.size, checkpoint.size)
+
+    def _download_part(
+        self,
+        urls: Sequence[str],
+        part_path: str,
+        checkpoint: Checkpoint,
+        size_hint: Optional[int] = None,
+        stop: Optional[threading.Event] = None
+    ) -> None:
+        if self._is_complete(checkpoint):
+            return
+        failover = _Failover(urls, self.retry_policy)
+        buffer = self._get_buffer()
+        with self._open_part(part_path, checkpoint) as sink:
+            while True:
+                try:
+                    self._fetch(failover, sink, checkpoint, buffer, stop)
+                    return
+                except RETRYABLE_ERRORS as e:
+                    delay = failover.on_error(e)
+                _record_retry()
+                if stop is None:
+                    time.sleep(delay)
+                elif stop.wait(delay):
+                    raise DownloadCancelledError(part_path)
+
+    def download(
+        self,
+        urls: Sequence[str],
+        file_path: str,
+        size_hint: Optional[int] = None,
+        stop: Optional[threading.Event] = None
+    ) -> None:
+        """
+        urls: URL of the stream followed by its mirrors, e.g. base_url and backup_url,
+        tried in the order the mirror selector ranks them
+        size_hint: estimated bytes of the stream, which a sequential download does not need
+        stop: when set, e.g. by another thread, the download raises DownloadCancelledError
+        at its next chunk
+        """
+        checkpoint = Checkpoint.load(file_path, urls[0], self.checkpoint_interval)
+        part_path = get_part_path(file_path)
+        urls = self._select(urls)
+        try:
+            try:
+                self._download_part(urls, part_path, checkpoint, size_hint, stop)
+            except StreamChangedError:
+                # bytes written are of another version of the stream, which starts over
+                checkpoint.reset()
+                self._download_part(urls, part_path, checkpoint, size_hint, stop)
+            self._check_complete(urls[0], checkpoint)
+        except BaseException:
+            self._save_on_error(checkpoint)
+            raise
+        os.replace(part_path, file_path)
+        checkpoint.remove()
+
+    async def _fetch_async(
+        self,
+        failover: _Failover,
+        sink: FileSink,
+        checkpoint: Checkpoint,
+        buffer: bytearray
+    ) -> None:
+        url, start, requested_at = failover.url, checkpoint.get_prefix(), time.monotonic()
+        async with AsyncProxyService.get_video_stream_response(url, start) as response:
+            self._check_status(url, response.status_code)
+            self._prepare_file(sink, start, response.status_code, checkpoint)
+            self._check_stream(url, response.status_code, response.headers, checkpoint, sink)
+            position = checkpoint.get_prefix()
+            with self._get_meter(failover, requested_at) as meter:
+                async for block in aiter_blocks(response, buffer, self._get_block_size()):
+                    self._write(sink, position, block, checkpoint)
+                    position += len(block)
+                    meter.update(len(block))
+
+    async def _download_part_async(
+        self,
+        urls: Sequence[str],
+        part_path: str,
+        checkpoint: Checkpoint,
+        size_hint: Optional[int] = None
+    ) -> None:
+        if self._is_complete(checkpoint):
+            return
+        failover = _Failover(urls, self.retry_policy)
+        buffer = self._get_buffer()
+        with self._open_part(part_path, checkpoint) as sink:
+            while True:
+                try:
+                    await self._fetch_async(failover, sink, checkpoint, buffer)
+                    return
+                except ASYNC_RETRYABLE_ERRORS as e:
+                    delay = failover.on_error(e)
+                _record_retry()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+    async def download_async(
+        self,
+        urls: Sequence[str],
+        file_path: str,
+        size_hint: Optional[int] = None
+    ) -> None:
+        """
+        asynchronous version of download
+        """
+        checkpoint = Checkpoint.load(file_path, urls[0], self.checkpoint_interval)
+        part_path = get_part_path(file_path)
+        urls = await self._select_async(urls)
+        try:
+            try:
+                await self._download_part_async(urls, part_path, checkpoint, size_hint)
+            except StreamChangedError:
+                checkpoint.reset()
+                await self._download_part_async(urls, part_path, checkpoint, size_hint)
+            self._check_complete(urls[0], checkpoint)
+        except BaseException:
+            self._save_on_error(checkpoint)
+            raise
+        os.replace(part_path, file_path)
+        checkpoint.remove()
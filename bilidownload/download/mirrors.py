@@ -0,0 +1,299 @@
+"""
+Selection of CDN mirrors of a stream by their measured throughput
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Set
+from urllib.parse import urlsplit
+
+import requests
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+from .constants import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_MIRROR_PROBE_SIZE,
+    DEFAULT_MIRROR_PROBE_WORKERS,
+    DEFAULT_MIRROR_SCORE_TTL,
+    DEFAULT_MIRROR_SCORE_WEIGHT,
+    MIRROR_MAX_HOSTS,
+    MIRROR_MIN_SAMPLE_SIZE,
+    MIRROR_REFERENCE_SIZE
+)
+from ..proxy import AsyncProxyService, ProxyService
+
+
+__all__ = ['get_mirror_selector', 'HostScore', 'MirrorSelector', 'set_mirror_selector']
+
+
+PROBE_ERRORS = (requests.RequestException, OSError)
+ASYNC_PROBE_ERRORS = ((httpx.HTTPError,) if httpx is not None else ()) + (OSError,)
+
+
+def get_host(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+class HostScore:
+    """
+    moving averages of throughput in bytes per second and time to first byte in seconds of a host
+    """
+
+    __slots__ = ('throughput', 'ttfb', 'samples', 'updated_at')
+
+    def __init__(self, throughput: float, ttfb: float, updated_at: float):
+        self.throughput = throughput
+        self.ttfb = ttfb
+        self.samples = 1
+        self.updated_at = updated_at
+
+    @property
+    def cost(self) -> float:
+        """
+        estimated seconds to fetch MIRROR_REFERENCE_SIZE bytes, lower ranks first
+        """
+        if self.throughput <= 0:
+            return float('inf')
+        return self.ttfb + MIRROR_REFERENCE_SIZE / self.throughput
+
+
+class MirrorSelector:
+    """
+    Scores of the hosts of CDN mirrors, i.e. base_url and backup_url of a stream,
+    whose throughput differs widely by node and time of day. Each host is scored
+    by throughput and time to first byte of downloads from it, and by a small Range request
+    probing it in background when none is recent, so that a stream, or each of its segments,
+    is fetched from the fastest mirror first, the others left for failover.
+    A download never waits for probes, it takes the ranking of the scores there are,
+    hosts not scored yet keeping the order they are given in.
+
+    Failures of a host not scored are counted apart from scores, ranking it last
+    among hosts not scored, while it is still probed, until a sample of it comes in.
+
+    Scores live as long as the selector, which is one for the process by default
+
+    probe_size: bytes fetched by a probe
+    probe_workers: threads probing hosts at a time
+    ttl: seconds a score is trusted, after which its host is probed again
+    weight: weight of a new sample in the moving averages
+    """
+
+    def __init__(
+        self,
+        probe_size: int = DEFAULT_MIRROR_PROBE_SIZE,
+        probe_workers: int = DEFAULT_MIRROR_PROBE_WORKERS,
+        ttl: float = DEFAULT_MIRROR_SCORE_TTL,
+        weight: float = DEFAULT_MIRROR_SCORE_WEIGHT
+    ):
+        self.probe_size = probe_size
+        self.probe_workers = probe_workers
+        self.ttl = ttl
+        self.weight = weight
+        self._scores: Dict[str, HostScore] = {}
+        self._failures: Dict[str, int] = {}
+        self._probing: Set[str] = set()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: Set['asyncio.Task'] = set()
+
+    def get_scores(self) -> Dict[str, HostScore]:
+        with self._lock:
+            return dict(self._scores)
+
+    def get_failures(self) -> Dict[str, int]:
+        """
+        failures of hosts since their last sample
+        """
+        with self._lock:
+            return dict(self._failures)
+
+    def _get_fresh_score(self, host: str, now: float) -> Optional[HostScore]:
+        score = self._scores.get(host)
+        if score is None or now - score.updated_at > self.ttl:
+            return None
+        return score
+
+    def _prune(self, now: float) -> None:
+        self._scores = {
+            host: score for host, score in self._scores.items() if now - score.updated_at <= self.ttl
+        }
+        while len(self._scores) >= MIRROR_MAX_HOSTS:
+            del self._scores[next(iter(self._scores))]
+
+    def record(self, url: str, size: int, elapsed: float, ttfb: float) -> None:
+        """
+        size bytes fetched from url in elapsed seconds after its first byte came ttfb seconds in
+        """
+        if size < MIRROR_MIN_SAMPLE_SIZE or elapsed <= 0:
+            # too few bytes to tell throughput from latency
+            return
+        host, throughput, now = get_host(url), size / elapsed, time.monotonic()
+        with self._lock:
+            self._failures.pop(host, None)
+            score = self._get_fresh_score(host, now)
+            if score is None:
+                if len(self._scores) >= MIRROR_MAX_HOSTS:
+                    self._prune(now)
+                self._scores[host] = HostScore(throughput, ttfb, now)
+                return
+            score.throughput += self.weight * (throughput - score.throughput)
+            score.ttfb += self.weight * (ttfb - score.ttfb)
+            score.samples += 1
+            score.updated_at = now
+
+    def record_failure(self, url: str) -> None:
+        """
+        a request to url failed, which halves the throughput of its host when scored,
+        the host is counted a failure either way
+        """
+        host, now = get_host(url), time.monotonic()
+        with self._lock:
+            if host not in self._failures and len(self._failures) >= MIRROR_MAX_HOSTS:
+                del self._failures[next(iter(self._failures))]
+            self._failures[host] = self._failures.get(host, 0) + 1
+            score = self._get_fresh_score(host, now)
+            if score is not None:
+                score.throughput /= 2
+
+    def rank(self, urls: Sequence[str]) -> List[str]:
+        """
+        urls by cost of their hosts, urls of hosts not scored keep their order after scored ones,
+        those of hosts failed fewer times first
+        """
+        now = time.monotonic()
+        with self._lock:
+            keys = {}
+            for url in urls:
+                host = get_host(url)
+                score = self._get_fresh_score(host, now)
+                cost = score.cost if score is not None else float('inf')
+                keys[url] = (cost, self._failures.get(host, 0))
+        # stable, so base_url goes first among equals as Bilibili orders them
+        return sorted(dict.fromkeys(urls), key=keys.__getitem__)
+
+    def _pick_probe_urls(self, urls: Sequence[str]) -> List[str]:
+        """
+        one URL of each host without a fresh score nor a probe running, marked probed,
+        none when urls are all of one host
+        """
+        hosts: Dict[str, str] = {}
+        for url in urls:
+            hosts.setdefault(get_host(url), url)
+        if len(hosts) < 2:
+            return []
+        now = time.monotonic()
+        with self._lock:
+            picked = [
+                url for host, url in hosts.items()
+                if host not in self._probing and self._get_fresh_score(host, now) is None
+            ]
+            self._probing.update(get_host(url) for url in picked)
+        return picked
+
+    def _probe(self, url: str) -> None:
+        try:
+            self._send_probe(url)
+        except Exception:
+            # a probe is only a head start, downloads score hosts by themselves anyway
+            pass
+        finally:
+            with self._lock:
+                self._probing.discard(get_host(url))
+
+    def _send_probe(self, url: str) -> None:
+        started_at = time.monotonic()
+        try:
+            with ProxyService.get_video_stream_response(url, 0, self.probe_size - 1) as response:
+                ttfb = time.monotonic() - started_at
+                if response.status_code >= 400:
+                    self.record_failure(url)
+                    return
+                size = sum(len(chunk) for chunk in response.iter_content(chunk_size=DEFAULT_CHUNK_SIZE))
+        except PROBE_ERRORS:
+            self.record_failure(url)
+            return
+        self.record(url, size, time.monotonic() - started_at - ttfb, ttfb)
+
+    def select(self, urls: Sequence[str]) -> List[str]:
+        """
+        urls ranked by the scores there are, hosts without a fresh score probed in background threads
+        for the downloads after
+        """
+        probe_urls = self._pick_probe_urls(urls)
+        if probe_urls:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.probe_workers, thread_name_prefix='mirror-probe'
+                    )
+                executor = self._executor
+            for url in probe_urls:
+                executor.submit(self._probe, url)
+        return self.rank(urls)
+
+    async def _probe_async(self, url: str) -> None:
+        try:
+            await self._send_probe_async(url)
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._probing.discard(get_host(url))
+
+    async def _send_probe_async(self, url: str) -> None:
+        started_at = time.monotonic()
+        try:
+            end = self.probe_size - 1
+            async with AsyncProxyService.get_video_stream_response(url, 0, end) as response:
+                ttfb = time.monotonic() - started_at
+                if response.status_code >= 400:
+                    self.record_failure(url)
+                    return
+                size = 0
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+        except ASYNC_PROBE_ERRORS:
+            self.record_failure(url)
+            return
+        self.record(url, size, time.monotonic() - started_at - ttfb, ttfb)
+
+    async def select_async(self, urls: Sequence[str]) -> List[str]:
+        """
+        asynchronous version of select, probing by tasks on the running event loop
+        """
+        for url in self._pick_probe_urls(urls):
+            task = asyncio.ensure_future(self._probe_async(url))
+            # kept referenced until done, or the task could be garbage collected
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return self.rank(urls)
+
+    def close(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            # hosts of probes cancelled before running are probed again
+            self._probing.clear()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_mirror_selector: Optional[MirrorSelector] = MirrorSelector()
+
+
+def get_mirror_selector() -> Optional[MirrorSelector]:
+    return _mirror_selector
+
+
+def set_mirror_selector(selector: Optional[MirrorSelector]) -> None:
+    """
+    replace the process-wide mirror selector, None keeps mirrors in the order given
+    """
+    global _mirror_selector
+    previous, _mirror_selector = _mirror_selector, selector
+    if previous is not None and previous is not selector:
+        previous.close()
@@ -0,0 +1,62 @@
+"""
+Retry policy of stream downloads
+"""
+import random
+from typing import Iterable, Optional
+
+from .constants import (
+    DEFAULT_FAILOVER_AFTER,
+    DEFAULT_RETRY_ATTEMPTS,
+    DEFAULT_RETRY_BACKOFF,
+    DEFAULT_RETRY_JITTER,
+    DEFAULT_RETRY_MAX_BACKOFF,
+    DEFAULT_RETRY_STATUS_CODES,
+    DEFAULT_THROUGHPUT_WINDOW
+)
+
+
+__all__ = ['RetryPolicy']
+
+
+class RetryPolicy:
+    """
+    attempts: tries of a stream in total, over all of its mirrors
+    backoff: seconds before the second try, doubled per try up to max_backoff
+    jitter: fraction of each delay randomized, 1 means full jitter
+    retry_status_codes: HTTP status codes worth retrying on the same URL,
+        other error statuses drop the URL at once
+    failover_after: consecutive failures on one URL before trying the next mirror
+    min_throughput: bytes per second below which a stream moves to the next mirror,
+        None disables it
+    throughput_window: seconds over which throughput is measured
+    """
+
+    def __init__(
+        self,
+        attempts: int = DEFAULT_RETRY_ATTEMPTS,
+        backoff: float = DEFAULT_RETRY_BACKOFF,
+        max_backoff: float = DEFAULT_RETRY_MAX_BACKOFF,
+        jitter: float = DEFAULT_RETRY_JITTER,
+        retry_status_codes: Iterable[int] = DEFAULT_RETRY_STATUS_CODES,
+        failover_after: int = DEFAULT_FAILOVER_AFTER,
+        min_throughput: Optional[float] = None,
+        throughput_window: float = DEFAULT_THROUGHPUT_WINDOW
+    ):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_status_codes = frozenset(retry_status_codes)
+        self.failover_after = failover_after
+        self.min_throughput = min_throughput
+        self.throughput_window = throughput_window
+
+    def get_delay(self, attempt: int) -> float:
+        """
+        seconds to wait after the attempt-th failed try
+        """
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return delay * (1 - self.jitter * random.random())
+
+    def is_retryable_status(self, status_code: int) -> bool:
+        return status_code in self.retry_status_codes
@@ -0,0 +1,422 @@
+"""
+Download of media streams by byte ranges fetched in parallel
+"""
+import asyncio
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+import re
+import threading
+import time
+from typing import List, Mapping, Optional, Sequence, Tuple
+
+from .checkpoint import Checkpoint
+from .blocks import aiter_blocks, iter_blocks
+from .constants import (
+    DEFAULT_CHECKPOINT_INTERVAL,
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_MAX_BLOCK_SIZE,
+    DEFAULT_MIN_SEGMENT_SIZE,
+    DEFAULT_SEGMENTS,
+    STOP_POLL_INTERVAL
+)
+from .downloader import (
+    _Failover,
+    _record_retry,
+    ASYNC_RETRYABLE_ERRORS,
+    DownloadCancelledError,
+    IncompleteStreamError,
+    RETRYABLE_ERRORS,
+    StreamDownloader,
+    StreamStatusError
+)
+from .retry import RetryPolicy
+from .sink import FileSink
+from ..proxy import AsyncProxyService, ProxyService
+
+
+__all__ = ['SegmentedDownloader']
+
+
+CONTENT_RANGE_PATTERN = re.compile(r'bytes (\d+)-(\d+)/(\d+|\*)')
+UNSATISFIED_RANGE_PATTERN = re.compile(r'bytes \*/(\d+)')
+RANGE_NOT_SATISFIABLE = 416
+
+
+def _parse_content_range(content_range: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    offset of the first byte and bytes of the whole stream, None when unknown
+    """
+    search_result = CONTENT_RANGE_PATTERN.fullmatch((content_range or '').strip())
+    if search_result is None:
+        return None, None
+    total = search_result.group(3)
+    return int(search_result.group(1)), int(total) if total != '*' else None
+
+
+def _parse_unsatisfied_range(content_range: Optional[str]) -> Optional[int]:
+    """
+    bytes of the whole stream told by a 416 response, None when unknown
+    """
+    search_result = UNSATISFIED_RANGE_PATTERN.fullmatch((content_range or '').strip())
+    return int(search_result.group(1)) if search_result is not None else None
+
+
+class _RangeIgnoredError(IOError):
+    """
+    whole stream sent for a Range request, which is no use retrying
+    """
+
+    def __init__(self, url: str):
+        super().__init__(f'Range ignored by {url}')
+        self.url = url
+
+
+class _Segment:
+
+    __slots__ = ('position', 'end')
+
+    def __init__(self, start: int, end: Optional[int]):
+        self.position = start  # offset of the next byte to write
+        self.end = end         # offset of the last byte, None means up to the end of the stream
+
+    @property
+    def is_done(self) -> bool:
+        return self.end is not None and self.position > self.end
+
+
+class SegmentedDownloader(StreamDownloader):
+    """
+    Stream is split into up to segments byte ranges fetched in parallel,
+    each written at its offset of the .part file, since CDN throttles each connection
+    well below the link. Each segment is retried and fails over on its own,
+    resumed from the bytes it already wrote.
+
+    Segments are sized by size_hint, e.g. bandwidth times duration of a DASH stream,
+    the last one running up to the end of the stream whatever the hint misses,
+    otherwise by the size a one-byte Range request tells.
+    A download started again fetches only the gaps its checkpoint leaves.
+    A stream whose server ignores Range, or whose size is unknown,
+    is downloaded sequentially as StreamDownloader does.
+
+    segments: byte ranges of a stream fetched in parallel
+    min_segment_size: bytes of a segment at least, smaller streams take fewer segments
+    """
+
+    def __init__(
+        self,
+        retry_policy: Optional[RetryPolicy] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        segments: int = DEFAULT_SEGMENTS,
+        min_segment_size: int = DEFAULT_MIN_SEGMENT_SIZE,
+        checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+        max_block_size: int = DEFAULT_MAX_BLOCK_SIZE
+    ):
+        super().__init__(retry_policy, chunk_size, checkpoint_interval, max_block_size)
+        self.segments = segments
+        self.min_segment_size = min_segment_size
+
+    def _get_step(self, size: int) -> int:
+        count = max(1, min(self.segments, size // self.min_segment_size))
+        return -(-size // count)
+
+    def _split(self, size: int, is_estimated: bool) -> List[_Segment]:
+        step = self._get_step(size)
+        segments = [_Segment(start, min(start + step, size) - 1) for start in range(0, size, step)]
+        if is_estimated:
+            segments[-1].end = None
+        return segments
+
+    def _split_gaps(self, checkpoint: Checkpoint) -> List[_Segment]:
+        """
+        segments of bytes the checkpoint misses, none when the stream is complete
+        """
+        step = self._get_step(checkpoint.size)
+        return [
+            _Segment(start, min(start + step, end) - 1)
+            for gap_start, end in checkpoint.get_gaps(checkpoint.size)
+            for start in range(gap_start, end, step)
+        ]
+
+    def _get_size(self, urls: Sequence[str], checkpoint: Checkpoint) -> Optional[int]:
+        """
+        bytes of the stream by a one-byte Range request, None when the server ignores Range
+        """
+        failover = _Failover(urls, self.retry_policy)
+        while True:
+            try:
+                url = failover.url
+                with ProxyService.get_video_stream_response(url, 0, 0) as response:
+                    self._check_status(url, response.status_code)
+                    if response.status_code != 206:
+                        return None
+                    self._check_stream(url, response.status_code, response.headers, checkpoint)
+                    return _parse_content_range(response.headers.get('Content-Range'))[1]
+            except RETRYABLE_ERRORS as e:
+                delay = failover.on_error(e)
+            _record_retry()
+            if delay > 0:
+                time.sleep(delay)
+
+    @staticmethod
+    def _is_size_needed(size_hint: Optional[int], checkpoint: Checkpoint) -> bool:
+        """
+        whether planning needs the size of the stream asked from the server
+        """
+        return not checkpoint.ranges and not size_hint
+
+    def _plan(
+        self,
+        size_hint: Optional[int],
+        checkpoint: Checkpoint,
+        size: Optional[int] = None
+    ) -> Optional[List[_Segment]]:
+        """
+        segments to fetch, none when the stream is complete,
+        None when it is downloaded sequentially, e.g. as its size is unknown.
+        A resumed download fetches the gaps of its checkpoint, a sequential one goes on as it was
+        """
+        if checkpoint.ranges:
+            return self._split_gaps(checkpoint) if checkpoint.size is not None else None
+        size = size_hint or size
+        segments = self._split(size, is_estimated=bool(size_hint)) if size else []
+        return segments if len(segments) > 1 else None
+
+    def _start_segment(
+        self,
+        url: str,
+        status_code: int,
+        headers: Mapping[str, str],
+        segment: _Segment,
+        checkpoint: Checkpoint,
+        sink: FileSink
+    ) -> bool:
+        """
+        whether the response carries bytes of segment, False when segment lies beyond the stream,
+        the end of which is learned from the response
+        """
+        if status_code == RANGE_NOT_SATISFIABLE and segment.position > 0:
+            size = checkpoint.size
+            if size is None:
+                size = _parse_unsatisfied_range(headers.get('Content-Range'))
+            if size is None or segment.position >= size:
+                # a segment sized by an overestimated hint
+                segment.end = segment.position - 1
+                return False
+            # within the stream, which is the fault of the mirror, failed over below
+        self._check_status(url, status_code)
+        if status_code == 200:
+            raise _RangeIgnoredError(url)
+        start, total = _parse_content_range(headers.get('Content-Range'))
+        if status_code != 206 or start != segment.position:
+            raise StreamStatusError(url, status_code)
+        self._check_stream(url, status_code, headers, checkpoint, sink)
+        if total is not None and (segment.end is None or segment.end >= total):
+            segment.end = total - 1
+        return True
+
+    def _check_segment(self, url: str, segment: _Segment, start: int) -> None:
+        if segment.end is not None and not segment.is_done:
+            raise IncompleteStreamError(url, segment.position - start, segment.end + 1 - start)
+
+    def _fetch_segment(
+        self,
+        failover: _Failover,
+        sink: FileSink,
+        segment: _Segment,
+        checkpoint: Checkpoint,
+        buffer: bytearray,
+        stopped: threading.Event
+    ) -> None:
+        url, start, requested_at = failover.url, segment.position, time.monotonic()
+        with ProxyService.get_video_stream_response(url, start, segment.end) as response:
+            is_started = self._start_segment(
+                url, response.status_code, response.headers, segment, checkpoint, sink
+            )
+            if not is_started:
+                return
+            with self._get_meter(failover, requested_at) as meter:
+                for block in iter_blocks(response, buffer, self._get_block_size()):
+                    if stopped.is_set():
+                        return
+                    self._write(sink, segment.position, block, checkpoint)
+                    segment.position += len(block)
+                    meter.update(len(block))
+        self._check_segment(url, segment, start)
+
+    def _download_segment(
+        self,
+        urls: Sequence[str],
+        sink: FileSink,
+        segment: _Segment,
+        checkpoint: Checkpoint,
+        stopped: threading.Event
+    ) -> None:
+        # ranked again as the segment starts, by scores segments before it left
+        failover = _Failover(self._rank(urls), self.retry_policy)
+        buffer = self._get_buffer()
+        while not stopped.is_set():
+            try:
+                self._fetch_segment(failover, sink, segment, checkpoint, buffer, stopped)
+                return
+            except RETRYABLE_ERRORS as e:
+                delay = failover.on_error(e)
+            _record_retry()
+            if delay > 0:
+                stopped.wait(delay)
+
+    def _download_segments(
+        self,
+        urls: Sequence[str],
+        part_path: str,
+        segments: List[_Segment],
+        checkpoint: Checkpoint,
+        stop: Optional[threading.Event]
+    ) -> None:
+        # set when one segment failed for good or the caller stopped the download,
+        # on which the others stop at their next block or amid their backoff
+        stopped = threading.Event()
+        failed = []
+        timeout = STOP_POLL_INTERVAL if stop is not None else None
+        # segments left by a checkpoint may outnumber the connections wanted
+        with self._open_part(part_path, checkpoint) as sink, \
+                ThreadPoolExecutor(max_workers=self.segments, thread_name_prefix='segment') as executor:
+            not_done = {
+                executor.submit(self._download_segment, urls, sink, segment, checkpoint, stopped)
+                for segment in segments
+            }
+            while not_done:
+                done, not_done = wait(not_done, timeout=timeout, return_when=FIRST_EXCEPTION)
+                failed.extend(future for future in done if future.exception() is not None)
+                if failed or (stop is not None and stop.is_set()):
+                    stopped.set()
+                    break
+        if failed:
+            failed[0].result()
+        if stop is not None and stop.is_set():
+            raise DownloadCancelledError(part_path)
+
+    def _download_part(
+        self,
+        urls: Sequence[str],
+        part_path: str,
+        checkpoint: Checkpoint,
+        size_hint: Optional[int] = None,
+        stop: Optional[threading.Event] = None
+    ) -> None:
+        size = self._get_size(urls, checkpoint) if self._is_size_needed(size_hint, checkpoint) else None
+        segments = self._plan(size_hint, checkpoint, size)
+        if segments:
+            try:
+                self._download_segments(urls, part_path, segments, checkpoint, stop)
+                return
+            except _RangeIgnoredError:
+                # e.g. resuming a download from a server without Range support
+                pass
+        elif segments is not None:
+            # complete already
+            return
+        super()._download_part(urls, part_path, checkpoint, stop=stop)
+
+    async def _get_size_async(self, urls: Sequence[str], checkpoint: Checkpoint) -> Optional[int]:
+        failover = _Failover(urls, self.retry_policy)
+        while True:
+            try:
+                url = failover.url
+                async with AsyncProxyService.get_video_stream_response(url, 0, 0) as response:
+                    self._check_status(url, response.status_code)
+                    if response.status_code != 206:
+                        return None
+                    self._check_stream(url, response.status_code, response.headers, checkpoint)
+                    return _parse_content_range(response.headers.get('Content-Range'))[1]
+            except ASYNC_RETRYABLE_ERRORS as e:
+                delay = failover.on_error(e)
+            _record_retry()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def _fetch_segment_async(
+        self,
+        failover: _Failover,
+        sink: FileSink,
+        segment: _Segment,
+        checkpoint: Checkpoint,
+        buffer: bytearray
+    ) -> None:
+        url, start, requested_at = failover.url, segment.position, time.monotonic()
+        async with AsyncProxyService.get_video_stream_response(url, start, segment.end) as response:
+            is_started = self._start_segment(
+                url, response.status_code, response.headers, segment, checkpoint, sink
+            )
+            if not is_started:
+                return
+            with self._get_meter(failover, requested_at) as meter:
+                async for block in aiter_blocks(response, buffer, self._get_block_size()):
+                    self._write(sink, segment.position, block, checkpoint)
+                    segment.position += len(block)
+                    meter.update(len(block))
+        self._check_segment(url, segment, start)
+
+    async def _download_segment_async(
+        self,
+        urls: Sequence[str],
+        sink: FileSink,
+        segment: _Segment,
+        checkpoint: Checkpoint,
+        semaphore: asyncio.Semaphore
+    ) -> None:
+        async with semaphore:
+            failover = _Failover(self._rank(urls), self.retry_policy)
+            buffer = self._get_buffer()
+            while True:
+                try:
+                    await self._fetch_segment_async(failover, sink, segment, checkpoint, buffer)
+                    return
+                except ASYNC_RETRYABLE_ERRORS as e:
+                    delay = failover.on_error(e)
+                _record_retry()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+    async def _download_segments_async(
+        self,
+        urls: Sequence[str],
+        part_path: str,
+        segments: List[_Segment],
+        checkpoint: Checkpoint
+    ) -> None:
+        semaphore = asyncio.Semaphore(self.segments)
+        with self._open_part(part_path, checkpoint) as sink:
+            tasks = [
+                asyncio.ensure_future(
+                    self._download_segment_async(urls, sink, segment, checkpoint, semaphore)
+                )
+                for segment in segments
+            ]
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+                for task in done:
+                    task.result()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _download_part_async(
+        self,
+        urls: Sequence[str],
+        part_path: str,
+        checkpoint: Checkpoint,
+        size_hint: Optional[int] = None
+    ) -> None:
+        size = None
+        if self._is_size_needed(size_hint, checkpoint):
+            size = await self._get_size_async(urls, checkpoint)
+        segments = self._plan(size_hint, checkpoint, size)
+        if segments:
+            try:
+                await self._download_segments_async(urls, part_path, segments, checkpoint)
+                return
+            except _RangeIgnoredError:
+                pass
+        elif segments is not None:
+            return
+        await super()._download_part_async(urls, part_path, checkpoint)
@@ -0,0 +1,150 @@
+"""
+Output files written at explicit offsets by parallel writers
+"""
+import os
+import threading
+from typing import List, Optional, Tuple
+
+
+__all__ = ['Extents', 'FileSink']
+
+
+class Extents:
+    """
+    sorted and disjoint [start, end) byte ranges written, merged as they are added
+    """
+
+    def __init__(self):
+        self._ranges: List[List[int]] = []
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ranges(self) -> List[Tuple[int, int]]:
+        with self._lock:
+            return [(start, end) for start, end in self._ranges]
+
+    @property
+    def size(self) -> int:
+        """
+        bytes the ranges cover
+        """
+        return self._size
+
+    def add(self, start: int, end: int) -> None:
+        if start >= end:
+            return
+        with self._lock:
+            ranges = self._ranges
+            index = 0
+            while index < len(ranges) and ranges[index][1] < start:
+                index += 1
+            # merged with every range it overlaps or touches
+            merged = 0
+            while index < len(ranges) and ranges[index][0] <= end:
+                merged += ranges[index][1] - ranges[index][0]
+                start, end = min(start, ranges[index][0]), max(end, ranges[index][1])
+                del ranges[index]
+            ranges.insert(index, [start, end])
+            self._size += end - start - merged
+
+    def get_prefix(self) -> int:
+        """
+        bytes written from the first one without a gap
+        """
+        with self._lock:
+            return self._ranges[0][1] if self._ranges and self._ranges[0][0] == 0 else 0
+
+    def get_gaps(self, size: int) -> List[Tuple[int, int]]:
+        """
+        [start, end) ranges of the first size bytes not written yet
+        """
+        gaps = []
+        position = 0
+        for start, end in self.ranges:
+            if start > position:
+                gaps.append((position, min(start, size)))
+            position = max(position, end)
+        if position < size:
+            gaps.append((position, size))
+        return [(start, end) for start, end in gaps if start < end]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ranges.clear()
+            self._size = 0
+
+
+class FileSink:
+    """
+    File written by os.pwrite at explicit offsets, so connections fetching
+    different ranges of a stream fill it at once without seeking or locking it,
+    each block written recorded by extents.
+
+    Once the size of the stream is known, the file is preallocated by posix_fallocate,
+    so the filesystem, e.g. XFS, lays it out in few extents up front
+    instead of growing it on every write, falling back to truncate where not supported.
+    Where os.pwrite is missing, e.g. on Windows, writes seek under a lock instead
+
+    extents: where blocks written are recorded, e.g. ones of a Checkpoint
+    truncate: whether to empty the file when opening it
+    """
+
+    def __init__(self, path: str, extents: Optional[Extents] = None, truncate: bool = False):
+        self.path = path
+        self.extents = extents if extents is not None else Extents()
+        flags = os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+        if truncate:
+            flags |= os.O_TRUNC
+        self._fd = os.open(path, flags, 0o666)
+        self._allocated = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'FileSink':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def preallocate(self, size: int) -> None:
+        """
+        reserve size bytes for the file, at most once for each size
+        """
+        with self._lock:
+            if size <= self._allocated:
+                return
+            try:
+                os.posix_fallocate(self._fd, 0, size)
+            except (AttributeError, OSError):
+                # not supported by the platform or the filesystem, e.g. tmpfs of old kernels
+                if os.fstat(self._fd).st_size < size:
+                    os.ftruncate(self._fd, size)
+            self._allocated = size
+
+    def _pwrite(self, block: memoryview, offset: int) -> int:
+        if hasattr(os, 'pwrite'):
+            return os.pwrite(self._fd, block, offset)
+        with self._lock:
+            os.lseek(self._fd, offset, os.SEEK_SET)
+            return os.write(self._fd, block)
+
+    def write(self, offset: int, block: memoryview) -> None:
+        """
+        write the whole block at offset, which may take several calls
+        """
+        start, view = offset, memoryview(block)
+        while view:
+            size = self._pwrite(view, offset)
+            view = view[size:]
+            offset += size
+        self.extents.add(start, offset)
+
+    def truncate(self, size: int = 0) -> None:
+        with self._lock:
+            os.ftruncate(self._fd, size)
+            self._allocated = min(self._allocated, size)
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
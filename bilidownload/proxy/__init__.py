@@ -1,16 +1,34 @@
 """
 Bilibili API proxies module
 """
+from .account_pool import AccountPool, AccountState, NoAccountAvailableError, SessionData
+from .async_proxy_service import AsyncProxyService
+from .backend import HTTPBackend, HTTPXBackend
+from .cache import (
+    BaseResponseCache,
+    CacheStats,
+    MemoryResponseCache,
+    SqliteResponseCache,
+    TieredResponseCache
+)
 from .constants import (
     PGC_AVAILABLE_EPISODE_STATUS_CODE,
     PUGV_AVAILABLE_EPISODE_STATUS_CODE
 )
+from .dns import DNSCache
+from .expiring import ExpiringValue
+from .metrics import ProxyMetrics, RequestRecord
+from .prewarm import ConnectionPrewarmer
 from .proxy_service import ProxyService
+from .rate_limit import RateLimiter, TokenBucket
 from .schemes import (
+    GetBangumiDetailLiteResponse,
     GetBangumiDetailResponse,
     GetBangumiStreamMetaResponse,
+    GetCheeseDetailLiteResponse,
     GetCheeseDetailResponse,
     GetCheeseStreamMetaResponse,
+    GetVideoInfoLiteResponse,
     GetVideoInfoResponse,
     GetVideoStreamMetaResponse,
     GetUserInfoNotLoginData,
@@ -20,6 +38,11 @@ from .schemes import (
     GetWebCaptchaResponse,
     GetWebPublicKeyResponse,
     GetWebSPIResponse,
+    VideoDashData,
+    VideoDashMediaItemData,
     VideoStreamMetaLiteSupportFormatItemData,
     WebLoginResponse
 )
+from .session_pool import SessionPool
+from .stream_meta_cache import StreamMetaCache
+from .wbi import sign_params, WbiKeyCache
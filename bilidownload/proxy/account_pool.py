@@ -0,0 +1,159 @@
+"""
+Pool of logged-in accounts, spreading requests across their SESSDATA
+"""
+from contextlib import contextmanager
+import threading
+import time
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Union
+
+from .constants import DEFAULT_ACCOUNT_CHECK_INTERVAL, DEFAULT_ACCOUNT_THROTTLE_COOLDOWN
+
+
+__all__ = ['AccountPool', 'AccountState', 'NoAccountAvailableError', 'SessionData']
+
+
+class NoAccountAvailableError(LookupError):
+    pass
+
+
+class AccountState(NamedTuple):
+
+    session_data: str
+    is_login: Optional[bool]  # None until checked
+    is_vip: bool
+    in_flight: int            # requests being sent by the account
+    throttles: int            # throttled responses received so far
+    is_throttled: bool        # throttled within the cooldown
+
+
+class _Account:
+
+    __slots__ = ('session_data', 'is_login', 'is_vip', 'checked_at', 'in_flight', 'used_at',
+                 'throttles', 'throttled_until')
+
+    def __init__(self, session_data: str):
+        self.session_data = session_data
+        self.is_login: Optional[bool] = None
+        self.is_vip = False
+        self.checked_at = float('-inf')
+        self.in_flight = 0
+        self.used_at = float('-inf')
+        self.throttles = 0
+        self.throttled_until = float('-inf')
+
+
+class AccountPool:
+    """
+    Accounts given by their SESSDATA, passed as session_data of ProxyService,
+    AsyncProxyService or VideoService in place of a single SESSDATA.
+
+    Each request takes the least loaded eligible account, i.e. logged in,
+    a VIP one when the request needs VIP, and not throttled recently
+    unless every eligible one is. Login state and VIP of an account
+    are checked by nav every check_interval seconds.
+
+    check_interval: seconds before an account is checked again
+    throttle_cooldown: seconds a throttled account is passed over
+    """
+
+    def __init__(
+        self,
+        session_datas: Iterable[str],
+        check_interval: float = DEFAULT_ACCOUNT_CHECK_INTERVAL,
+        throttle_cooldown: float = DEFAULT_ACCOUNT_THROTTLE_COOLDOWN
+    ):
+        self._accounts = {session_data: _Account(session_data) for session_data in session_datas}
+        if not self._accounts:
+            raise ValueError('AccountPool needs at least one SESSDATA')
+        self._check_interval = check_interval
+        self._throttle_cooldown = throttle_cooldown
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._accounts)
+
+    def get_states(self) -> List[AccountState]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                AccountState(
+                    account.session_data,
+                    account.is_login,
+                    account.is_vip,
+                    account.in_flight,
+                    account.throttles,
+                    account.throttled_until > now
+                )
+                for account in self._accounts.values()
+            ]
+
+    def get_due_checks(self) -> List[str]:
+        """
+        SESSDATA of accounts due to check
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                account.session_data for account in self._accounts.values()
+                if now - account.checked_at >= self._check_interval
+            ]
+
+    def fail_check(self, session_data: str) -> None:
+        """
+        a check failed, e.g. by network errors, which is due again after the throttle cooldown
+        """
+        with self._lock:
+            self._accounts[session_data].checked_at = \
+                time.monotonic() - self._check_interval + self._throttle_cooldown
+
+    def update(self, session_data: str, is_login: bool, is_vip: bool) -> None:
+        with self._lock:
+            account = self._accounts[session_data]
+            account.is_login = is_login
+            account.is_vip = is_login and is_vip
+            account.checked_at = time.monotonic()
+
+    def _choose(self, is_vip_required: bool) -> _Account:
+        eligible = [
+            account for account in self._accounts.values()
+            if account.is_login and (account.is_vip or not is_vip_required)
+        ]
+        if not eligible:
+            required = 'VIP account' if is_vip_required else 'logged-in account'
+            raise NoAccountAvailableError(f'no {required} in the pool')
+        now = time.monotonic()
+        fresh = [account for account in eligible if account.throttled_until <= now]
+        if not fresh:
+            return min(eligible, key=lambda account: account.throttled_until)
+        # least used recently among the least loaded, so idle accounts take turns
+        return min(fresh, key=lambda account: (account.in_flight, account.used_at))
+
+    @contextmanager
+    def acquire(self, is_vip_required: bool = False) -> Iterator[str]:
+        """
+        SESSDATA of the chosen account, counted in flight until exit
+        """
+        with self._lock:
+            account = self._choose(is_vip_required)
+            account.in_flight += 1
+            account.used_at = time.monotonic()
+        try:
+            yield account.session_data
+        finally:
+            with self._lock:
+                account.in_flight -= 1
+
+    def report(self, session_data: str, is_throttled: bool) -> None:
+        """
+        outcome of a request sent by an account, a throttled one cools the account down
+        """
+        if not is_throttled:
+            return
+        with self._lock:
+            account = self._accounts[session_data]
+            account.throttles += 1
+            account.throttled_until = time.monotonic() + self._throttle_cooldown
+
+
+# what session_data of services takes, no login, SESSDATA of one, or a pool of accounts
+SessionData = Union[None, str, AccountPool]
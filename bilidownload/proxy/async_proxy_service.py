@@ -0,0 +1,755 @@
+"""
+Asynchronous Bilibili official API proxy
+"""
+import asyncio
+import concurrent.futures
+from contextlib import asynccontextmanager
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Union
+from urllib.parse import urlsplit
+
+from pydantic_core import from_json
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+from .constants import (
+    ACCOUNT_POOL_FLIGHT_PREFIX,
+    DEFAULT_ASYNC_HOST_CONCURRENCY,
+    DEFAULT_ASYNC_MAX_CONNECTIONS,
+    DEFAULT_ASYNC_MAX_KEEPALIVE,
+    ENDPOINT_BANGUMI_INFO,
+    ENDPOINT_BANGUMI_STREAM_META,
+    ENDPOINT_CHEESE_INFO,
+    ENDPOINT_CHEESE_STREAM_META,
+    ENDPOINT_VIDEO_INFO,
+    ENDPOINT_VIDEO_STREAM,
+    ENDPOINT_VIDEO_STREAM_META,
+    ENDPOINT_WEB_USER_INFO,
+    REQUEST_PGC_INFO_URL,
+    REQUEST_PGC_STREAM_META_URL,
+    REQUEST_PUGV_INFO_URL,
+    REQUEST_PUGV_STREAM_META_URL,
+    REQUEST_VIDEO_INFO_URL,
+    REQUEST_VIDEO_STREAM_META_URL,
+    REQUEST_WEB_USER_INFO_URL,
+    STREAM_CONNECT_TIMEOUT,
+    STREAM_META_REFRESH_TIMEOUT,
+    STREAM_READ_TIMEOUT,
+    THROTTLE_RESPONSE_CODES,
+    WBI_REJECTED_CODE
+)
+from .account_pool import AccountPool, SessionData
+from .proxy_service import ProxyService
+from .schemes import (
+    BaseResponseModel,
+    GetBangumiDetailResponse,
+    GetBangumiStreamMetaResponse,
+    GetCheeseDetailResponse,
+    GetCheeseStreamMetaResponse,
+    GetUserInfoLoginResponse,
+    GetUserInfoNotLoginResponse,
+    GetVideoInfoResponse,
+    GetVideoStreamMetaResponse
+)
+from .single_flight import AsyncSingleFlight
+from .stream_meta_cache import iter_stream_urls
+from .utils import sniff_response_code
+from .wbi import sign_params
+from ..constants import HEADERS, Model, ModelType, TIMEOUT
+
+
+__all__ = ['AsyncProxyService', 'HostConcurrencyLimiter']
+
+
+class HostConcurrencyLimiter:
+    """
+    Bound the count of in-flight requests per host,
+    hosts absent from host_limits share default_limit
+    """
+
+    def __init__(
+        self,
+        default_limit: int = DEFAULT_ASYNC_HOST_CONCURRENCY,
+        host_limits: Optional[Dict[str, int]] = None
+    ):
+        self._default_limit = default_limit
+        self._host_limits = dict(host_limits or {})
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def get_limit(self, host: str) -> int:
+        return self._host_limits.get(host, self._default_limit)
+
+    @asynccontextmanager
+    async def acquire(self, url: str) -> AsyncIterator[None]:
+        host = urlsplit(url).hostname or ''
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.get_limit(host)))
+        async with semaphore:
+            yield
+
+
+class _LoopClient:
+
+    __slots__ = ('client', 'limiter', 'closer')
+
+    def __init__(
+        self,
+        client: 'httpx.AsyncClient',
+        limiter: HostConcurrencyLimiter,
+        closer: AsyncIterator[None]
+    ):
+        self.client = client
+        self.limiter = limiter
+        self.closer = closer  # suspended for the life of the loop, closes the client when finalized
+
+
+class AsyncProxyService:
+    """
+    Same endpoints as ProxyService on a shared httpx.AsyncClient per event loop,
+    along with its HostConcurrencyLimiter. A client is closed on its loop
+    as the loop shuts down its async generators, e.g. at the end of asyncio.run,
+    so clients of finished loops do not pile up
+
+    Response cache is shared with ProxyService
+    """
+
+    _clients: Dict[asyncio.AbstractEventLoop, _LoopClient] = {}
+    _single_flight = AsyncSingleFlight()
+
+    _max_connections: int = DEFAULT_ASYNC_MAX_CONNECTIONS
+    _max_keepalive_connections: int = DEFAULT_ASYNC_MAX_KEEPALIVE
+    _host_limit: int = DEFAULT_ASYNC_HOST_CONCURRENCY
+    _host_limits: Dict[str, int] = {}
+    _transport_factory: Optional[Callable[[], 'httpx.AsyncBaseTransport']] = None
+    _http2: bool = False
+
+    @classmethod
+    def configure(
+        cls,
+        max_connections: int = DEFAULT_ASYNC_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_ASYNC_MAX_KEEPALIVE,
+        host_limit: int = DEFAULT_ASYNC_HOST_CONCURRENCY,
+        host_limits: Optional[Dict[str, int]] = None,
+        transport_factory: Optional[Callable[[], 'httpx.AsyncBaseTransport']] = None,
+        http2: bool = False
+    ) -> None:
+        """
+        host_limit bounds in-flight requests of any host,
+        host_limits overrides it for specific hosts, e.g. {'api.bilibili.com': 8}
+        transport_factory builds the transport of each client instead of the default one,
+        e.g. to record or replay responses
+        http2 multiplexes concurrent requests to a host on a few HTTP/2 connections,
+        which needs h2 installed, e.g. by pip install httpx[http2]
+        """
+        if any(not entry.client.is_closed for entry in list(cls._clients.values())):
+            raise RuntimeError('close the client with aclose() before configuring')
+        cls._max_connections = max_connections
+        cls._max_keepalive_connections = max_keepalive_connections
+        cls._host_limit = host_limit
+        cls._host_limits = dict(host_limits or {})
+        cls._transport_factory = transport_factory
+        cls._http2 = http2
+
+    @classmethod
+    def _build_client(cls) -> 'httpx.AsyncClient':
+        # cookies are sent per request, so the client jar never stores any
+        jar = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+        return httpx.AsyncClient(
+            http2=cls._http2,
+            cookies=jar,
+            timeout=TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=cls._max_connections,
+                max_keepalive_connections=cls._max_keepalive_connections
+            ),
+            transport=cls._transport_factory() if cls._transport_factory is not None else None
+        )
+
+    @classmethod
+    async def _close_with_loop(cls, loop: asyncio.AbstractEventLoop) -> AsyncIterator[None]:
+        try:
+            yield
+        finally:
+            entry = cls._clients.pop(loop, None)
+            if entry is not None and not entry.client.is_closed:
+                await entry.client.aclose()
+
+    @classmethod
+    async def _get_client(cls) -> _LoopClient:
+        """
+        client and limiter of the running loop, a closed client is rebuilt
+        while its limiter is kept, as requests in flight may still hold its slots
+        """
+        if httpx is None:
+            raise ImportError('httpx is required by AsyncProxyService, install bilidownload[async]')
+        for stale_loop in [item for item in cls._clients if item.is_closed()]:
+            # closed without shutting down its async generators, the client is left to be collected
+            del cls._clients[stale_loop]
+        loop = asyncio.get_running_loop()
+        entry = cls._clients.get(loop)
+        if entry is None:
+            closer = cls._close_with_loop(loop)
+            limiter = HostConcurrencyLimiter(cls._host_limit, cls._host_limits)
+            entry = cls._clients[loop] = _LoopClient(cls._build_client(), limiter, closer)
+            # started, so the loop finalizes it when shutting down its async generators
+            await closer.__anext__()
+        elif entry.client.is_closed:
+            entry.client = cls._build_client()
+        return entry
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """
+        close the client of the running loop
+        """
+        entry = cls._clients.get(asyncio.get_running_loop())
+        if entry is not None:
+            await entry.closer.aclose()
+
+    @classmethod
+    def _build_headers(
+        cls,
+        session_data: Optional[str] = None,
+        cookies: Optional[Dict[str, str]] = None
+    ) -> Dict[str, str]:
+        request_cookies = dict(cookies) if cookies else {}
+        if session_data:
+            request_cookies['SESSDATA'] = session_data
+        headers = dict(HEADERS)
+        if request_cookies:
+            headers['Cookie'] = '; '.join(f'{key}={value}' for key, value in request_cookies.items())
+        return headers
+
+    @classmethod
+    async def _check_accounts(cls, pool: AccountPool) -> None:
+        """
+        asynchronous version of ProxyService._check_accounts
+        """
+        if not pool.get_due_checks():
+            return
+
+        async def check() -> None:
+            for session_data in pool.get_due_checks():
+                try:
+                    data = (await cls.get_web_user_info_data(session_data)).data
+                except Exception:
+                    pool.fail_check(session_data)
+                    continue
+                pool.update(session_data, data.isLogin, data.isLogin and data.vipStatus == 1)
+
+        await cls._single_flight.do(f'{ACCOUNT_POOL_FLIGHT_PREFIX}{id(pool)}', check)
+
+    @classmethod
+    async def _get_pooled_data(
+        cls,
+        pool: AccountPool,
+        params: Dict[str, Any],
+        get: Callable[[str], Awaitable[Model]]
+    ) -> Model:
+        """
+        asynchronous version of ProxyService._get_pooled_data
+        """
+        await cls._check_accounts(pool)
+        with pool.acquire(ProxyService._is_vip_required(params)) as session_data:
+            dm = await get(session_data)
+        pool.report(session_data, dm.code in THROTTLE_RESPONSE_CODES)
+        return dm
+
+    @staticmethod
+    def _is_cache_blocking(cache_key: Optional[str]) -> bool:
+        """
+        whether a cache lookup or store waits on I/O, e.g. of SqliteResponseCache,
+        which then runs in a thread instead of blocking the event loop
+        """
+        cache = ProxyService.get_cache()
+        return cache is not None and cache_key is not None and cache.is_blocking
+
+    @classmethod
+    async def _load_cache(cls, endpoint: str, cache_key: Optional[str], model: ModelType) -> Optional[Model]:
+        if cls._is_cache_blocking(cache_key):
+            return await asyncio.to_thread(ProxyService._load_cache, endpoint, cache_key, model)
+        return ProxyService._load_cache(endpoint, cache_key, model)
+
+    @classmethod
+    async def _save_cache(cls, endpoint: str, cache_key: Optional[str], dm: BaseResponseModel) -> None:
+        if cls._is_cache_blocking(cache_key):
+            await asyncio.to_thread(ProxyService._save_cache, endpoint, cache_key, dm)
+        else:
+            ProxyService._save_cache(endpoint, cache_key, dm)
+
+    @classmethod
+    async def _get_data(
+        cls,
+        endpoint: str,
+        params: Dict[str, Any],
+        session_data: SessionData,
+        model: ModelType,
+        send: Callable[[Optional[str]], Awaitable['httpx.Response']],
+        is_cacheable: bool = False
+    ) -> Model:
+        """
+        concurrent calls with identical endpoint, params, login identity and model
+        share one request in flight, then its validated response
+        """
+        if isinstance(session_data, AccountPool):
+            return await cls._get_pooled_data(
+                session_data,
+                params,
+                lambda account: cls._get_data(endpoint, params, account, model, send, is_cacheable)
+            )
+        cache_key = (
+            ProxyService._get_cache_key(endpoint, params, session_data, model) if is_cacheable else None
+        )
+        dm = await cls._load_cache(endpoint, cache_key, model)
+        if dm is not None:
+            return dm
+
+        async def load() -> Model:
+            response = await send(session_data)
+            dm = ProxyService._validate_content(response.content, model)
+            await cls._save_cache(endpoint, cache_key, dm)
+            return dm
+
+        flight_key = ProxyService._get_flight_key(endpoint, params, session_data, model)
+        return await cls._single_flight.do(flight_key, load)
+
+    @classmethod
+    async def _get_stream_meta_data(
+        cls,
+        endpoint: str,
+        params: Dict[str, Any],
+        session_data: SessionData,
+        model: ModelType,
+        send: Callable[[Optional[str]], Awaitable['httpx.Response']]
+    ) -> Model:
+        """
+        asynchronous version of ProxyService._get_stream_meta_data,
+        stream hosts are warmed up by tasks on the running event loop
+        """
+        if isinstance(session_data, AccountPool):
+            return await cls._get_pooled_data(
+                session_data,
+                params,
+                lambda account: cls._get_stream_meta_data(endpoint, params, account, model, send)
+            )
+        dm = await cls._load_stream_meta_data(endpoint, params, session_data, model, send)
+        prewarmer = ProxyService.get_prewarmer()
+        if prewarmer is not None and dm.code == 0:
+            prewarmer.warm_async(iter_stream_urls(dm), cls._send_prewarm)
+        return dm
+
+    @classmethod
+    async def _load_stream_meta_data(
+        cls,
+        endpoint: str,
+        params: Dict[str, Any],
+        session_data: Optional[str],
+        model: ModelType,
+        send: Callable[[Optional[str]], Awaitable['httpx.Response']]
+    ) -> Model:
+        """
+        asynchronous version of ProxyService._load_stream_meta_data,
+        entries are refreshed on the running event loop while it lasts
+        """
+        cache = ProxyService.get_stream_meta_cache()
+        if cache is None:
+            return await cls._get_data(endpoint, params, session_data, model, send)
+        cache_key = ProxyService._get_flight_key(endpoint, params, session_data, model)
+        dm = cache.get(cache_key)
+        if dm is not None:
+            return dm
+
+        loop = asyncio.get_running_loop()
+
+        def refresh() -> Optional[Model]:
+            if loop.is_closed() or not loop.is_running():
+                return None
+            future = asyncio.run_coroutine_threadsafe(
+                cls._get_data(endpoint, params, session_data, model, send), loop
+            )
+            try:
+                dm = future.result(STREAM_META_REFRESH_TIMEOUT)
+            except concurrent.futures.TimeoutError:
+                future.cancel()
+                raise
+            return dm if dm.code == 0 else None
+
+        dm = await cls._get_data(endpoint, params, session_data, model, send)
+        if dm.code == 0:
+            cache.set(cache_key, dm, refresh)
+        return dm
+
+    @classmethod
+    async def _request(
+        cls,
+        method: str,
+        url: str,
+        endpoint: Optional[str] = None,
+        session_data: Optional[str] = None,
+        cookies: Optional[Dict[str, str]] = None,
+        **kwargs: Any
+    ) -> 'httpx.Response':
+        entry = await cls._get_client()
+        rate_limiter = ProxyService.get_rate_limiter()
+        if rate_limiter is not None:
+            await rate_limiter.acquire_async(url)
+        async with entry.limiter.acquire(url):
+            metrics = ProxyService.get_metrics() if endpoint is not None else None
+            started_at = metrics.start(endpoint) if metrics is not None else 0
+            try:
+                response = await entry.client.request(
+                    method,
+                    url,
+                    headers=cls._build_headers(session_data, cookies),
+                    **kwargs
+                )
+            except BaseException as e:
+                if metrics is not None:
+                    metrics.finish(endpoint, method, started_at, error=e)
+                raise
+        if rate_limiter is not None:
+            rate_limiter.feedback(url, response.status_code, response.content)
+        if metrics is not None:
+            request_bytes = len(response.request.content)
+            ProxyService._finish_metrics(metrics, endpoint, method, started_at, response, request_bytes)
+        return response
+
+    @classmethod
+    async def get_web_user_info(
+        cls,
+        session_data: Optional[str] = None
+    ) -> 'httpx.Response':
+        response = await cls._request(
+            'GET',
+            REQUEST_WEB_USER_INFO_URL,
+            endpoint=ENDPOINT_WEB_USER_INFO,
+            session_data=session_data
+        )
+        return response
+
+    @classmethod
+    async def get_web_user_info_data(
+        cls,
+        session_data: Optional[str] = None
+    ) -> Union[GetUserInfoLoginResponse, GetUserInfoNotLoginResponse]:
+        response = await cls.get_web_user_info(session_data)
+        data = from_json(response.content)
+        model = GetUserInfoLoginResponse
+        if data['code'] != 0:
+            model = GetUserInfoNotLoginResponse
+        return model.model_validate(data)
+
+    @classmethod
+    async def _get_mixin_key(cls) -> str:
+        """
+        asynchronous version of ProxyService._get_mixin_key, sharing its key cache
+        """
+        key_cache = ProxyService.get_wbi_key_cache()
+        mixin_key = key_cache.get()
+        if mixin_key is not None:
+            return mixin_key
+
+        async def load() -> str:
+            wbi_img = (await cls.get_web_user_info_data()).data.wbi_img
+            return key_cache.set(wbi_img.img_url, wbi_img.sub_url)
+
+        return await cls._single_flight.do(ENDPOINT_WEB_USER_INFO, load)
+
+    @classmethod
+    async def _request_wbi(
+        cls,
+        url: str,
+        endpoint: str,
+        params: Dict[str, Any],
+        session_data: Optional[str] = None
+    ) -> 'httpx.Response':
+        """
+        asynchronous version of ProxyService._request_wbi
+        """
+        response = await cls._request(
+            'GET',
+            url,
+            endpoint=endpoint,
+            session_data=session_data,
+            params=sign_params(params, await cls._get_mixin_key())
+        )
+        if sniff_response_code(response.content) != WBI_REJECTED_CODE:
+            return response
+        ProxyService.get_wbi_key_cache().invalidate()
+        return await cls._request(
+            'GET',
+            url,
+            endpoint=endpoint,
+            session_data=session_data,
+            params=sign_params(params, await cls._get_mixin_key())
+        )
+
+    @classmethod
+    async def get_video_info(
+        cls,
+        bvid: Optional[str] = None,
+        aid: Optional[int] = None,
+        session_data: Optional[str] = None
+    ) -> 'httpx.Response':
+        params = ProxyService._get_video_info_params(bvid, aid)
+        response = await cls._request(
+            'GET',
+            REQUEST_VIDEO_INFO_URL,
+            endpoint=ENDPOINT_VIDEO_INFO,
+            session_data=session_data,
+            params=params
+        )
+        return response
+
+    @classmethod
+    async def get_video_info_data(
+        cls,
+        bvid: Optional[str] = None,
+        aid: Optional[int] = None,
+        session_data: SessionData = None,
+        model: ModelType = GetVideoInfoResponse
+    ) -> Model:
+        """
+        model could be GetVideoInfoLiteResponse,
+        which only parses fields read by video components
+        """
+        return await cls._get_data(
+            ENDPOINT_VIDEO_INFO,
+            ProxyService._get_video_info_params(bvid, aid),
+            session_data,
+            model,
+            lambda session_data: cls.get_video_info(bvid, aid, session_data),
+            is_cacheable=True
+        )
+
+    @classmethod
+    async def get_video_stream_meta(
+        cls,
+        cid: int,
+        bvid: Optional[str] = None,
+        aid: Optional[int] = None,
+        qn: Optional[int] = None,
+        fnval: int = 1,
+        fourk: int = 1,
+        session_data: Optional[str] = None
+    ) -> 'httpx.Response':
+        params = ProxyService._get_video_stream_meta_params(cid, bvid, aid, qn, fnval, fourk)
+        return await cls._request_wbi(
+            REQUEST_VIDEO_STREAM_META_URL, ENDPOINT_VIDEO_STREAM_META, params, session_data
+        )
+
+    @classmethod
+    async def get_video_stream_meta_data(
+        cls,
+        cid: int,
+        bvid: Optional[str] = None,
+        aid: Optional[int] = None,
+        qn: Optional[int] = None,
+        fnval: int = 1,
+        fourk: int = 1,
+        session_data: SessionData = None
+    ) -> GetVideoStreamMetaResponse:
+        return await cls._get_stream_meta_data(
+            ENDPOINT_VIDEO_STREAM_META,
+            ProxyService._get_video_stream_meta_params(cid, bvid, aid, qn, fnval, fourk),
+            session_data,
+            GetVideoStreamMetaResponse,
+            lambda session_data: cls.get_video_stream_meta(cid, bvid, aid, qn, fnval, fourk, session_data)
+        )
+
+    @classmethod
+    async def get_bangumi_info(
+        cls,
+        ssid: Optional[int] = None,
+        epid: Optional[int] = None,
+        session_data: Optional[str] = None
+    ) -> 'httpx.Response':
+        params = ProxyService._get_bangumi_info_params(ssid, epid)
+        response = await cls._request(
+            'GET',
+            REQUEST_PGC_INFO_URL,
+            endpoint=ENDPOINT_BANGUMI_INFO,
+            session_data=session_data,
+            params=params
+        )
+        return response
+
+    @classmethod
+    async def get_bangumi_info_data(
+        cls,
+        ssid: Optional[int] = None,
+        epid: Optional[int] = None,
+        session_data: SessionData = None,
+        model: ModelType = GetBangumiDetailResponse
+    ) -> Model:
+        """
+        model could be GetBangumiDetailLiteResponse,
+        which only parses fields read by video components
+        """
+        return await cls._get_data(
+            ENDPOINT_BANGUMI_INFO,
+            ProxyService._get_bangumi_info_params(ssid, epid),
+            session_data,
+            model,
+            lambda session_data: cls.get_bangumi_info(ssid, epid, session_data),
+            is_cacheable=True
+        )
+
+    @classmethod
+    async def get_bangumi_stream_meta(
+        cls,
+        epid: int,
+        qn: Optional[int] = None,
+        fnval: int = 1,
+        fourk: int = 1,
+        session_data: Optional[str] = None
+    ) -> 'httpx.Response':
+        params = ProxyService._get_bangumi_stream_meta_params(epid, qn, fnval, fourk)
+        response = await cls._request(
+            'GET',
+            REQUEST_PGC_STREAM_META_URL,
+            endpoint=ENDPOINT_BANGUMI_STREAM_META,
+            session_data=session_data,
+            params=params
+        )
+        return response
+
+    @classmethod
+    async def get_bangumi_stream_meta_data(
+        cls,
+        epid: int,
+        qn: Optional[int] = None,
+        fnval: int = 1,
+        fourk: int = 1,
+        session_data: SessionData = None
+    ) -> GetBangumiStreamMetaResponse:
+        return await cls._get_stream_meta_data(
+            ENDPOINT_BANGUMI_STREAM_META,
+            ProxyService._get_bangumi_stream_meta_params(epid, qn, fnval, fourk),
+            session_data,
+            GetBangumiStreamMetaResponse,
+            lambda session_data: cls.get_bangumi_stream_meta(epid, qn, fnval, fourk, session_data)
+        )
+
+    @classmethod
+    async def get_cheese_info(
+        cls,
+        ssid: Optional[int] = None,
+        epid: Optional[int] = None,
+        session_data: Optional[str] = None
+    ) -> 'httpx.Response':
+        params = ProxyService._get_cheese_info_params(ssid, epid)
+        response = await cls._request(
+            'GET',
+            REQUEST_PUGV_INFO_URL,
+            endpoint=ENDPOINT_CHEESE_INFO,
+            session_data=session_data,
+            params=params
+        )
+        return response
+
+    @classmethod
+    async def get_cheese_info_data(
+        cls,
+        ssid: Optional[int] = None,
+        epid: Optional[int] = None,
+        session_data: SessionData = None,
+        model: ModelType = GetCheeseDetailResponse
+    ) -> Model:
+        """
+        model could be GetCheeseDetailLiteResponse,
+        which only parses fields read by video components
+        """
+        return await cls._get_data(
+            ENDPOINT_CHEESE_INFO,
+            ProxyService._get_cheese_info_params(ssid, epid),
+            session_data,
+            model,
+            lambda session_data: cls.get_cheese_info(ssid, epid, session_data),
+            is_cacheable=True
+        )
+
+    @classmethod
+    async def get_cheese_stream_meta(
+        cls,
+        aid: int,
+        epid: int,
+        cid: int,
+        qn: Optional[int] = None,
+        fnval: int = 1,
+        fourk: int = 1,
+        session_data: Optional[str] = None
+    ) -> 'httpx.Response':
+        params = ProxyService._get_cheese_stream_meta_params(aid, epid, cid, qn, fnval, fourk)
+        response = await cls._request(
+            'GET',
+            REQUEST_PUGV_STREAM_META_URL,
+            endpoint=ENDPOINT_CHEESE_STREAM_META,
+            session_data=session_data,
+            params=params
+        )
+        return response
+
+    @classmethod
+    async def get_cheese_stream_meta_data(
+        cls,
+        aid: int,
+        epid: int,
+        cid: int,
+        qn: Optional[int] = None,
+        fnval: int = 1,
+        fourk: int = 1,
+        session_data: SessionData = None
+    ) -> GetCheeseStreamMetaResponse:
+        return await cls._get_stream_meta_data(
+            ENDPOINT_CHEESE_STREAM_META,
+            ProxyService._get_cheese_stream_meta_params(aid, epid, cid, qn, fnval, fourk),
+            session_data,
+            GetCheeseStreamMetaResponse,
+            lambda session_data: cls.get_cheese_stream_meta(aid, epid, cid, qn, fnval, fourk, session_data)
+        )
+
+    @classmethod
+    async def _send_prewarm(cls, url: str) -> None:
+        """
+        HEAD the stream, leaving a connection to its host kept alive
+        """
+        await cls._request(
+            'HEAD',
+            url,
+            timeout=httpx.Timeout(STREAM_READ_TIMEOUT, connect=STREAM_CONNECT_TIMEOUT)
+        )
+
+    @classmethod
+    @asynccontextmanager
+    async def get_video_stream_response(
+        cls,
+        url: str,
+        start: int = 0,
+        end: Optional[int] = None
+    ) -> AsyncIterator['httpx.Response']:
+        entry = await cls._get_client()
+        async with entry.limiter.acquire(url):
+            metrics = ProxyService.get_metrics()
+            started_at = metrics.start(ENDPOINT_VIDEO_STREAM) if metrics is not None else 0
+            try:
+                async with entry.client.stream(
+                    'GET',
+                    url,
+                    headers=ProxyService._get_stream_headers(start, end),
+                    timeout=httpx.Timeout(STREAM_READ_TIMEOUT, connect=STREAM_CONNECT_TIMEOUT)
+                ) as response:
+                    if metrics is not None:
+                        ProxyService._finish_metrics(
+                            metrics, ENDPOINT_VIDEO_STREAM, 'GET', started_at, response, 0, is_stream=True
+                        )
+                        metrics = None
+                    yield response
+            except BaseException as e:
+                if metrics is not None:
+                    metrics.finish(ENDPOINT_VIDEO_STREAM, 'GET', started_at, error=e)
+                raise
@@ -0,0 +1,172 @@
+"""
+HTTP backends sending requests of ProxyService
+"""
+from abc import ABC, abstractmethod
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+import io
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple, Union
+
+import requests
+from requests import PreparedRequest, Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+from .constants import DEFAULT_HTTPX_MAX_CONNECTIONS, DEFAULT_HTTPX_MAX_KEEPALIVE
+
+
+__all__ = ['HTTPBackend', 'HTTPXBackend']
+
+
+class HTTPBackend(ABC):
+    """
+    What sends requests of ProxyService, responses are requests.Response
+    whatever the library underneath, and streamed ones are read by iter_content
+    """
+
+    @abstractmethod
+    def request(self, method: str, url: str, **kwargs: Any) -> Response:
+        """
+        kwargs are the ones of requests.request which ProxyService passes,
+        i.e. params, data, cookies, headers, timeout and stream
+        """
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+
+def _convert_error(error: 'httpx.TransportError') -> requests.RequestException:
+    """
+    exception requests raises on the same failure, which callers already handle
+    """
+    if isinstance(error, httpx.ConnectTimeout):
+        return requests.ConnectTimeout(str(error))
+    if isinstance(error, httpx.TimeoutException):
+        return requests.ReadTimeout(str(error))
+    return requests.ConnectionError(str(error))
+
+
+def _get_timeout(timeout: Union[None, float, Tuple[float, float]]) -> 'httpx.Timeout':
+    if isinstance(timeout, tuple):
+        connect_timeout, read_timeout = timeout
+        return httpx.Timeout(read_timeout, connect=connect_timeout)
+    return httpx.Timeout(timeout)
+
+
+class _HTTPXRaw:
+    """
+    body of a streamed httpx response, read by requests.Response.iter_content
+    """
+
+    def __init__(self, response: 'httpx.Response'):
+        self._response = response
+
+    def stream(self, chunk_size: Optional[int] = None, decode_content: bool = True) -> Iterator[bytes]:
+        try:
+            yield from self._response.iter_bytes(chunk_size)
+        except httpx.TransportError as e:
+            raise _convert_error(e) from e
+
+    def close(self) -> None:
+        self._response.close()
+
+
+def _to_prepared_request(request: 'httpx.Request') -> PreparedRequest:
+    prepared = PreparedRequest()
+    prepared.method = request.method
+    prepared.url = str(request.url)
+    prepared.headers = CaseInsensitiveDict(request.headers)
+    try:
+        prepared.body = request.content or None
+    except httpx.RequestNotRead:
+        prepared.body = None
+    return prepared
+
+
+def _to_requests_response(response: 'httpx.Response', stream: bool) -> Response:
+    result = Response()
+    result.status_code = response.status_code
+    result.headers = CaseInsensitiveDict(response.headers)
+    result.encoding = get_encoding_from_headers(result.headers)
+    result.reason = response.reason_phrase
+    result.url = str(response.url)
+    result.request = _to_prepared_request(response.request)
+    for cookie in response.cookies.jar:
+        result.cookies.set_cookie(cookie)
+    result.raw = _HTTPXRaw(response) if stream else io.BytesIO(response.content)
+    return result
+
+
+class HTTPXBackend(HTTPBackend):
+    """
+    Requests sent by one httpx client, over HTTP/2 when http2 is True
+    and the server supports it, so that concurrent requests to a host,
+    e.g. metadata calls or range requests to a CDN host, are multiplexed
+    on a few connections instead of taking one connection each.
+    HTTP/2 needs h2, which bilidownload[async] does not install, e.g. pip install httpx[http2]
+
+    max_connections: connections opened in total
+    max_keepalive_connections: idle connections kept alive
+    transport: replaces the default transport, which http2 then does not apply to,
+    e.g. to redirect requests to a local server
+    """
+
+    def __init__(
+        self,
+        http2: bool = False,
+        max_connections: int = DEFAULT_HTTPX_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_HTTPX_MAX_KEEPALIVE,
+        transport: Optional['httpx.BaseTransport'] = None
+    ):
+        if httpx is None:
+            raise ImportError('httpx is required by HTTPXBackend, install bilidownload[async]')
+        # cookies are sent per request, so the client jar never stores any
+        jar = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+        self._client = httpx.Client(
+            http2=http2,
+            cookies=jar,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections
+            ),
+            transport=transport
+        )
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Mapping[str, Any]] = None,
+        data: Union[None, str, bytes, Mapping[str, Any]] = None,
+        cookies: Optional[Dict[str, str]] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        timeout: Union[None, float, Tuple[float, float]] = None,
+        stream: bool = False,
+        allow_redirects: bool = True
+    ) -> Response:
+        request_headers = dict(headers or {})
+        if cookies:
+            request_headers['Cookie'] = '; '.join(f'{key}={value}' for key, value in cookies.items())
+        request = self._client.build_request(
+            method,
+            url,
+            params=params,
+            content=data if isinstance(data, (str, bytes)) else None,
+            data=data if isinstance(data, Mapping) else None,
+            headers=request_headers,
+            timeout=_get_timeout(timeout)
+        )
+        try:
+            response = self._client.send(request, stream=stream, follow_redirects=allow_redirects)
+        except httpx.TransportError as e:
+            raise _convert_error(e) from e
+        return _to_requests_response(response, stream)
+
+    def close(self) -> None:
+        self._client.close()
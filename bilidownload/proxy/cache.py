@@ -0,0 +1,471 @@
+"""
+Caches on validated proxy responses
+"""
+from abc import ABC, abstractmethod
+from collections import namedtuple, OrderedDict
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+import zlib
+
+from pydantic import BaseModel
+
+from .constants import (
+    DEFAULT_CACHE_MAX_SIZE,
+    DEFAULT_CACHE_TTL,
+    DEFAULT_CACHE_TTLS,
+    DEFAULT_PERSISTENT_CACHE_BUSY_TIMEOUT,
+    DEFAULT_PERSISTENT_CACHE_MAX_BYTES,
+    PERSISTENT_CACHE_ACCESS_RESOLUTION
+)
+from ..constants import Model, ModelType
+
+
+__all__ = [
+    'BaseResponseCache',
+    'build_cache_key',
+    'CacheStats',
+    'get_identity',
+    'MemoryResponseCache',
+    'SqliteResponseCache',
+    'TieredResponseCache'
+]
+
+
+GUEST_IDENTITY = 'guest'
+
+
+CacheStats = namedtuple('CacheStats', ['hits', 'misses', 'evictions', 'size'])
+
+
+def get_identity(session_data: Optional[str] = None) -> str:
+    """
+    digest of SESSDATA, so responses of different logins never mix
+    while the credential itself is never kept
+    """
+    if not session_data:
+        return GUEST_IDENTITY
+    return hashlib.sha256(session_data.encode('utf-8')).hexdigest()[:32]
+
+
+def build_cache_key(
+    endpoint: str,
+    params: Mapping[str, Any],
+    session_data: Optional[str] = None,
+    model_name: str = ''
+) -> str:
+    """
+    model_name tells apart entries of one response validated by different models,
+    e.g. full and projection ones
+    """
+    query = '&'.join(f'{key}={params[key]}' for key in sorted(params))
+    return f'{endpoint}:{model_name}:{get_identity(session_data)}:{query}'
+
+
+class BaseResponseCache(ABC):
+
+    # whether get and set wait on I/O, e.g. disk, so that AsyncProxyService runs them in threads
+    is_blocking = True
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_CACHE_TTL,
+        endpoint_ttls: Optional[Dict[str, float]] = None
+    ):
+        self._ttl = ttl
+        self._endpoint_ttls = dict(DEFAULT_CACHE_TTLS)
+        self._endpoint_ttls.update(endpoint_ttls or {})
+        self._counter_lock = threading.Lock()
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+        self._evictions = 0
+
+    def get_ttl(self, endpoint: str) -> float:
+        return self._endpoint_ttls.get(endpoint, self._ttl)
+
+    def _count_hit(self, endpoint: str) -> None:
+        with self._counter_lock:
+            self._hits[endpoint] = self._hits.get(endpoint, 0) + 1
+
+    def _count_miss(self, endpoint: str) -> None:
+        with self._counter_lock:
+            self._misses[endpoint] = self._misses.get(endpoint, 0) + 1
+
+    def _count_evictions(self, count: int) -> None:
+        with self._counter_lock:
+            self._evictions += count
+
+    def stats(self, endpoint: Optional[str] = None) -> CacheStats:
+        with self._counter_lock:
+            if endpoint is None:
+                hits, misses = sum(self._hits.values()), sum(self._misses.values())
+            else:
+                hits, misses = self._hits.get(endpoint, 0), self._misses.get(endpoint, 0)
+            evictions = self._evictions
+        return CacheStats(hits, misses, evictions, len(self))
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abstractmethod
+    def _lookup(self, endpoint: str, key: str, model: ModelType) -> Optional[Tuple[Model, float]]:
+        """
+        cached model of key and seconds it has left, None when absent, expired or of another model,
+        not counted in stats
+        """
+        pass
+
+    @abstractmethod
+    def _store(self, endpoint: str, key: str, value: BaseModel, ttl: float) -> None:
+        """
+        cache value for ttl seconds, which is positive
+        """
+        pass
+
+    def get(self, endpoint: str, key: str, model: ModelType) -> Optional[Model]:
+        """
+        cached model of key, None when absent, expired or of another model
+        """
+        entry = self._lookup(endpoint, key, model)
+        if entry is None:
+            self._count_miss(endpoint)
+            return None
+        self._count_hit(endpoint)
+        return entry[0]
+
+    def set(self, endpoint: str, key: str, value: BaseModel) -> None:
+        ttl = self.get_ttl(endpoint)
+        if ttl > 0:
+            self._store(endpoint, key, value, ttl)
+
+    @abstractmethod
+    def invalidate(self, key: str) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+
+class MemoryResponseCache(BaseResponseCache):
+    """
+    LRU cache of response models with TTL per endpoint
+
+    Cached models are shared by every caller who hits them,
+    so they should be treated as read-only
+
+    max_size: maximum count of entries, least recently used ones are evicted
+    ttl: seconds an entry lives, for endpoints absent from endpoint_ttls
+    endpoint_ttls: seconds an entry lives per endpoint
+    """
+
+    is_blocking = False
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_CACHE_MAX_SIZE,
+        ttl: float = DEFAULT_CACHE_TTL,
+        endpoint_ttls: Optional[Dict[str, float]] = None
+    ):
+        super().__init__(ttl, endpoint_ttls)
+        self._max_size = max_size
+        self._entries: 'OrderedDict[str, Tuple[float, BaseModel]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, endpoint: str, key: str, model: ModelType) -> Optional[Tuple[Model, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            ttl = expires_at - time.monotonic()
+            if ttl > 0 and isinstance(value, model):
+                self._entries.move_to_end(key)
+                return value, ttl
+            del self._entries[key]
+        return None
+
+    def _store(self, endpoint: str, key: str, value: BaseModel, ttl: float) -> None:
+        evictions = 0
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                evictions += 1
+        if evictions:
+            self._count_evictions(evictions)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SqliteResponseCache(BaseResponseCache):
+    """
+    Response models persisted as (optionally zlib compressed) JSON in SQLite,
+    so they survive restarts and are shared by processes on the same node
+
+    The database runs in WAL mode, readers never block each other,
+    and writers from other processes are waited for up to busy_timeout.
+    Bytes stored are totalled by triggers in a one-row table, so a store does not sum the whole cache
+
+    path: file of the database
+    max_bytes: cap on stored payload bytes, least recently used entries are evicted
+    compress: compress payloads with zlib or not
+    """
+
+    _SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS response_cache ('
+        'key TEXT PRIMARY KEY, '
+        'endpoint TEXT NOT NULL, '
+        'model TEXT NOT NULL, '
+        'payload BLOB NOT NULL, '
+        'compressed INTEGER NOT NULL, '
+        'size INTEGER NOT NULL, '
+        'expires_at REAL NOT NULL, '
+        'accessed_at REAL NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS ix_response_cache_accessed_at ON response_cache (accessed_at)',
+        'CREATE INDEX IF NOT EXISTS ix_response_cache_expires_at ON response_cache (expires_at)',
+        'CREATE TABLE IF NOT EXISTS response_cache_meta ('
+        'id INTEGER PRIMARY KEY CHECK (id = 0), '
+        'total_size INTEGER NOT NULL)',
+        # seeded once, by the sum of entries a database made before the total was kept already holds
+        'INSERT OR IGNORE INTO response_cache_meta (id, total_size) '
+        'SELECT 0, COALESCE(SUM(size), 0) FROM response_cache',
+        'CREATE TRIGGER IF NOT EXISTS tr_response_cache_insert AFTER INSERT ON response_cache BEGIN '
+        'UPDATE response_cache_meta SET total_size = total_size + NEW.size WHERE id = 0; END',
+        'CREATE TRIGGER IF NOT EXISTS tr_response_cache_delete AFTER DELETE ON response_cache BEGIN '
+        'UPDATE response_cache_meta SET total_size = total_size - OLD.size WHERE id = 0; END',
+        'CREATE TRIGGER IF NOT EXISTS tr_response_cache_update AFTER UPDATE OF size ON response_cache BEGIN '
+        'UPDATE response_cache_meta SET total_size = total_size - OLD.size + NEW.size WHERE id = 0; END'
+    )
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = DEFAULT_PERSISTENT_CACHE_MAX_BYTES,
+        ttl: float = DEFAULT_CACHE_TTL,
+        endpoint_ttls: Optional[Dict[str, float]] = None,
+        compress: bool = True,
+        busy_timeout: float = DEFAULT_PERSISTENT_CACHE_BUSY_TIMEOUT
+    ):
+        super().__init__(ttl, endpoint_ttls)
+        self._path = path
+        self._max_bytes = max_bytes
+        self._compress = compress
+        self._busy_timeout = busy_timeout
+        self._local = threading.local()
+        # every connection opened, by the thread it belongs to, so close() reaches all of them
+        self._connections: List[Tuple[threading.Thread, sqlite3.Connection]] = []
+        self._connections_lock = threading.Lock()
+        self._generation = 0  # bumped by close(), so threads open new connections after it
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._get_connection()
+        connection.execute('PRAGMA journal_mode=WAL')
+        with self._transaction() as conn:
+            for statement in self._SCHEMA:
+                conn.execute(statement)
+
+    def _get_connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.generation == self._generation:
+            return connection
+        # autocommit mode, transactions are opened explicitly.
+        # Used by its own thread alone, while close() may close it from another
+        connection = sqlite3.connect(
+            self._path, timeout=self._busy_timeout, isolation_level=None, check_same_thread=False
+        )
+        connection.execute('PRAGMA synchronous=NORMAL')
+        with self._connections_lock:
+            # connections of threads gone, e.g. of finished thread pools, are closed as new ones open
+            alive = []
+            for thread, item in self._connections:
+                if thread.is_alive():
+                    alive.append((thread, item))
+                else:
+                    item.close()
+            alive.append((threading.current_thread(), connection))
+            self._connections = alive
+            self._local.connection, self._local.generation = connection, self._generation
+        return connection
+
+    def _transaction(self) -> '_ImmediateTransaction':
+        return _ImmediateTransaction(self._get_connection())
+
+    def __len__(self) -> int:
+        row = self._get_connection().execute('SELECT COUNT(*) FROM response_cache').fetchone()
+        return row[0]
+
+    def _encode(self, value: BaseModel) -> bytes:
+        payload = value.model_dump_json(by_alias=True).encode('utf-8')
+        if self._compress:
+            payload = zlib.compress(payload)
+        return payload
+
+    def _lookup(self, endpoint: str, key: str, model: ModelType) -> Optional[Tuple[Model, float]]:
+        connection = self._get_connection()
+        row = connection.execute(
+            'SELECT model, payload, compressed, expires_at, accessed_at FROM response_cache WHERE key = ?',
+            (key,)
+        ).fetchone()
+        now = time.time()
+        if row is None:
+            return None
+        model_name, payload, compressed, expires_at, accessed_at = row
+        if expires_at <= now:
+            with self._transaction() as conn:
+                conn.execute('DELETE FROM response_cache WHERE key = ? AND expires_at <= ?', (key, now))
+            return None
+        if model_name != model.__name__:
+            return None
+        # recency is coarse grained, so hot entries do not take the write lock on every read
+        if now - accessed_at >= PERSISTENT_CACHE_ACCESS_RESOLUTION:
+            with self._transaction() as conn:
+                conn.execute('UPDATE response_cache SET accessed_at = ? WHERE key = ?', (now, key))
+        if compressed:
+            payload = zlib.decompress(payload)
+        return model.model_validate_json(payload), expires_at - now
+
+    def _store(self, endpoint: str, key: str, value: BaseModel, ttl: float) -> None:
+        payload = self._encode(value)
+        if len(payload) > self._max_bytes:
+            return
+        now = time.time()
+        with self._transaction() as conn:
+            # deleted explicitly, as the delete trigger does not fire on rows REPLACE removes
+            conn.execute('DELETE FROM response_cache WHERE key = ?', (key,))
+            conn.execute(
+                'INSERT INTO response_cache '
+                '(key, endpoint, model, payload, compressed, size, expires_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, endpoint, type(value).__name__, payload, int(self._compress), len(payload), now + ttl, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute('DELETE FROM response_cache WHERE expires_at <= ?', (now,))
+        total_size, = conn.execute('SELECT total_size FROM response_cache_meta WHERE id = 0').fetchone()
+        if total_size <= self._max_bytes:
+            return
+        excess = total_size - self._max_bytes
+        evicted_keys: List[str] = []
+        for key, size in conn.execute('SELECT key, size FROM response_cache ORDER BY accessed_at'):
+            evicted_keys.append(key)
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany('DELETE FROM response_cache WHERE key = ?', [(key,) for key in evicted_keys])
+        self._count_evictions(len(evicted_keys))
+
+    def invalidate(self, key: str) -> None:
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM response_cache WHERE key = ?', (key,))
+
+    def clear(self) -> None:
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM response_cache')
+
+    def close(self) -> None:
+        """
+        close connections of every thread, ones used after it are opened again
+        """
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            self._generation += 1
+        for _, connection in connections:
+            connection.close()
+
+
+class _ImmediateTransaction:
+    """
+    take the write lock upfront, so concurrent writers queue on busy_timeout
+    instead of failing on lock upgrade
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._connection = connection
+
+    def __enter__(self) -> sqlite3.Connection:
+        self._connection.execute('BEGIN IMMEDIATE')
+        return self._connection
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self._connection.execute('COMMIT')
+        else:
+            self._connection.execute('ROLLBACK')
+
+
+class TieredResponseCache(BaseResponseCache):
+    """
+    Caches looked up in order, e.g. memory in front of SQLite,
+    entries found in a later tier are copied into the earlier ones for the time they have left.
+    Each lookup counts once in stats of the tiered cache, none in stats of its tiers
+    """
+
+    def __init__(self, *tiers: BaseResponseCache):
+        super().__init__()
+        self._tiers = tiers
+
+    @property
+    def is_blocking(self) -> bool:
+        return any(tier.is_blocking for tier in self._tiers)
+
+    def __len__(self) -> int:
+        return len(self._tiers[0]) if self._tiers else 0
+
+    def get_ttl(self, endpoint: str) -> float:
+        return self._tiers[-1].get_ttl(endpoint) if self._tiers else 0
+
+    def _lookup(self, endpoint: str, key: str, model: ModelType) -> Optional[Tuple[Model, float]]:
+        for index, tier in enumerate(self._tiers):
+            entry = tier._lookup(endpoint, key, model)
+            if entry is not None:
+                value, ttl = entry
+                self._promote(self._tiers[:index], endpoint, key, value, ttl)
+                return entry
+        return None
+
+    def _promote(
+        self,
+        tiers: Sequence[BaseResponseCache],
+        endpoint: str,
+        key: str,
+        value: BaseModel,
+        ttl: float
+    ) -> None:
+        """
+        copy an entry into tiers, expiring no later than it does, nor than their own TTL allows
+        """
+        for tier in tiers:
+            tier_ttl = min(ttl, tier.get_ttl(endpoint))
+            if tier_ttl > 0:
+                tier._store(endpoint, key, value, tier_ttl)
+
+    def _store(self, endpoint: str, key: str, value: BaseModel, ttl: float) -> None:
+        self._promote(self._tiers, endpoint, key, value, ttl)
+
+    def set(self, endpoint: str, key: str, value: BaseModel) -> None:
+        for tier in self._tiers:
+            tier.set(endpoint, key, value)
+
+    def invalidate(self, key: str) -> None:
+        for tier in self._tiers:
+            tier.invalidate(key)
+
+    def clear(self) -> None:
+        for tier in self._tiers:
+            tier.clear()
@@ -3,6 +3,8 @@ Proxy requests constants
 """
 
 
+REQUEST_API_HOST = 'api.bilibili.com'
+REQUEST_PASSPORT_HOST = 'passport.bilibili.com'
 REQUEST_PGC_INFO_URL = 'https://api.bilibili.com/pgc/view/web/season'
 REQUEST_PGC_STREAM_META_URL = 'https://api.bilibili.com/pgc/player/web/playurl'
 REQUEST_PUGV_INFO_URL = 'https://api.bilibili.com/pugv/view/web/season'
@@ -18,5 +20,117 @@ REQUEST_WEB_SPI_URL = 'https://api.bilibili.com/x/frontend/finger/spi'
 REQUEST_WEB_USER_INFO_URL = 'https://api.bilibili.com/x/web-interface/nav'
 
 
+ENDPOINT_BANGUMI_INFO = 'bangumi_info'
+ENDPOINT_BANGUMI_STREAM_META = 'bangumi_stream_meta'
+ENDPOINT_CHEESE_INFO = 'cheese_info'
+ENDPOINT_CHEESE_STREAM_META = 'cheese_stream_meta'
+ENDPOINT_VIDEO_INFO = 'video_info'
+ENDPOINT_VIDEO_STREAM = 'video_stream'            # media streams on CDN
+ENDPOINT_VIDEO_STREAM_META = 'video_stream_meta'
+ENDPOINT_WEB_CAPTCHA = 'web_captcha'
+ENDPOINT_WEB_LOGIN = 'web_login'
+ENDPOINT_WEB_PUBLIC_KEY = 'web_public_key'
+ENDPOINT_WEB_SPI = 'web_spi'
+ENDPOINT_WEB_USER_INFO = 'web_user_info'
+
+
 PGC_AVAILABLE_EPISODE_STATUS_CODE = 2  # 13 is not available
 PUGV_AVAILABLE_EPISODE_STATUS_CODE = 1  # 2 is not available
+
+
+DEFAULT_SESSION_POOL_SIZE = 8         # idle sessions kept for reuse
+DEFAULT_POOL_CONNECTIONS = 4          # hosts whose connections are cached per session
+DEFAULT_POOL_MAXSIZE = 8              # keep-alive connections per host per session
+DEFAULT_SESSION_LIFETIME = 300        # seconds before a session is retired
+DEFAULT_HTTPX_MAX_CONNECTIONS = 32    # connections opened by HTTPXBackend, each multiplexes many over HTTP/2
+DEFAULT_HTTPX_MAX_KEEPALIVE = 8       # idle connections kept alive by HTTPXBackend
+HTTP_BACKEND_REQUESTS = 'requests'
+HTTP_BACKEND_HTTPX = 'httpx'
+
+
+STREAM_CONNECT_TIMEOUT = 5            # seconds to connect to a media stream host
+STREAM_READ_TIMEOUT = 30              # seconds without receiving stream bytes
+
+
+DEFAULT_DNS_CACHE_TTL = 300           # seconds addresses of a host are kept
+DEFAULT_DNS_CACHE_MAX_SIZE = 256      # hosts kept by DNS cache
+DEFAULT_PREWARM_INTERVAL = 30         # seconds before a warmed stream host is warmed again
+DEFAULT_PREWARM_MAX_WORKERS = 4       # threads warming stream hosts at a time
+PREWARM_MAX_HOSTS = 1024              # warmed hosts remembered before expired ones are forgotten
+
+
+DEFAULT_ASYNC_MAX_CONNECTIONS = 256   # connections opened by the asynchronous client in total
+DEFAULT_ASYNC_MAX_KEEPALIVE = 64      # idle connections kept alive by the asynchronous client
+DEFAULT_ASYNC_HOST_CONCURRENCY = 32   # in-flight requests per host
+
+
+DEFAULT_CACHE_MAX_SIZE = 1024         # entries kept by memory cache
+DEFAULT_CACHE_TTL = 300               # seconds, for endpoints absent from DEFAULT_CACHE_TTLS
+DEFAULT_CACHE_TTLS = {
+    ENDPOINT_VIDEO_INFO: 300,
+    ENDPOINT_BANGUMI_INFO: 600,
+    ENDPOINT_CHEESE_INFO: 600
+}
+
+
+DEFAULT_STREAM_META_CACHE_MAX_SIZE = 256   # entries kept by stream meta cache
+DEFAULT_STREAM_META_EXPIRY_MARGIN = 60     # seconds before the deadline of URLs an entry stops being served
+DEFAULT_STREAM_META_TTL = 120              # seconds an entry is served when its URLs carry no deadline
+DEFAULT_STREAM_META_REFRESH_AHEAD = 300    # seconds before expiry an entry in use is refreshed
+DEFAULT_STREAM_META_KEEP_FRESH = 1800      # seconds since last use an entry is still kept refreshed
+STREAM_META_REFRESH_TIMEOUT = 30           # seconds waiting for a refresh on an event loop
+STREAM_URL_DEADLINE_PARAM = 'deadline'     # query parameter of stream URLs, Unix time they expire at
+
+
+DEFAULT_PERSISTENT_CACHE_MAX_BYTES = 256 * 1024 * 1024  # compressed payload bytes kept on disk
+DEFAULT_PERSISTENT_CACHE_BUSY_TIMEOUT = 30              # seconds waiting for locks held by other processes
+PERSISTENT_CACHE_ACCESS_RESOLUTION = 60                 # seconds between recency updates of an entry
+
+
+RATE_LIMIT_FAMILY_API = 'api'
+RATE_LIMIT_FAMILY_PASSPORT = 'passport'
+RATE_LIMIT_FAMILY_PGC = 'pgc'
+RATE_LIMIT_FAMILY_PUGV = 'pugv'
+DEFAULT_RATE_LIMITS = {                    # initial and maximum requests per second
+    RATE_LIMIT_FAMILY_API: 20,
+    RATE_LIMIT_FAMILY_PASSPORT: 2,
+    RATE_LIMIT_FAMILY_PGC: 10,
+    RATE_LIMIT_FAMILY_PUGV: 10
+}
+DEFAULT_RATE_LIMIT_MIN_RATE = 0.5          # requests per second kept however throttled
+DEFAULT_RATE_LIMIT_ADDITIVE_INCREASE = 1   # requests per second regained per second of successes
+DEFAULT_RATE_LIMIT_MULTIPLICATIVE_DECREASE = 0.5
+DEFAULT_RATE_LIMIT_DECREASE_COOLDOWN = 1   # seconds between two decreases
+THROTTLE_STATUS_CODES = (412, 429)
+THROTTLE_RESPONSE_CODES = (-412, -509, -799)  # request is blocked, or too frequent
+
+
+METRICS_NAMESPACE = 'bilidownload'
+DEFAULT_METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # seconds
+DEFAULT_METRICS_SIZE_BUCKETS = tuple(1024 * 4 ** exponent for exponent in range(9))       # 1 KiB to 64 MiB
+
+
+DEFAULT_WBI_KEY_TTL = 3600                 # seconds mixin key is used before fetched from nav again
+WBI_MIXIN_KEY_LENGTH = 32
+WBI_MIXIN_KEY_ENC_TAB = (                  # positions in img key followed by sub key picking the mixin key
+    46, 47, 18, 2, 53, 8, 23, 32, 15, 50, 10, 31, 58, 3, 45, 35, 27, 43, 5, 49,
+    33, 9, 42, 19, 29, 28, 14, 39, 12, 38, 41, 13, 37, 48, 7, 16, 24, 55, 40,
+    61, 26, 17, 0, 1, 60, 51, 30, 4, 22, 25, 54, 21, 56, 59, 6, 63, 57, 62, 11,
+    36, 20, 34, 44, 52
+)
+WBI_FILTERED_CHARS = "!'()*"               # stripped from values before signing
+WBI_TIMESTAMP_PARAM = 'wts'
+WBI_SIGNATURE_PARAM = 'w_rid'
+WBI_REJECTED_CODE = -403                   # response code of a request signed by outdated keys
+
+
+DEFAULT_WEB_SPI_TTL = 24 * 3600               # seconds buvid cookies from SPI are reused across logins
+DEFAULT_WEB_PUBLIC_KEY_TTL = 20               # seconds public key and salt are reused, the salt expires soon
+LOGIN_FINGERPRINT_REJECTED_CODES = (-352,)    # login blocked by risk control, buvid cookies are minted again
+LOGIN_KEY_EXPIRED_CODES = (-662,)             # login with an expired salt, public key is fetched again
+
+
+DEFAULT_ACCOUNT_CHECK_INTERVAL = 600          # seconds before an account is checked again
+DEFAULT_ACCOUNT_THROTTLE_COOLDOWN = 60        # seconds a throttled account is passed over
+VIP_MIN_QN = 112                              # qn of 1080P+ and above, streams only VIP accounts get
+ACCOUNT_POOL_FLIGHT_PREFIX = 'account_pool:'  # single flight key of checking accounts of a pool
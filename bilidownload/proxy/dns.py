@@ -0,0 +1,165 @@
+"""
+In-process DNS cache, shared by connections of every session
+"""
+import ipaddress
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+from .constants import DEFAULT_DNS_CACHE_MAX_SIZE, DEFAULT_DNS_CACHE_TTL
+
+
+__all__ = ['DNSCache', 'DNSCacheAdapter', 'get_dns_cache', 'set_dns_cache']
+
+
+def _is_ip_address(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+    except ValueError:
+        return False
+    return True
+
+
+class DNSCache:
+    """
+    Addresses of hosts kept for ttl seconds, so connections to a host,
+    e.g. a CDN host of every stream, skip resolving it again.
+    An address failing to connect is dropped, the next one is taken
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_DNS_CACHE_TTL,
+        max_size: int = DEFAULT_DNS_CACHE_MAX_SIZE
+    ):
+        self._ttl = ttl
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, int], Tuple[float, List[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, host: str, port: int) -> List[str]:
+        results = socket.getaddrinfo(host, port, allowed_gai_family(), socket.SOCK_STREAM)
+        return list(dict.fromkeys(sockaddr[0] for *_, sockaddr in results))
+
+    def resolve(self, host: str, port: int) -> Optional[str]:
+        """
+        an address of host, None when host is an address itself or fails to be resolved
+        """
+        if _is_ip_address(host):
+            return None
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now and entry[1]:
+                return entry[1][0]
+        try:
+            addresses = self._lookup(host, port)
+        except OSError:
+            return None
+        if not addresses:
+            return None
+        with self._lock:
+            if len(self._entries) >= self._max_size:
+                self._prune(now)
+            self._entries[key] = (now + self._ttl, addresses)
+        return addresses[0]
+
+    def _prune(self, now: float) -> None:
+        for key in [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+        while len(self._entries) >= self._max_size:
+            del self._entries[next(iter(self._entries))]
+
+    def discard(self, host: str, port: int, address: str) -> None:
+        """
+        drop an address which fails to connect
+        """
+        with self._lock:
+            entry = self._entries.get((host, port))
+            if entry is not None and address in entry[1]:
+                entry[1].remove(address)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_dns_cache: Optional[DNSCache] = DNSCache()
+
+
+def get_dns_cache() -> Optional[DNSCache]:
+    return _dns_cache
+
+
+def set_dns_cache(cache: Optional[DNSCache]) -> None:
+    """
+    replace the process-wide DNS cache, None disables it
+    """
+    global _dns_cache
+    _dns_cache = cache
+
+
+class _CachedDNSConnectionMixin:
+    """
+    connect to an address from the DNS cache, while TLS still verifies the host name
+    """
+
+    _dns_host: str
+    port: int
+
+    def _new_conn(self):
+        cache = _dns_cache
+        host = self._dns_host
+        address = cache.resolve(host, self.port) if cache is not None else None
+        if address is None:
+            return super()._new_conn()
+        self._dns_host = address
+        try:
+            return super()._new_conn()
+        except (ConnectTimeoutError, NewConnectionError):
+            cache.discard(host, self.port, address)
+            raise
+        finally:
+            self._dns_host = host
+
+
+class _CachedDNSHTTPConnection(_CachedDNSConnectionMixin, HTTPConnection):
+    pass
+
+
+class _CachedDNSHTTPSConnection(_CachedDNSConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _CachedDNSHTTPConnectionPool(HTTPConnectionPool):
+
+    ConnectionCls = _CachedDNSHTTPConnection
+
+
+class _CachedDNSHTTPSConnectionPool(HTTPSConnectionPool):
+
+    ConnectionCls = _CachedDNSHTTPSConnection
+
+
+class DNSCacheAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connections resolve hosts by the process-wide DNS cache
+    """
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CachedDNSHTTPConnectionPool,
+            'https': _CachedDNSHTTPSConnectionPool
+        }
@@ -0,0 +1,39 @@
+"""
+A value loaded once and reused until it expires
+"""
+import threading
+import time
+from typing import Callable, Generic, Optional, TypeVar
+
+
+__all__ = ['ExpiringValue']
+
+
+T = TypeVar('T')
+
+
+class ExpiringValue(Generic[T]):
+    """
+    Value returned by load kept for ttl seconds, concurrent callers share one load,
+    e.g. fingerprint cookies or a public key every login would otherwise request
+    """
+
+    def __init__(self, ttl: float):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+        self._expires_at = 0.0
+
+    def get(self, load: Callable[[], T]) -> T:
+        with self._lock:
+            if self._value is None or self._expires_at <= time.monotonic():
+                self._value = load()
+                self._expires_at = time.monotonic() + self._ttl
+            return self._value
+
+    def invalidate(self) -> None:
+        """
+        drop the value, e.g. when the server rejects it, so the next get loads it again
+        """
+        with self._lock:
+            self._value = None
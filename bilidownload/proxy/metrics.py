@@ -0,0 +1,217 @@
+"""
+Metrics of proxy requests, exported in Prometheus text format or to listeners
+"""
+from bisect import bisect_left
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .constants import (
+    DEFAULT_METRICS_LATENCY_BUCKETS,
+    DEFAULT_METRICS_SIZE_BUCKETS,
+    METRICS_NAMESPACE
+)
+
+
+__all__ = ['ProxyMetrics', 'RequestRecord']
+
+
+class RequestRecord(NamedTuple):
+
+    endpoint: str
+    method: str
+    duration: float                 # seconds until response headers, or the error
+    status_code: Optional[int] = None
+    code: Optional[int] = None      # code field of API response, None for streams
+    request_bytes: int = 0
+    response_bytes: int = 0         # Content-Length for streams
+    error: Optional[str] = None     # type name of the exception raised
+
+
+class _Histogram:
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _format_labels(**labels: object) -> str:
+    return ','.join(f'{key}="{value}"' for key, value in labels.items())
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class ProxyMetrics:
+    """
+    Per endpoint latency and response size histograms, request bytes,
+    status, response code and error counters, retries and in-flight gauges.
+
+    Each finished request is also passed to listeners as a RequestRecord,
+    e.g. to forward them to another metrics system.
+    """
+
+    def __init__(
+        self,
+        latency_buckets: Sequence[float] = DEFAULT_METRICS_LATENCY_BUCKETS,
+        size_buckets: Sequence[float] = DEFAULT_METRICS_SIZE_BUCKETS,
+        listeners: Optional[List[Callable[[RequestRecord], None]]] = None
+    ):
+        self._latency_buckets = tuple(sorted(latency_buckets))
+        self._size_buckets = tuple(sorted(size_buckets))
+        self._listeners = list(listeners or [])
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, _Histogram] = {}
+        self._sizes: Dict[str, _Histogram] = {}
+        self._request_bytes: Dict[str, int] = {}
+        self._statuses: Dict[Tuple[str, int], int] = {}
+        self._codes: Dict[Tuple[str, int], int] = {}
+        self._errors: Dict[Tuple[str, str], int] = {}
+        self._retries: Dict[str, int] = {}
+        self._in_flight: Dict[str, int] = {}
+
+    def add_listener(self, listener: Callable[[RequestRecord], None]) -> None:
+        self._listeners.append(listener)
+
+    def start(self, endpoint: str) -> float:
+        """
+        count a request of endpoint in flight, the time it starts
+        """
+        with self._lock:
+            self._in_flight[endpoint] = self._in_flight.get(endpoint, 0) + 1
+        return time.perf_counter()
+
+    def finish(
+        self,
+        endpoint: str,
+        method: str,
+        started_at: float,
+        status_code: Optional[int] = None,
+        code: Optional[int] = None,
+        request_bytes: int = 0,
+        response_bytes: int = 0,
+        error: Optional[BaseException] = None
+    ) -> RequestRecord:
+        record = RequestRecord(
+            endpoint=endpoint,
+            method=method,
+            duration=time.perf_counter() - started_at,
+            status_code=status_code,
+            code=code,
+            request_bytes=request_bytes,
+            response_bytes=response_bytes,
+            error=type(error).__name__ if error is not None else None
+        )
+        with self._lock:
+            self._in_flight[endpoint] -= 1
+            if endpoint not in self._latencies:
+                self._latencies[endpoint] = _Histogram(self._latency_buckets)
+                self._sizes[endpoint] = _Histogram(self._size_buckets)
+            self._latencies[endpoint].observe(record.duration)
+            self._request_bytes[endpoint] = self._request_bytes.get(endpoint, 0) + request_bytes
+            if record.error is not None:
+                key = (endpoint, record.error)
+                self._errors[key] = self._errors.get(key, 0) + 1
+            else:
+                self._sizes[endpoint].observe(response_bytes)
+                key = (endpoint, status_code)
+                self._statuses[key] = self._statuses.get(key, 0) + 1
+            if code is not None:
+                key = (endpoint, code)
+                self._codes[key] = self._codes.get(key, 0) + 1
+        for listener in self._listeners:
+            listener(record)
+        return record
+
+    def record_retry(self, endpoint: str) -> None:
+        with self._lock:
+            self._retries[endpoint] = self._retries.get(endpoint, 0) + 1
+
+    def _export_histograms(
+        self,
+        name: str,
+        help_text: str,
+        histograms: Dict[str, _Histogram]
+    ) -> List[str]:
+        lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for endpoint, histogram in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                labels = _format_labels(endpoint=endpoint, le=_format_number(bound))
+                lines.append(f'{name}_bucket{{{labels}}} {cumulative}')
+            labels = _format_labels(endpoint=endpoint, le='+Inf')
+            lines.append(f'{name}_bucket{{{labels}}} {histogram.count}')
+            labels = _format_labels(endpoint=endpoint)
+            lines.append(f'{name}_sum{{{labels}}} {_format_number(histogram.sum)}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+        return lines
+
+    def _export_values(
+        self,
+        name: str,
+        metric_type: str,
+        help_text: str,
+        label_names: Sequence[str],
+        values: Dict
+    ) -> List[str]:
+        lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}']
+        for key, value in sorted(values.items()):
+            key = key if isinstance(key, tuple) else (key,)
+            labels = _format_labels(**dict(zip(label_names, key)))
+            lines.append(f'{name}{{{labels}}} {value}')
+        return lines
+
+    def export_prometheus(self) -> str:
+        with self._lock:
+            lines = [
+                *self._export_histograms(
+                    f'{METRICS_NAMESPACE}_request_duration_seconds',
+                    'Seconds until response headers are received.',
+                    self._latencies
+                ),
+                *self._export_histograms(
+                    f'{METRICS_NAMESPACE}_response_size_bytes',
+                    'Bytes of response bodies.',
+                    self._sizes
+                ),
+                *self._export_values(
+                    f'{METRICS_NAMESPACE}_request_size_bytes_total', 'counter',
+                    'Bytes of request bodies.',
+                    ('endpoint',), self._request_bytes
+                ),
+                *self._export_values(
+                    f'{METRICS_NAMESPACE}_responses_total', 'counter',
+                    'Responses by HTTP status code.',
+                    ('endpoint', 'status'), self._statuses
+                ),
+                *self._export_values(
+                    f'{METRICS_NAMESPACE}_response_codes_total', 'counter',
+                    'API responses by code field.',
+                    ('endpoint', 'code'), self._codes
+                ),
+                *self._export_values(
+                    f'{METRICS_NAMESPACE}_request_errors_total', 'counter',
+                    'Requests failed without response by exception type.',
+                    ('endpoint', 'error'), self._errors
+                ),
+                *self._export_values(
+                    f'{METRICS_NAMESPACE}_retries_total', 'counter',
+                    'Retried tries.',
+                    ('endpoint',), self._retries
+                ),
+                *self._export_values(
+                    f'{METRICS_NAMESPACE}_requests_in_flight', 'gauge',
+                    'Requests waiting for response headers.',
+                    ('endpoint',), self._in_flight
+                )
+            ]
+        return '\n'.join(lines) + '\n'
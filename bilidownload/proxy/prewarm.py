@@ -0,0 +1,118 @@
+"""
+Warm up DNS and connections of stream hosts ahead of downloading
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from .constants import DEFAULT_PREWARM_INTERVAL, DEFAULT_PREWARM_MAX_WORKERS, PREWARM_MAX_HOSTS
+from .dns import get_dns_cache
+
+
+__all__ = ['ConnectionPrewarmer']
+
+
+class ConnectionPrewarmer:
+    """
+    Resolve the host of each stream URL and open a connection to it in background,
+    by sending it a request through send, e.g. a HEAD one, whose connection is kept alive
+    by the HTTP backend, so the download starts without paying for DNS, TCP and TLS.
+
+    A host is warmed at most once per interval seconds, however many URLs point to it
+
+    interval: seconds before a warmed host is warmed again
+    max_workers: threads warming hosts at a time
+    """
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_PREWARM_INTERVAL,
+        max_workers: int = DEFAULT_PREWARM_MAX_WORKERS
+    ):
+        self._interval = interval
+        self._max_workers = max_workers
+        self._lock = threading.Lock()
+        self._warmed_at: Dict[Tuple[str, str], float] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: Set['asyncio.Task'] = set()
+
+    def _pick(self, urls: Iterable[str]) -> List[str]:
+        """
+        one URL per host due to warm, marked warmed
+        """
+        picked: Dict[Tuple[str, str], str] = {}
+        now = time.monotonic()
+        with self._lock:
+            for url in urls:
+                parts = urlsplit(url)
+                key = (parts.scheme, parts.netloc)
+                if key in picked or now - self._warmed_at.get(key, float('-inf')) < self._interval:
+                    continue
+                picked[key] = url
+            for key in picked:
+                self._warmed_at[key] = now
+            if len(self._warmed_at) > PREWARM_MAX_HOSTS:
+                self._warmed_at = {
+                    key: warmed_at for key, warmed_at in self._warmed_at.items()
+                    if now - warmed_at < self._interval
+                }
+        return list(picked.values())
+
+    def _resolve(self, url: str) -> None:
+        cache = get_dns_cache()
+        parts = urlsplit(url)
+        if cache is not None and parts.hostname:
+            cache.resolve(parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+
+    def _warm(self, url: str, send: Callable[[str], None]) -> None:
+        try:
+            self._resolve(url)
+            send(url)
+        except Exception:
+            # only a head start, the download connects by itself anyway
+            pass
+
+    def warm(self, urls: Iterable[str], send: Callable[[str], None]) -> int:
+        """
+        warm hosts of urls in background threads, count of hosts being warmed
+        """
+        picked = self._pick(urls)
+        if not picked:
+            return 0
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers, thread_name_prefix='connection-prewarmer'
+                )
+            executor = self._executor
+        for url in picked:
+            executor.submit(self._warm, url, send)
+        return len(picked)
+
+    async def _warm_async(self, url: str, send: Callable[[str], Awaitable[None]]) -> None:
+        try:
+            await asyncio.to_thread(self._resolve, url)
+            await send(url)
+        except Exception:
+            pass
+
+    def warm_async(self, urls: Iterable[str], send: Callable[[str], Awaitable[None]]) -> int:
+        """
+        warm hosts of urls by tasks on the running event loop, count of hosts being warmed
+        """
+        picked = self._pick(urls)
+        for url in picked:
+            task = asyncio.ensure_future(self._warm_async(url, send))
+            # kept referenced until done, or the task could be garbage collected
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return len(picked)
+
+    def close(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
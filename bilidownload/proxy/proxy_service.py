@@ -2,14 +2,34 @@
 Bilibili official API proxy
 """
 import copy
-import json
-from typing import Optional, Union
+import threading
+from typing import Any, Callable, Dict, Optional, TYPE_CHECKING, Union
 from urllib.parse import urlencode
 
-import requests
+from pydantic_core import from_json
 from requests import Response
 
+from .account_pool import AccountPool, SessionData
+from .backend import HTTPBackend, HTTPXBackend
+from .cache import BaseResponseCache, build_cache_key, MemoryResponseCache
 from .constants import (
+    ACCOUNT_POOL_FLIGHT_PREFIX,
+    ENDPOINT_BANGUMI_INFO,
+    ENDPOINT_BANGUMI_STREAM_META,
+    ENDPOINT_CHEESE_INFO,
+    ENDPOINT_CHEESE_STREAM_META,
+    ENDPOINT_VIDEO_INFO,
+    ENDPOINT_VIDEO_STREAM,
+    ENDPOINT_VIDEO_STREAM_META,
+    ENDPOINT_WEB_CAPTCHA,
+    ENDPOINT_WEB_LOGIN,
+    ENDPOINT_WEB_PUBLIC_KEY,
+    ENDPOINT_WEB_SPI,
+    ENDPOINT_WEB_USER_INFO,
+    DEFAULT_WEB_SPI_TTL,
+    HTTP_BACKEND_HTTPX,
+    HTTP_BACKEND_REQUESTS,
+    LOGIN_FINGERPRINT_REJECTED_CODES,
     REQUEST_PGC_INFO_URL,
     REQUEST_PGC_STREAM_META_URL,
     REQUEST_PUGV_INFO_URL,
@@ -20,9 +40,15 @@ from .constants import (
     REQUEST_WEB_LOGIN_URL,
     REQUEST_WEB_PUBLIC_KEY_URL,
     REQUEST_WEB_SPI_URL,
-    REQUEST_WEB_USER_INFO_URL
+    REQUEST_WEB_USER_INFO_URL,
+    STREAM_CONNECT_TIMEOUT,
+    STREAM_READ_TIMEOUT,
+    THROTTLE_RESPONSE_CODES,
+    VIP_MIN_QN,
+    WBI_REJECTED_CODE
 )
 from .schemes import (
+    BaseResponseModel,
     GetBangumiDetailResponse,
     GetBangumiStreamMetaResponse,
     GetCheeseDetailResponse,
@@ -36,56 +62,545 @@ from .schemes import (
     GetVideoStreamMetaResponse,
     WebLoginResponse
 )
-from ..constants import HEADERS, TIMEOUT
+from .dns import DNSCache, get_dns_cache, set_dns_cache
+from .expiring import ExpiringValue
+from .metrics import ProxyMetrics
+from .prewarm import ConnectionPrewarmer
+from .rate_limit import RateLimiter
+from .session_pool import SessionPool
+from .single_flight import SingleFlight
+from .stream_meta_cache import iter_stream_urls, StreamMetaCache
+from .utils import sniff_response_code
+from .wbi import sign_params, WbiKeyCache
+from ..constants import HEADERS, Model, ModelType, TIMEOUT
+
+if TYPE_CHECKING:  # pragma: no cover
+    import httpx
 
 
 VIDEO_FORMAT_DASH = 16
+HTTP_BACKENDS = {
+    HTTP_BACKEND_REQUESTS: SessionPool,
+    HTTP_BACKEND_HTTPX: HTTPXBackend
+}
 
 
 class ProxyService:
 
+    _backend: Optional[HTTPBackend] = None
+    _backend_lock = threading.Lock()
+    _cache: Optional[BaseResponseCache] = None
+    _stream_meta_cache: Optional[StreamMetaCache] = None
+    _prewarmer: Optional[ConnectionPrewarmer] = None
+    _wbi_key_cache = WbiKeyCache()
+    _web_spi_cookies: ExpiringValue[Dict[str, str]] = ExpiringValue(DEFAULT_WEB_SPI_TTL)
+    _single_flight = SingleFlight()
+    _rate_limiter: Optional[RateLimiter] = RateLimiter()
+    _metrics: Optional[ProxyMetrics] = None
+
+    @classmethod
+    def get_backend(cls) -> HTTPBackend:
+        if cls._backend is None:
+            with cls._backend_lock:
+                if cls._backend is None:
+                    cls._backend = SessionPool()
+        return cls._backend
+
+    @classmethod
+    def configure_backend(
+        cls,
+        backend: Union[str, HTTPBackend] = HTTP_BACKEND_REQUESTS,
+        **kwargs
+    ) -> HTTPBackend:
+        """
+        replace the HTTP backend sending every request, a backend or the name of one,
+        'requests' for SessionPool, or 'httpx' for HTTPXBackend which speaks HTTP/2,
+        kwargs are passed to the backend of the name
+        """
+        if isinstance(backend, str):
+            if backend not in HTTP_BACKENDS:
+                raise ValueError(f'unknown HTTP backend {backend}, choose from {", ".join(HTTP_BACKENDS)}')
+            backend = HTTP_BACKENDS[backend](**kwargs)
+        with cls._backend_lock:
+            previous, cls._backend = cls._backend, backend
+        if previous is not None and previous is not backend:
+            previous.close()
+        return backend
+
+    @classmethod
+    def get_session_pool(cls) -> SessionPool:
+        backend = cls.get_backend()
+        if not isinstance(backend, SessionPool):
+            raise TypeError(f'HTTP backend is {type(backend).__name__}, not a session pool')
+        return backend
+
+    @classmethod
+    def configure_session_pool(cls, **kwargs) -> SessionPool:
+        """
+        replace the HTTP backend by a session pool, kwargs are passed to SessionPool
+        """
+        return cls.configure_backend(SessionPool(**kwargs))
+
+    @classmethod
+    def get_rate_limiter(cls) -> Optional[RateLimiter]:
+        return cls._rate_limiter
+
+    @classmethod
+    def configure_rate_limiter(
+        cls,
+        limiter: Optional[RateLimiter] = None,
+        **kwargs
+    ) -> RateLimiter:
+        """
+        replace the rate limiter shared with AsyncProxyService,
+        kwargs are passed to RateLimiter when no limiter is given
+        """
+        cls._rate_limiter = limiter if limiter is not None else RateLimiter(**kwargs)
+        return cls._rate_limiter
+
+    @classmethod
+    def disable_rate_limiter(cls) -> None:
+        cls._rate_limiter = None
+
+    @classmethod
+    def get_metrics(cls) -> Optional[ProxyMetrics]:
+        return cls._metrics
+
+    @classmethod
+    def enable_metrics(
+        cls,
+        metrics: Optional[ProxyMetrics] = None,
+        **kwargs
+    ) -> ProxyMetrics:
+        """
+        record metrics of requests by ProxyService and AsyncProxyService,
+        kwargs are passed to ProxyMetrics when no metrics is given
+        """
+        cls._metrics = metrics if metrics is not None else ProxyMetrics(**kwargs)
+        return cls._metrics
+
+    @classmethod
+    def disable_metrics(cls) -> None:
+        cls._metrics = None
+
+    @classmethod
+    def _finish_metrics(
+        cls,
+        metrics: ProxyMetrics,
+        endpoint: str,
+        method: str,
+        started_at: float,
+        response: Union[Response, 'httpx.Response'],
+        request_bytes: int,
+        is_stream: bool = False
+    ) -> None:
+        if is_stream:
+            code, response_bytes = None, int(response.headers.get('Content-Length', 0))
+        else:
+            code, response_bytes = sniff_response_code(response.content), len(response.content)
+        metrics.finish(
+            endpoint,
+            method,
+            started_at,
+            status_code=response.status_code,
+            code=code,
+            request_bytes=request_bytes,
+            response_bytes=response_bytes
+        )
+
+    @classmethod
+    def get_cache(cls) -> Optional[BaseResponseCache]:
+        return cls._cache
+
+    @classmethod
+    def enable_cache(
+        cls,
+        cache: Optional[BaseResponseCache] = None,
+        **kwargs
+    ) -> BaseResponseCache:
+        """
+        cache work info responses, kwargs are passed to MemoryResponseCache
+        when no cache is given, e.g. SqliteResponseCache could be given instead
+        to keep responses across restarts
+        """
+        cls._cache = cache if cache is not None else MemoryResponseCache(**kwargs)
+        return cls._cache
+
+    @classmethod
+    def disable_cache(cls) -> None:
+        cls._cache = None
+
+    @classmethod
+    def get_stream_meta_cache(cls) -> Optional[StreamMetaCache]:
+        return cls._stream_meta_cache
+
+    @classmethod
+    def enable_stream_meta_cache(
+        cls,
+        cache: Optional[StreamMetaCache] = None,
+        **kwargs
+    ) -> StreamMetaCache:
+        """
+        cache stream meta responses until their URLs are about to expire,
+        shared with AsyncProxyService, kwargs are passed to StreamMetaCache when no cache is given
+        """
+        previous = cls._stream_meta_cache
+        cls._stream_meta_cache = cache if cache is not None else StreamMetaCache(**kwargs)
+        if previous is not None and previous is not cls._stream_meta_cache:
+            previous.close()
+        return cls._stream_meta_cache
+
+    @classmethod
+    def disable_stream_meta_cache(cls) -> None:
+        previous, cls._stream_meta_cache = cls._stream_meta_cache, None
+        if previous is not None:
+            previous.close()
+
+    @classmethod
+    def get_prewarmer(cls) -> Optional[ConnectionPrewarmer]:
+        return cls._prewarmer
+
+    @classmethod
+    def configure_prewarmer(
+        cls,
+        prewarmer: Optional[ConnectionPrewarmer] = None,
+        **kwargs
+    ) -> ConnectionPrewarmer:
+        """
+        warm up connections to stream hosts once their stream meta is resolved, off by default
+        as it sends a request to each stream host, whether its streams get downloaded or not.
+        With a session pool, the warmed connection is kept by whichever session sent it,
+        so it pays off the most with a single shared backend, e.g. HTTPXBackend.
+        Shared with AsyncProxyService, kwargs are passed to ConnectionPrewarmer when none is given
+        """
+        previous = cls._prewarmer
+        cls._prewarmer = prewarmer if prewarmer is not None else ConnectionPrewarmer(**kwargs)
+        if previous is not None and previous is not cls._prewarmer:
+            previous.close()
+        return cls._prewarmer
+
+    @classmethod
+    def disable_prewarmer(cls) -> None:
+        previous, cls._prewarmer = cls._prewarmer, None
+        if previous is not None:
+            previous.close()
+
+    @classmethod
+    def get_wbi_key_cache(cls) -> WbiKeyCache:
+        return cls._wbi_key_cache
+
+    @classmethod
+    def configure_wbi_key_cache(cls, **kwargs) -> WbiKeyCache:
+        """
+        replace the WBI mixin key cache, shared with AsyncProxyService, kwargs are passed to WbiKeyCache
+        """
+        cls._wbi_key_cache = WbiKeyCache(**kwargs)
+        return cls._wbi_key_cache
+
+    @classmethod
+    def get_dns_cache(cls) -> Optional[DNSCache]:
+        return get_dns_cache()
+
+    @classmethod
+    def configure_dns_cache(
+        cls,
+        cache: Optional[DNSCache] = None,
+        **kwargs
+    ) -> DNSCache:
+        """
+        replace the process-wide DNS cache used by connections of SessionPool,
+        kwargs are passed to DNSCache when no cache is given
+        """
+        cache = cache if cache is not None else DNSCache(**kwargs)
+        set_dns_cache(cache)
+        return cache
+
+    @classmethod
+    def disable_dns_cache(cls) -> None:
+        set_dns_cache(None)
+
+    @classmethod
+    def _get_cache_key(
+        cls,
+        endpoint: str,
+        params: Dict[str, Any],
+        session_data: Optional[str] = None,
+        model: Optional[ModelType] = None
+    ) -> Optional[str]:
+        if cls._cache is None:
+            return None
+        return cls._get_flight_key(endpoint, params, session_data, model)
+
+    @classmethod
+    def _get_flight_key(
+        cls,
+        endpoint: str,
+        params: Dict[str, Any],
+        session_data: Optional[str] = None,
+        model: Optional[ModelType] = None
+    ) -> str:
+        return build_cache_key(endpoint, params, session_data, model.__name__ if model else '')
+
+    @classmethod
+    def _load_cache(
+        cls,
+        endpoint: str,
+        cache_key: Optional[str],
+        model: ModelType
+    ) -> Optional[Model]:
+        cache = cls._cache
+        if cache is None or cache_key is None:
+            return None
+        return cache.get(endpoint, cache_key, model)
+
+    @classmethod
+    def _save_cache(
+        cls,
+        endpoint: str,
+        cache_key: Optional[str],
+        dm: BaseResponseModel
+    ) -> None:
+        cache = cls._cache
+        if cache is None or cache_key is None or dm.code != 0:
+            return
+        cache.set(endpoint, cache_key, dm)
+
+    @classmethod
+    def _check_accounts(cls, pool: AccountPool) -> None:
+        """
+        login state and VIP of accounts due to check, by nav,
+        concurrent callers wait for one round of checks
+        """
+        if not pool.get_due_checks():
+            return
+
+        def check() -> None:
+            for session_data in pool.get_due_checks():
+                try:
+                    data = cls.get_web_user_info_data(session_data).data
+                except Exception:
+                    pool.fail_check(session_data)
+                    continue
+                pool.update(session_data, data.isLogin, data.isLogin and data.vipStatus == 1)
+
+        cls._single_flight.do(f'{ACCOUNT_POOL_FLIGHT_PREFIX}{id(pool)}', check)
+
+    @classmethod
+    def _is_vip_required(cls, params: Dict[str, Any]) -> bool:
+        return int(params.get('qn') or 0) >= VIP_MIN_QN
+
+    @classmethod
+    def _get_pooled_data(
+        cls,
+        pool: AccountPool,
+        params: Dict[str, Any],
+        get: Callable[[str], Model]
+    ) -> Model:
+        """
+        get by SESSDATA of the account chosen from pool, a VIP one for qn of VIP,
+        whose response tells whether the account is throttled
+        """
+        cls._check_accounts(pool)
+        with pool.acquire(cls._is_vip_required(params)) as session_data:
+            dm = get(session_data)
+        pool.report(session_data, dm.code in THROTTLE_RESPONSE_CODES)
+        return dm
+
+    @classmethod
+    def _get_data(
+        cls,
+        endpoint: str,
+        params: Dict[str, Any],
+        session_data: SessionData,
+        model: ModelType,
+        send: Callable[[Optional[str]], Response],
+        is_cacheable: bool = False
+    ) -> Model:
+        """
+        concurrent calls with identical endpoint, params, login identity and model
+        share one request in flight, then its validated response
+        """
+        if isinstance(session_data, AccountPool):
+            return cls._get_pooled_data(
+                session_data,
+                params,
+                lambda account: cls._get_data(endpoint, params, account, model, send, is_cacheable)
+            )
+        cache_key = cls._get_cache_key(endpoint, params, session_data, model) if is_cacheable else None
+        dm = cls._load_cache(endpoint, cache_key, model)
+        if dm is not None:
+            return dm
+
+        def load() -> Model:
+            response = send(session_data)
+            dm = cls._validate_content(response.content, model)
+            cls._save_cache(endpoint, cache_key, dm)
+            return dm
+
+        return cls._single_flight.do(cls._get_flight_key(endpoint, params, session_data, model), load)
+
+    @classmethod
+    def _get_stream_meta_data(
+        cls,
+        endpoint: str,
+        params: Dict[str, Any],
+        session_data: SessionData,
+        model: ModelType,
+        send: Callable[[Optional[str]], Response]
+    ) -> Model:
+        """
+        stream meta, whose stream hosts are warmed up ahead of downloading
+        """
+        if isinstance(session_data, AccountPool):
+            return cls._get_pooled_data(
+                session_data,
+                params,
+                lambda account: cls._get_stream_meta_data(endpoint, params, account, model, send)
+            )
+        dm = cls._load_stream_meta_data(endpoint, params, session_data, model, send)
+        prewarmer = cls._prewarmer
+        if prewarmer is not None and dm.code == 0:
+            prewarmer.warm(iter_stream_urls(dm), cls._send_prewarm)
+        return dm
+
+    @classmethod
+    def _load_stream_meta_data(
+        cls,
+        endpoint: str,
+        params: Dict[str, Any],
+        session_data: Optional[str],
+        model: ModelType,
+        send: Callable[[Optional[str]], Response]
+    ) -> Model:
+        """
+        stream meta served by the stream meta cache when it is enabled,
+        so that one request per params and login identity serves listing formats
+        and downloading, its entry is refreshed in background by send
+        """
+        cache = cls._stream_meta_cache
+        if cache is None:
+            return cls._get_data(endpoint, params, session_data, model, send)
+        cache_key = cls._get_flight_key(endpoint, params, session_data, model)
+        dm = cache.get(cache_key)
+        if dm is not None:
+            return dm
+
+        def refresh() -> Optional[Model]:
+            dm = cls._get_data(endpoint, params, session_data, model, send)
+            return dm if dm.code == 0 else None
+
+        dm = cls._get_data(endpoint, params, session_data, model, send)
+        if dm.code == 0:
+            cache.set(cache_key, dm, refresh)
+        return dm
+
+    @classmethod
+    def _request(
+        cls,
+        method: str,
+        url: str,
+        endpoint: Optional[str] = None,
+        session_data: Optional[str] = None,
+        cookies: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = TIMEOUT,
+        **kwargs: Any
+    ) -> Response:
+        """
+        endpoint: name of the requested endpoint, which labels its metrics
+        """
+        request_cookies = dict(cookies) if cookies else {}
+        if session_data:
+            request_cookies['SESSDATA'] = session_data
+        limiter = cls._rate_limiter
+        if limiter is not None:
+            limiter.acquire(url)
+        metrics = cls._metrics if endpoint is not None else None
+        started_at = metrics.start(endpoint) if metrics is not None else 0
+        try:
+            response = cls.get_backend().request(
+                method,
+                url,
+                cookies=request_cookies,
+                headers=headers if headers is not None else HEADERS,
+                timeout=timeout,
+                **kwargs
+            )
+        except BaseException as e:
+            if metrics is not None:
+                metrics.finish(endpoint, method, started_at, error=e)
+            raise
+        is_stream = bool(kwargs.get('stream'))
+        if limiter is not None and not is_stream:
+            limiter.feedback(url, response.status_code, response.content)
+        if metrics is not None:
+            request_bytes = len(response.request.body or b'')
+            cls._finish_metrics(metrics, endpoint, method, started_at, response, request_bytes, is_stream)
+        return response
+
+    @classmethod
+    def _validate_content(cls, content: bytes, model: ModelType) -> Model:
+        """
+        validate JSON bytes in one pass, rather than decoding them
+        into str and dict before walking the dict again in model_validate
+        """
+        return model.model_validate_json(content)
+
     @classmethod
     def get_web_captcha_meta(cls) -> Response:
-        response = requests.get(REQUEST_WEB_CAPTCHA_URL, headers=HEADERS, timeout=TIMEOUT)
+        response = cls._request('GET', REQUEST_WEB_CAPTCHA_URL, endpoint=ENDPOINT_WEB_CAPTCHA)
         return response
 
     @classmethod
     def get_web_captcha_meta_data(cls) -> GetWebCaptchaResponse:
         response = cls.get_web_captcha_meta()
-        data = json.loads(response.content.decode('utf-8'))
-        return GetWebCaptchaResponse.model_validate(data)
+        return cls._validate_content(response.content, GetWebCaptchaResponse)
 
     @classmethod
     def get_web_public_key(cls) -> Response:
-        response = requests.get(REQUEST_WEB_PUBLIC_KEY_URL, headers=HEADERS, timeout=TIMEOUT)
+        response = cls._request('GET', REQUEST_WEB_PUBLIC_KEY_URL, endpoint=ENDPOINT_WEB_PUBLIC_KEY)
         return response
 
     @classmethod
     def get_web_public_key_data(cls) -> GetWebPublicKeyResponse:
         response = cls.get_web_public_key()
-        data = json.loads(response.content.decode('utf-8'))
-        return GetWebPublicKeyResponse.model_validate(data)
+        return cls._validate_content(response.content, GetWebPublicKeyResponse)
 
     @classmethod
     def get_web_spi(cls) -> Response:
-        response = requests.get(REQUEST_WEB_SPI_URL, headers=HEADERS, timeout=TIMEOUT)
+        response = cls._request('GET', REQUEST_WEB_SPI_URL, endpoint=ENDPOINT_WEB_SPI)
         return response
 
     @classmethod
     def get_web_spi_data(cls) -> GetWebSPIResponse:
         response = cls.get_web_spi()
-        data = json.loads(response.content.decode('utf-8'))
-        return GetWebSPIResponse.model_validate(data)
+        return cls._validate_content(response.content, GetWebSPIResponse)
+
+    @classmethod
+    def get_web_spi_cookies(cls) -> Dict[str, str]:
+        """
+        buvid3 and buvid4 cookies, minted by SPI once per DEFAULT_WEB_SPI_TTL instead of per login
+        """
+        def load() -> Dict[str, str]:
+            spi_response_dm = cls.get_web_spi_data()
+            return {
+                'buvid3': spi_response_dm.data.b_3,
+                'buvid4': spi_response_dm.data.b_4
+            }
+
+        return dict(cls._web_spi_cookies.get(load))
 
     @classmethod
     def get_web_user_info(
         cls,
         session_data: Optional[str] = None
     ) -> Response:
-        session = requests.session()
-        if session_data:
-            session.cookies.set('SESSDATA', session_data)
-        response = session.get(REQUEST_WEB_USER_INFO_URL, headers=HEADERS, timeout=TIMEOUT)
+        response = cls._request(
+            'GET',
+            REQUEST_WEB_USER_INFO_URL,
+            endpoint=ENDPOINT_WEB_USER_INFO,
+            session_data=session_data
+        )
         return response
 
     @classmethod
@@ -94,12 +609,58 @@ class ProxyService:
         session_data: Optional[str] = None
     ) -> Union[GetUserInfoLoginResponse, GetUserInfoNotLoginResponse]:
         response = cls.get_web_user_info(session_data)
-        data = json.loads(response.content.decode('utf-8'))
+        data = from_json(response.content)
         model = GetUserInfoLoginResponse
         if data['code'] != 0:
             model = GetUserInfoNotLoginResponse
         return model.model_validate(data)
 
+    @classmethod
+    def _get_mixin_key(cls) -> str:
+        """
+        WBI mixin key, fetched from nav only when the cached one is absent or expired
+        """
+        key_cache = cls._wbi_key_cache
+        mixin_key = key_cache.get()
+        if mixin_key is not None:
+            return mixin_key
+
+        def load() -> str:
+            wbi_img = cls.get_web_user_info_data().data.wbi_img
+            return key_cache.set(wbi_img.img_url, wbi_img.sub_url)
+
+        return cls._single_flight.do(ENDPOINT_WEB_USER_INFO, load)
+
+    @classmethod
+    def _request_wbi(
+        cls,
+        url: str,
+        endpoint: str,
+        params: Dict[str, Any],
+        session_data: Optional[str] = None
+    ) -> Response:
+        """
+        GET a WBI endpoint by signed params,
+        signed again by keys fetched anew once if the signature is rejected
+        """
+        response = cls._request(
+            'GET',
+            url,
+            endpoint=endpoint,
+            session_data=session_data,
+            params=sign_params(params, cls._get_mixin_key())
+        )
+        if sniff_response_code(response.content) != WBI_REJECTED_CODE:
+            return response
+        cls._wbi_key_cache.invalidate()
+        return cls._request(
+            'GET',
+            url,
+            endpoint=endpoint,
+            session_data=session_data,
+            params=sign_params(params, cls._get_mixin_key())
+        )
+
     @classmethod
     def login(
         cls,
@@ -110,10 +671,7 @@ class ProxyService:
         validate: str,
         seccode: str
     ):
-        session = requests.session()
-        spi_response_dm = ProxyService.get_web_spi_data()
-        session.cookies.set('buvid3', spi_response_dm.data.b_3)
-        session.cookies.set('buvid4', spi_response_dm.data.b_4)
+        cookies = cls.get_web_spi_cookies()
 
         data = {
             'source': 'main-fe-header',
@@ -129,12 +687,16 @@ class ProxyService:
         encoded_data = urlencode(data)
         headers = copy.deepcopy(HEADERS)
         headers.update({'Content-Type': 'application/x-www-form-urlencoded'})
-        response = session.post(
+        response = cls._request(
+            'POST',
             REQUEST_WEB_LOGIN_URL,
+            endpoint=ENDPOINT_WEB_LOGIN,
+            cookies=cookies,
             headers=headers,
-            data=encoded_data,
-            timeout=TIMEOUT
+            data=encoded_data
         )
+        if sniff_response_code(response.content) in LOGIN_FINGERPRINT_REJECTED_CODES:
+            cls._web_spi_cookies.invalidate()
         return response
 
     @classmethod
@@ -150,32 +712,43 @@ class ProxyService:
         response = cls.login(
             username, encrypted_password, token, challenge, validate, seccode
         )
-        data = json.loads(response.content.decode('utf-8'))
-        return WebLoginResponse.model_validate(data)
+        return cls._validate_content(response.content, WebLoginResponse)
 
     @classmethod
-    def get_video_info(
+    def _get_video_info_params(
         cls,
         bvid: Optional[str] = None,
-        aid: Optional[int] = None,
-        session_data: Optional[str] = None
-    ) -> Response:
-        """
-        only need one of video's bvid or aid
-        bvid is prior than aid if both exist
-        """
+        aid: Optional[int] = None
+    ) -> Dict[str, Any]:
         if all([id_value is None for id_value in (bvid, aid)]):
             raise
 
-        session = requests.session()
-        if session_data:
-            session.cookies.set('SESSDATA', session_data)
         params = {}
         if bvid is not None:
             params.update({'bvid': bvid})
         else:
             params.update({'aid': aid})
-        response = session.get(REQUEST_VIDEO_INFO_URL, params=params, headers=HEADERS, timeout=TIMEOUT)
+        return params
+
+    @classmethod
+    def get_video_info(
+        cls,
+        bvid: Optional[str] = None,
+        aid: Optional[int] = None,
+        session_data: Optional[str] = None
+    ) -> Response:
+        """
+        only need one of video's bvid or aid
+        bvid is prior than aid if both exist
+        """
+        params = cls._get_video_info_params(bvid, aid)
+        response = cls._request(
+            'GET',
+            REQUEST_VIDEO_INFO_URL,
+            endpoint=ENDPOINT_VIDEO_INFO,
+            session_data=session_data,
+            params=params
+        )
         return response
 
     @classmethod
@@ -183,34 +756,35 @@ class ProxyService:
         cls,
         bvid: Optional[str] = None,
         aid: Optional[int] = None,
-        session_data: Optional[str] = None
-    ) -> GetVideoInfoResponse:
-        response = cls.get_video_info(bvid, aid, session_data)
-        data = json.loads(response.content.decode('utf-8'))
-        return GetVideoInfoResponse.model_validate(data)
+        session_data: SessionData = None,
+        model: ModelType = GetVideoInfoResponse
+    ) -> Model:
+        """
+        model could be GetVideoInfoLiteResponse,
+        which only parses fields read by video components
+        """
+        return cls._get_data(
+            ENDPOINT_VIDEO_INFO,
+            cls._get_video_info_params(bvid, aid),
+            session_data,
+            model,
+            lambda session_data: cls.get_video_info(bvid, aid, session_data),
+            is_cacheable=True
+        )
 
     @classmethod
-    def get_video_stream_meta(
+    def _get_video_stream_meta_params(
         cls,
         cid: int,
         bvid: Optional[str] = None,
         aid: Optional[int] = None,
         qn: Optional[int] = None,
         fnval: int = 1,
-        fourk: int = 1,
-        session_data: Optional[str] = None
-    ) -> Response:
-        """
-        only need one of video's bvid or aid
-        bvid is prior than aid if both exist
-        """
+        fourk: int = 1
+    ) -> Dict[str, Any]:
         if all([id_value is None for id_value in (bvid, aid)]):
             raise
 
-        session = requests.session()
-        if session_data:
-            session.cookies.set('SESSDATA', session_data)
-
         params = {}
         if bvid is not None:
             params.update({'bvid': bvid})
@@ -225,9 +799,27 @@ class ProxyService:
             'fnval': fnval,
             'fourk': fourk
         })
+        return params
 
-        response = session.get(REQUEST_VIDEO_STREAM_META_URL, params=params, headers=HEADERS, timeout=TIMEOUT)
-        return response
+    @classmethod
+    def get_video_stream_meta(
+        cls,
+        cid: int,
+        bvid: Optional[str] = None,
+        aid: Optional[int] = None,
+        qn: Optional[int] = None,
+        fnval: int = 1,
+        fourk: int = 1,
+        session_data: Optional[str] = None
+    ) -> Response:
+        """
+        only need one of video's bvid or aid
+        bvid is prior than aid if both exist
+        """
+        params = cls._get_video_stream_meta_params(cid, bvid, aid, qn, fnval, fourk)
+        return cls._request_wbi(
+            REQUEST_VIDEO_STREAM_META_URL, ENDPOINT_VIDEO_STREAM_META, params, session_data
+        )
 
     @classmethod
     def get_video_stream_meta_data(
@@ -238,43 +830,51 @@ class ProxyService:
         qn: Optional[int] = None,
         fnval: int = 1,
         fourk: int = 1,
-        session_data: Optional[str] = None
+        session_data: SessionData = None
     ) -> GetVideoStreamMetaResponse:
-        response = cls.get_video_stream_meta(
-            cid,
-            bvid,
-            aid,
-            qn,
-            fnval,
-            fourk,
-            session_data
+        return cls._get_stream_meta_data(
+            ENDPOINT_VIDEO_STREAM_META,
+            cls._get_video_stream_meta_params(cid, bvid, aid, qn, fnval, fourk),
+            session_data,
+            GetVideoStreamMetaResponse,
+            lambda session_data: cls.get_video_stream_meta(cid, bvid, aid, qn, fnval, fourk, session_data)
         )
-        data = json.loads(response.content.decode('utf-8'))
-        return GetVideoStreamMetaResponse.model_validate(data)
 
     @classmethod
-    def get_bangumi_info(
+    def _get_bangumi_info_params(
         cls,
         ssid: Optional[int] = None,
-        epid: Optional[int] = None,
-        session_data: Optional[str] = None
-    ) -> Response:
-        """
-        only need one of bangumi's ssid or epid
-        ssid is prior than epid if both exist
-        """
+        epid: Optional[int] = None
+    ) -> Dict[str, Any]:
         if all([id_value is None for id_value in (ssid, epid)]):
             raise
 
-        session = requests.session()
-        if session_data:
-            session.cookies.set('SESSDATA', session_data)
         params = {}
         if ssid is not None:
             params.update({'season_id': ssid})
         else:
             params.update({'ep_id': epid})
-        response = session.get(REQUEST_PGC_INFO_URL, params=params, headers=HEADERS, timeout=TIMEOUT)
+        return params
+
+    @classmethod
+    def get_bangumi_info(
+        cls,
+        ssid: Optional[int] = None,
+        epid: Optional[int] = None,
+        session_data: Optional[str] = None
+    ) -> Response:
+        """
+        only need one of bangumi's ssid or epid
+        ssid is prior than epid if both exist
+        """
+        params = cls._get_bangumi_info_params(ssid, epid)
+        response = cls._request(
+            'GET',
+            REQUEST_PGC_INFO_URL,
+            endpoint=ENDPOINT_BANGUMI_INFO,
+            session_data=session_data,
+            params=params
+        )
         return response
 
     @classmethod
@@ -282,25 +882,30 @@ class ProxyService:
         cls,
         ssid: Optional[int] = None,
         epid: Optional[int] = None,
-        session_data: Optional[str] = None
-    ) -> GetBangumiDetailResponse:
-        response = cls.get_bangumi_info(ssid, epid , session_data)
-        data = json.loads(response.content.decode('utf-8'))
-        return GetBangumiDetailResponse.model_validate(data)
+        session_data: SessionData = None,
+        model: ModelType = GetBangumiDetailResponse
+    ) -> Model:
+        """
+        model could be GetBangumiDetailLiteResponse,
+        which only parses fields read by video components
+        """
+        return cls._get_data(
+            ENDPOINT_BANGUMI_INFO,
+            cls._get_bangumi_info_params(ssid, epid),
+            session_data,
+            model,
+            lambda session_data: cls.get_bangumi_info(ssid, epid, session_data),
+            is_cacheable=True
+        )
 
     @classmethod
-    def get_bangumi_stream_meta(
+    def _get_bangumi_stream_meta_params(
         cls,
         epid: int,
         qn: Optional[int] = None,
         fnval: int = 1,
-        fourk: int = 1,
-        session_data: Optional[str] = None
-    ) -> Response:
-        session = requests.session()
-        if session_data:
-            session.cookies.set('SESSDATA', session_data)
-
+        fourk: int = 1
+    ) -> Dict[str, Any]:
         params = {'ep_id': epid}
 
         if qn is not None:
@@ -310,8 +915,25 @@ class ProxyService:
             'fnval': fnval,
             'fourk': fourk
         })
+        return params
 
-        response = session.get(REQUEST_PGC_STREAM_META_URL, params=params, headers=HEADERS, timeout=TIMEOUT)
+    @classmethod
+    def get_bangumi_stream_meta(
+        cls,
+        epid: int,
+        qn: Optional[int] = None,
+        fnval: int = 1,
+        fourk: int = 1,
+        session_data: Optional[str] = None
+    ) -> Response:
+        params = cls._get_bangumi_stream_meta_params(epid, qn, fnval, fourk)
+        response = cls._request(
+            'GET',
+            REQUEST_PGC_STREAM_META_URL,
+            endpoint=ENDPOINT_BANGUMI_STREAM_META,
+            session_data=session_data,
+            params=params
+        )
         return response
 
     @classmethod
@@ -321,11 +943,31 @@ class ProxyService:
         qn: Optional[int] = None,
         fnval: int = 1,
         fourk: int = 1,
-        session_data: Optional[str] = None
+        session_data: SessionData = None
     ) -> GetBangumiStreamMetaResponse:
-        response = cls.get_bangumi_stream_meta(epid, qn, fnval, fourk, session_data)
-        data = json.loads(response.content.decode('utf-8'))
-        return GetBangumiStreamMetaResponse.model_validate(data)
+        return cls._get_stream_meta_data(
+            ENDPOINT_BANGUMI_STREAM_META,
+            cls._get_bangumi_stream_meta_params(epid, qn, fnval, fourk),
+            session_data,
+            GetBangumiStreamMetaResponse,
+            lambda session_data: cls.get_bangumi_stream_meta(epid, qn, fnval, fourk, session_data)
+        )
+
+    @classmethod
+    def _get_cheese_info_params(
+        cls,
+        ssid: Optional[int] = None,
+        epid: Optional[int] = None
+    ) -> Dict[str, Any]:
+        if all([id_value is None for id_value in (ssid, epid)]):
+            raise
+
+        params = {}
+        if ssid is not None:
+            params.update({'season_id': ssid})
+        else:
+            params.update({'ep_id': epid})
+        return params
 
     @classmethod
     def get_cheese_info(
@@ -340,18 +982,14 @@ class ProxyService:
 
         and it is different from ssid and epid of bangumi
         """
-        if all([id_value is None for id_value in (ssid, epid)]):
-            raise
-
-        session = requests.session()
-        if session_data:
-            session.cookies.set('SESSDATA', session_data)
-        params = {}
-        if ssid is not None:
-            params.update({'season_id': ssid})
-        else:
-            params.update({'ep_id': epid})
-        response = session.get(REQUEST_PUGV_INFO_URL, params=params, headers=HEADERS, timeout=TIMEOUT)
+        params = cls._get_cheese_info_params(ssid, epid)
+        response = cls._request(
+            'GET',
+            REQUEST_PUGV_INFO_URL,
+            endpoint=ENDPOINT_CHEESE_INFO,
+            session_data=session_data,
+            params=params
+        )
         return response
 
     @classmethod
@@ -359,27 +997,32 @@ class ProxyService:
         cls,
         ssid: Optional[int] = None,
         epid: Optional[int] = None,
-        session_data: Optional[str] = None
-    ) -> GetCheeseDetailResponse:
-        response = cls.get_cheese_info(ssid, epid , session_data)
-        data = json.loads(response.content.decode('utf-8'))
-        return GetCheeseDetailResponse.model_validate(data)
+        session_data: SessionData = None,
+        model: ModelType = GetCheeseDetailResponse
+    ) -> Model:
+        """
+        model could be GetCheeseDetailLiteResponse,
+        which only parses fields read by video components
+        """
+        return cls._get_data(
+            ENDPOINT_CHEESE_INFO,
+            cls._get_cheese_info_params(ssid, epid),
+            session_data,
+            model,
+            lambda session_data: cls.get_cheese_info(ssid, epid, session_data),
+            is_cacheable=True
+        )
 
     @classmethod
-    def get_cheese_stream_meta(
+    def _get_cheese_stream_meta_params(
         cls,
         aid: int,
         epid: int,
         cid: int,
         qn: Optional[int] = None,
         fnval: int = 1,
-        fourk: int = 1,
-        session_data: Optional[str] = None
-    ) -> Response:
-        session = requests.session()
-        if session_data:
-            session.cookies.set('SESSDATA', session_data)
-
+        fourk: int = 1
+    ) -> Dict[str, Any]:
         params = {
             'avid': aid,
             'ep_id': epid,
@@ -393,8 +1036,27 @@ class ProxyService:
             'fnval': fnval,
             'fourk': fourk
         })
+        return params
 
-        response = session.get(REQUEST_PUGV_STREAM_META_URL, params=params, headers=HEADERS, timeout=TIMEOUT)
+    @classmethod
+    def get_cheese_stream_meta(
+        cls,
+        aid: int,
+        epid: int,
+        cid: int,
+        qn: Optional[int] = None,
+        fnval: int = 1,
+        fourk: int = 1,
+        session_data: Optional[str] = None
+    ) -> Response:
+        params = cls._get_cheese_stream_meta_params(aid, epid, cid, qn, fnval, fourk)
+        response = cls._request(
+            'GET',
+            REQUEST_PUGV_STREAM_META_URL,
+            endpoint=ENDPOINT_CHEESE_STREAM_META,
+            session_data=session_data,
+            params=params
+        )
         return response
 
     @classmethod
@@ -406,23 +1068,51 @@ class ProxyService:
         qn: Optional[int] = None,
         fnval: int = 1,
         fourk: int = 1,
-        session_data: Optional[str] = None
+        session_data: SessionData = None
     ) -> GetCheeseStreamMetaResponse:
-        response = cls.get_cheese_stream_meta(
-            aid,
-            epid,
-            cid,
-            qn,
-            fnval,
-            fourk,
-            session_data
+        return cls._get_stream_meta_data(
+            ENDPOINT_CHEESE_STREAM_META,
+            cls._get_cheese_stream_meta_params(aid, epid, cid, qn, fnval, fourk),
+            session_data,
+            GetCheeseStreamMetaResponse,
+            lambda session_data: cls.get_cheese_stream_meta(aid, epid, cid, qn, fnval, fourk, session_data)
         )
-        data = json.loads(response.content.decode('utf-8'))
-        return GetCheeseStreamMetaResponse.model_validate(data)
+
+    @classmethod
+    def _get_stream_headers(cls, start: int = 0, end: Optional[int] = None) -> Dict[str, str]:
+        headers = dict(HEADERS)
+        if start or end is not None:
+            headers['Range'] = f'bytes={start}-{end if end is not None else ""}'
+        return headers
+
+    @classmethod
+    def _send_prewarm(cls, url: str) -> None:
+        """
+        HEAD the stream, leaving a connection to its host kept alive
+        """
+        cls._request(
+            'HEAD',
+            url,
+            headers=cls._get_stream_headers(),
+            timeout=(STREAM_CONNECT_TIMEOUT, STREAM_READ_TIMEOUT)
+        ).close()
 
     @classmethod
     def get_video_stream_response(
         cls,
-        url: str
+        url: str,
+        start: int = 0,
+        end: Optional[int] = None
     ) -> Response:
-        return requests.get(url, headers=HEADERS, stream=True)
+        """
+        start: offset of the first byte wanted, e.g. to resume a broken stream
+        end: offset of the last byte wanted, None means up to the end of the stream
+        """
+        return cls._request(
+            'GET',
+            url,
+            endpoint=ENDPOINT_VIDEO_STREAM,
+            headers=cls._get_stream_headers(start, end),
+            timeout=(STREAM_CONNECT_TIMEOUT, STREAM_READ_TIMEOUT),
+            stream=True
+        )
@@ -0,0 +1,188 @@
+"""
+Client-side rate limiting of Bilibili APIs, adapting to throttling responses
+"""
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from .constants import (
+    DEFAULT_RATE_LIMIT_ADDITIVE_INCREASE,
+    DEFAULT_RATE_LIMIT_DECREASE_COOLDOWN,
+    DEFAULT_RATE_LIMIT_MULTIPLICATIVE_DECREASE,
+    DEFAULT_RATE_LIMIT_MIN_RATE,
+    DEFAULT_RATE_LIMITS,
+    RATE_LIMIT_FAMILY_API,
+    RATE_LIMIT_FAMILY_PASSPORT,
+    RATE_LIMIT_FAMILY_PGC,
+    RATE_LIMIT_FAMILY_PUGV,
+    REQUEST_API_HOST,
+    REQUEST_PASSPORT_HOST,
+    THROTTLE_RESPONSE_CODES,
+    THROTTLE_STATUS_CODES
+)
+from .utils import sniff_response_code
+
+
+__all__ = ['get_family', 'is_throttled', 'RateLimiter', 'TokenBucket']
+
+
+def get_family(url: str) -> Optional[str]:
+    """
+    rate limited family of API which url belongs to, None for others like CDN
+    """
+    parts = urlsplit(url)
+    if parts.hostname == REQUEST_PASSPORT_HOST:
+        return RATE_LIMIT_FAMILY_PASSPORT
+    if parts.hostname != REQUEST_API_HOST:
+        return None
+    if parts.path.startswith('/pgc/'):
+        return RATE_LIMIT_FAMILY_PGC
+    if parts.path.startswith('/pugv/'):
+        return RATE_LIMIT_FAMILY_PUGV
+    return RATE_LIMIT_FAMILY_API
+
+
+def is_throttled(status_code: int, content: bytes = b'') -> bool:
+    if status_code in THROTTLE_STATUS_CODES:
+        return True
+    return sniff_response_code(content) in THROTTLE_RESPONSE_CODES
+
+
+class TokenBucket:
+    """
+    Token bucket whose rate is adjusted by AIMD,
+    each success adds additive_increase / rate, so about additive_increase per second,
+    a throttling response multiplies it by multiplicative_decrease
+    at most once per cooldown seconds, since responses of requests
+    sent before the decrease are likely throttled as well
+
+    rate: initial tokens per second, also the ceiling
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        min_rate: float = DEFAULT_RATE_LIMIT_MIN_RATE,
+        additive_increase: float = DEFAULT_RATE_LIMIT_ADDITIVE_INCREASE,
+        multiplicative_decrease: float = DEFAULT_RATE_LIMIT_MULTIPLICATIVE_DECREASE,
+        cooldown: float = DEFAULT_RATE_LIMIT_DECREASE_COOLDOWN
+    ):
+        self._max_rate = rate
+        self._min_rate = min(min_rate, rate)
+        self._additive_increase = additive_increase
+        self._multiplicative_decrease = multiplicative_decrease
+        self._cooldown = cooldown
+        self._lock = threading.Lock()
+        self._rate = rate
+        self._tokens = max(rate, 1)
+        self._updated_at = time.monotonic()
+        self._decreased_at = float('-inf')
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def _reserve(self) -> float:
+        """
+        take one token, seconds to wait until it is available
+        """
+        with self._lock:
+            now = time.monotonic()
+            capacity = max(self._rate, 1)
+            self._tokens = min(capacity, self._tokens + (now - self._updated_at) * self._rate)
+            self._updated_at = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self._rate
+
+    def acquire(self) -> float:
+        """
+        block until a token is available, seconds waited
+        """
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self) -> float:
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def on_success(self) -> None:
+        with self._lock:
+            self._rate = min(self._max_rate, self._rate + self._additive_increase / self._rate)
+
+    def on_throttle(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._decreased_at < self._cooldown:
+                return
+            self._decreased_at = now
+            self._rate = max(self._min_rate, self._rate * self._multiplicative_decrease)
+            # drop the burst allowance, so the new rate takes effect at once
+            self._tokens = min(self._tokens, 0)
+
+
+class RateLimiter:
+    """
+    One token bucket per API family, e.g. api, passport, pgc and pugv,
+    requests out of these families are not limited
+
+    rates: initial and maximum requests per second by family,
+    overriding DEFAULT_RATE_LIMITS
+    kwargs are passed to TokenBucket
+    """
+
+    def __init__(
+        self,
+        rates: Optional[Dict[str, float]] = None,
+        **kwargs
+    ):
+        family_rates = dict(DEFAULT_RATE_LIMITS)
+        family_rates.update(rates or {})
+        self._buckets = {
+            family: TokenBucket(rate, **kwargs) for family, rate in family_rates.items()
+        }
+
+    def get_rates(self) -> Dict[str, float]:
+        """
+        current requests per second by family
+        """
+        return {family: bucket.rate for family, bucket in self._buckets.items()}
+
+    def _get_bucket(self, url: str) -> Optional[TokenBucket]:
+        family = get_family(url)
+        if family is None:
+            return None
+        return self._buckets.get(family)
+
+    def acquire(self, url: str) -> float:
+        bucket = self._get_bucket(url)
+        if bucket is None:
+            return 0
+        return bucket.acquire()
+
+    async def acquire_async(self, url: str) -> float:
+        bucket = self._get_bucket(url)
+        if bucket is None:
+            return 0
+        return await bucket.acquire_async()
+
+    def feedback(self, url: str, status_code: int, content: bytes = b'') -> bool:
+        """
+        adjust rate of url's family by its response, whether it is throttled
+        """
+        bucket = self._get_bucket(url)
+        if bucket is None:
+            return False
+        throttled = is_throttled(status_code, content)
+        if throttled:
+            bucket.on_throttle()
+        else:
+            bucket.on_success()
+        return throttled
@@ -1,6 +1,19 @@
-from .bangumi import GetBangumiDetailResponse, GetBangumiStreamMetaResponse
-from .base import VideoStreamMetaLiteSupportFormatItemData
-from .cheese import GetCheeseDetailResponse, GetCheeseStreamMetaResponse
+from .bangumi import (
+    GetBangumiDetailLiteResponse,  # NOQA
+    GetBangumiDetailResponse,  # NOQA
+    GetBangumiStreamMetaResponse  # NOQA
+)
+from .base import (
+    BaseResponseModel,  # NOQA
+    VideoDashData,  # NOQA
+    VideoDashMediaItemData,  # NOQA
+    VideoStreamMetaLiteSupportFormatItemData  # NOQA
+)
+from .cheese import (
+    GetCheeseDetailLiteResponse,  # NOQA
+    GetCheeseDetailResponse,  # NOQA
+    GetCheeseStreamMetaResponse  # NOQA
+)
 from .finger import GetWebSPIResponse  # NOQA
 from .login import (
     GetWebCaptchaResponse,  # NOQA
@@ -14,6 +27,7 @@ from .user_info import (
     GetUserInfoNotLoginResponse  # NOQA
 )
 from .video import (
+    GetVideoInfoLiteResponse,  # NOQA
     GetVideoInfoResponse,  # NOQA
     GetVideoStreamMetaResponse  # NOQA
 )
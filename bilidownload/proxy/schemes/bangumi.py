@@ -14,7 +14,11 @@ from .base import (
 )
 
 
-__all__ = ['GetBangumiDetailResponse', 'GetBangumiStreamMetaResponse']
+__all__ = [
+    'GetBangumiDetailLiteResponse',
+    'GetBangumiDetailResponse',
+    'GetBangumiStreamMetaResponse'
+]
 
 
 class BangumiActivity(BaseModel):
@@ -327,6 +331,54 @@ class GetBangumiDetailResponse(BaseResponseModel):
     result: Optional[GetBangumiDetailResult] = None
 
 
+class BangumiEpisodeLiteItemData(BaseModel):
+
+    aid: int
+    badge_info: BadgeInfoData
+    bvid: str
+    cid: int
+    id_field: int = Field(..., alias='id')  # epid
+    long_title: str
+    status: int
+    title: str
+
+
+class BangumiSectionItemEpisodeLiteItemData(BangumiEpisodeLiteItemData):
+
+    duration: int    # millisecond
+    ep_id: int
+
+
+class BangumiSectionLiteItemData(BaseModel):
+
+    episodes: List[BangumiSectionItemEpisodeLiteItemData]
+
+
+class BangumiUpInfoLiteData(BaseModel):
+
+    avatar: str
+    mid: int
+    uname: str
+
+
+class GetBangumiDetailLiteResult(BaseModel):
+    """
+    projection of GetBangumiDetailResult on fields read by video components
+    """
+    cover: str
+    episodes: List[BangumiEpisodeLiteItemData]
+    evaluate: str
+    season_id: int
+    section: Optional[List[BangumiSectionLiteItemData]] = None
+    title: str
+    up_info: BangumiUpInfoLiteData
+
+
+class GetBangumiDetailLiteResponse(BaseResponseModel):
+
+    result: Optional[GetBangumiDetailLiteResult] = None
+
+
 class BangumiStreamMetaRecordInfoData(BaseModel):
 
     record_icon: str
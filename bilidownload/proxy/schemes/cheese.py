@@ -13,7 +13,11 @@ from .base import (
 )
 
 
-__all__ = ['GetCheeseDetailResponse', 'GetCheeseStreamMetaResponse']
+__all__ = [
+    'GetCheeseDetailLiteResponse',
+    'GetCheeseDetailResponse',
+    'GetCheeseStreamMetaResponse'
+]
 
 
 class CheeseAbtestInfo(BaseModel):
@@ -308,6 +312,40 @@ class GetCheeseDetailResponse(BaseResponseModel):
     data: Optional[GetCheeseDetailData] = None
 
 
+class CheeseEpisodeLiteItemData(BaseModel):
+
+    aid: int                # different from common video's AV ID
+    cid: int                # different from common video's cid
+    duration: int           # Duration seconds
+    id_field: int = Field(..., alias='id')  # different from bangumi's EP ID
+    status: int
+    title: str
+
+
+class CheeseUpInfoLiteData(BaseModel):
+
+    avatar: str
+    mid: int
+    uname: str
+
+
+class GetCheeseDetailLiteData(BaseModel):
+    """
+    projection of GetCheeseDetailData on fields read by video components
+    """
+    cover: str
+    episodes: List[CheeseEpisodeLiteItemData]
+    season_id: int
+    subtitle: str
+    title: str
+    up_info: CheeseUpInfoLiteData
+
+
+class GetCheeseDetailLiteResponse(BaseResponseModel):
+
+    data: Optional[GetCheeseDetailLiteData] = None
+
+
 class BangumiStreamMetaSupportFormatItemData(VideoStreamMetaLiteSupportFormatItemData):
 
     codecs: Optional[List[str]]
@@ -15,6 +15,7 @@ from .base import (
 
 
 __all__ = [
+    'GetVideoInfoLiteResponse',
     'GetVideoInfoResponse',
     'GetVideoStreamMetaResponse'
 ]
@@ -231,6 +232,41 @@ class GetVideoInfoResponse(BaseResponseModel):
     data: Optional[GetVideoInfoData] = None
 
 
+class VideoPagesLiteItemData(BaseModel):
+
+    cid: int       # cid of this page
+    part: str      # Title of this page
+    duration: int  # Total seconds of this page
+
+
+class VideoStaffLiteItemData(BaseModel):
+
+    mid: int    # Identifier of user
+    title: str  # Name of user
+    name: str   # Nickname of user
+    face: str   # Profile icon's source URL
+
+
+class GetVideoInfoLiteData(BaseModel):
+    """
+    projection of GetVideoInfoData on fields read by video components
+    """
+    bvid: str
+    aid: int
+    pic: str
+    title: str
+    desc: str
+    cid: int
+    owner: VideoOwnerData
+    pages: List[VideoPagesLiteItemData]
+    staff: Optional[List[VideoStaffLiteItemData]] = None
+
+
+class GetVideoInfoLiteResponse(BaseResponseModel):
+
+    data: Optional[GetVideoInfoLiteData] = None
+
+
 class VideoStreamMetaDURLItemData(BaseModel):
 
     order: int
@@ -0,0 +1,122 @@
+"""
+Pool of keep-alive HTTP sessions shared by proxy requests
+"""
+from contextlib import contextmanager
+import queue
+import threading
+import time
+from typing import Callable, Iterator, Optional, Tuple
+
+import requests
+from requests import Response
+from requests.adapters import BaseAdapter
+
+from .backend import HTTPBackend
+from .dns import DNSCacheAdapter
+from .constants import (
+    DEFAULT_POOL_CONNECTIONS,
+    DEFAULT_POOL_MAXSIZE,
+    DEFAULT_SESSION_LIFETIME,
+    DEFAULT_SESSION_POOL_SIZE
+)
+
+
+__all__ = ['SessionPool']
+
+
+class SessionPool(HTTPBackend):
+    """
+    Sessions are lent to one thread at a time, so cookie jars and
+    adapters are never mutated concurrently, while their underlying
+    connection pools keep TCP/TLS connections alive per host.
+
+    Cookies like SESSDATA should be passed per request, since
+    cookies received by a session are dropped when it is returned.
+
+    size: maximum count of idle sessions kept for reuse
+    pool_connections: count of hosts whose connections are cached per session
+    pool_maxsize: maximum count of keep-alive connections per host per session
+    lifetime: seconds before a session is retired, None means never
+    adapter_factory: builds the transport adapter of each session instead of DNSCacheAdapter,
+    e.g. to record or replay responses
+    """
+
+    def __init__(
+        self,
+        size: int = DEFAULT_SESSION_POOL_SIZE,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        lifetime: Optional[float] = DEFAULT_SESSION_LIFETIME,
+        adapter_factory: Optional[Callable[[], BaseAdapter]] = None
+    ):
+        self._pool_connections = pool_connections
+        self._pool_maxsize = pool_maxsize
+        self._lifetime = lifetime
+        self._adapter_factory = adapter_factory
+        # LIFO keeps the most recently used, thus warmest, sessions in service
+        self._idle: queue.LifoQueue = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        if self._adapter_factory is not None:
+            adapter = self._adapter_factory()
+        else:
+            adapter = DNSCacheAdapter(
+                pool_connections=self._pool_connections,
+                pool_maxsize=self._pool_maxsize
+            )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _is_expired(self, created_at: float) -> bool:
+        if self._lifetime is None:
+            return False
+        return time.monotonic() - created_at >= self._lifetime
+
+    def _acquire(self) -> Tuple[float, requests.Session]:
+        while True:
+            try:
+                created_at, session = self._idle.get_nowait()
+            except queue.Empty:
+                return time.monotonic(), self._create_session()
+            if not self._is_expired(created_at):
+                return created_at, session
+            session.close()
+
+    def _release(self, created_at: float, session: requests.Session) -> None:
+        session.cookies.clear()
+        with self._lock:
+            if not self._closed and not self._is_expired(created_at):
+                try:
+                    self._idle.put_nowait((created_at, session))
+                    return
+                except queue.Full:
+                    pass
+        session.close()
+
+    @contextmanager
+    def session(self) -> Iterator[requests.Session]:
+        if self._closed:
+            raise RuntimeError('session pool is closed')
+        created_at, session = self._acquire()
+        try:
+            yield session
+        finally:
+            self._release(created_at, session)
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        with self.session() as session:
+            return session.request(method, url, **kwargs)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                _, session = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            session.close()
@@ -0,0 +1,83 @@
+"""
+De-duplication of identical concurrent calls
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+__all__ = ['AsyncSingleFlight', 'SingleFlight']
+
+
+class _Call:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Threads calling do with one key while a call of it is in flight
+    wait for that call and share its result or exception,
+    rather than issuing their own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    """
+    Coroutines calling do with one key while a call of it is in flight
+    await that call and share its result or exception.
+
+    The call runs as a task of its own, so cancelling the caller
+    which started it does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[int, str], asyncio.Task] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        # tasks are bound to their event loop
+        flight_key = (id(asyncio.get_running_loop()), key)
+        task = self._calls.get(flight_key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[flight_key] = task
+            task.add_done_callback(lambda _: self._calls.pop(flight_key, None))
+        return await asyncio.shield(task)
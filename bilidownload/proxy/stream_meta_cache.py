@@ -0,0 +1,260 @@
+"""
+Cache of stream meta responses, whose entries live as long as their URLs
+"""
+from collections import OrderedDict
+import threading
+import time
+from typing import Callable, Iterator, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from pydantic import BaseModel
+
+from .cache import CacheStats
+from .constants import (
+    DEFAULT_STREAM_META_CACHE_MAX_SIZE,
+    DEFAULT_STREAM_META_EXPIRY_MARGIN,
+    DEFAULT_STREAM_META_KEEP_FRESH,
+    DEFAULT_STREAM_META_REFRESH_AHEAD,
+    DEFAULT_STREAM_META_TTL,
+    STREAM_URL_DEADLINE_PARAM
+)
+
+
+__all__ = ['get_deadline', 'get_url_deadline', 'iter_stream_urls', 'StreamMetaCache']
+
+
+def get_url_deadline(url: str) -> Optional[float]:
+    """
+    Unix time when url expires, None when it carries no deadline
+    """
+    values = parse_qs(urlsplit(url).query).get(STREAM_URL_DEADLINE_PARAM)
+    if not values:
+        return None
+    try:
+        return float(values[0])
+    except ValueError:
+        return None
+
+
+def iter_stream_urls(value: BaseModel) -> Iterator[str]:
+    """
+    URLs of every stream in a stream meta response, mirrors included
+    """
+    # result of bangumi, data of video and cheese
+    data = getattr(value, 'result', None) or getattr(value, 'data', None)
+    if data is None:
+        return
+    dash = getattr(data, 'dash', None)
+    if dash is not None:
+        items = [*dash.video, *(dash.audio or []), *(dash.dolby.audio or [])]
+        if dash.flac is not None and dash.flac.audio is not None:
+            items.append(dash.flac.audio)
+        for item in items:
+            yield item.base_url
+            yield from item.backup_url
+    for item in getattr(data, 'durl', None) or []:
+        yield item.url
+        yield from item.backup_url
+
+
+def get_deadline(value: BaseModel) -> Optional[float]:
+    """
+    the earliest deadline of stream URLs in a stream meta response
+    """
+    deadlines = [
+        deadline for deadline in map(get_url_deadline, iter_stream_urls(value)) if deadline is not None
+    ]
+    return min(deadlines, default=None)
+
+
+class _Entry:
+
+    __slots__ = ('value', 'expires_at', 'refresh_at', 'refresh', 'used_at')
+
+    def __init__(
+        self,
+        value: BaseModel,
+        expires_at: float,
+        refresh_at: float,
+        refresh: Optional[Callable[[], Optional[BaseModel]]],
+        used_at: float
+    ):
+        self.value = value
+        self.expires_at = expires_at
+        self.refresh_at = refresh_at
+        self.refresh = refresh
+        self.used_at = used_at
+
+
+class StreamMetaCache:
+    """
+    LRU cache of stream meta responses, an entry is served until margin seconds
+    before the earliest deadline of its URLs, or for ttl seconds when they carry none
+
+    An entry given a refresh function is fetched again in background
+    refresh_ahead seconds before it expires, as long as it was used within
+    keep_fresh seconds, so that downloads queued behind resolving metas
+    still find valid URLs without waiting for another request.
+    refresh returns the new response, or None to keep the current one until it expires
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_STREAM_META_CACHE_MAX_SIZE,
+        margin: float = DEFAULT_STREAM_META_EXPIRY_MARGIN,
+        ttl: float = DEFAULT_STREAM_META_TTL,
+        refresh_ahead: float = DEFAULT_STREAM_META_REFRESH_AHEAD,
+        keep_fresh: float = DEFAULT_STREAM_META_KEEP_FRESH
+    ):
+        self._max_size = max_size
+        self._margin = margin
+        self._ttl = ttl
+        self._refresh_ahead = refresh_ahead
+        self._keep_fresh = keep_fresh
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._condition = threading.Condition()
+        self._refresher: Optional[threading.Thread] = None
+        self._is_closed = False
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._refreshes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> CacheStats:
+        with self._condition:
+            return CacheStats(self._hits, self._misses, self._evictions, len(self._entries))
+
+    @property
+    def refreshes(self) -> int:
+        """
+        count of entries replaced by background refreshes
+        """
+        return self._refreshes
+
+    def get_expires_at(self, value: BaseModel, now: Optional[float] = None) -> float:
+        """
+        Unix time until when value is served
+        """
+        deadline = get_deadline(value)
+        if deadline is None:
+            return (now if now is not None else time.time()) + self._ttl
+        return deadline - self._margin
+
+    def get(self, key: str) -> Optional[BaseModel]:
+        """
+        cached response of key, None when absent or expired
+        """
+        with self._condition:
+            entry = self._entries.get(key)
+            now = time.time()
+            if entry is not None:
+                if entry.expires_at > now:
+                    entry.used_at = now
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry.value
+                del self._entries[key]
+            self._misses += 1
+            return None
+
+    def set(
+        self,
+        key: str,
+        value: BaseModel,
+        refresh: Optional[Callable[[], Optional[BaseModel]]] = None
+    ) -> None:
+        self._store(key, value, refresh, time.time())
+
+    def _store(
+        self,
+        key: str,
+        value: BaseModel,
+        refresh: Optional[Callable[[], Optional[BaseModel]]],
+        used_at: float,
+        is_refreshed: bool = False
+    ) -> None:
+        now = time.time()
+        expires_at = self.get_expires_at(value, now)
+        if expires_at <= now:
+            return
+        # not before half of its life, so URLs of short deadlines are not refreshed in a busy loop
+        refresh_at = max(expires_at - self._refresh_ahead, now + (expires_at - now) / 2)
+        with self._condition:
+            if self._is_closed:
+                return
+            if is_refreshed:
+                if key not in self._entries:
+                    # invalidated or evicted while refreshing
+                    return
+                self._refreshes += 1
+            self._entries[key] = _Entry(value, expires_at, refresh_at, refresh, used_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+            if refresh is not None:
+                self._start_refresher()
+                self._condition.notify()
+
+    def invalidate(self, key: str) -> None:
+        with self._condition:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._condition:
+            self._entries.clear()
+
+    def close(self) -> None:
+        """
+        stop refreshing and drop every entry
+        """
+        with self._condition:
+            self._is_closed = True
+            self._entries.clear()
+            self._condition.notify_all()
+
+    def _start_refresher(self) -> None:
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        self._refresher = threading.Thread(
+            target=self._refresh_forever, name='stream-meta-refresher', daemon=True
+        )
+        self._refresher.start()
+
+    def _get_next_refresh(self) -> Tuple[Optional[str], Optional[float]]:
+        """
+        key of an entry due to refresh, otherwise seconds until the next one is due
+        """
+        now = time.time()
+        wait = None
+        for key, entry in self._entries.items():
+            if entry.refresh is None or now - entry.used_at > self._keep_fresh:
+                continue
+            if entry.refresh_at <= now:
+                return key, None
+            wait = min(wait, entry.refresh_at - now) if wait is not None else entry.refresh_at - now
+        return None, wait
+
+    def _refresh_forever(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    if self._is_closed:
+                        return
+                    key, wait = self._get_next_refresh()
+                    if key is not None:
+                        break
+                    self._condition.wait(wait)
+                entry = self._entries[key]
+                refresh, used_at = entry.refresh, entry.used_at
+                # tried once, a failed refresh leaves the entry served until it expires
+                entry.refresh = None
+            try:
+                value = refresh()
+            except Exception:
+                continue
+            if value is not None:
+                self._store(key, value, refresh, used_at, is_refreshed=True)
@@ -0,0 +1,20 @@
+"""
+Helpers on raw API responses
+"""
+import re
+from typing import Optional
+
+
+__all__ = ['sniff_response_code']
+
+
+# response code is the first field of API responses, no need to parse the whole body
+RESPONSE_CODE_PATTERN = re.compile(rb'"code"\s*:\s*(-?\d+)')
+RESPONSE_CODE_SNIFF_LENGTH = 128
+
+
+def sniff_response_code(content: bytes) -> Optional[int]:
+    search_result = RESPONSE_CODE_PATTERN.search(content[:RESPONSE_CODE_SNIFF_LENGTH])
+    if search_result is None:
+        return None
+    return int(search_result.group(1))
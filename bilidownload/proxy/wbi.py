@@ -0,0 +1,91 @@
+"""
+WBI signing of request params, by the mixin key derived from nav response
+"""
+import hashlib
+import posixpath
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode, urlsplit
+
+from .constants import (
+    DEFAULT_WBI_KEY_TTL,
+    WBI_FILTERED_CHARS,
+    WBI_MIXIN_KEY_ENC_TAB,
+    WBI_MIXIN_KEY_LENGTH,
+    WBI_SIGNATURE_PARAM,
+    WBI_TIMESTAMP_PARAM
+)
+
+
+__all__ = ['get_mixin_key', 'get_wbi_key', 'sign_params', 'WbiKeyCache']
+
+
+_FILTER_TABLE = str.maketrans('', '', WBI_FILTERED_CHARS)
+
+
+def get_wbi_key(url: str) -> str:
+    """
+    key carried by img_url or sub_url of nav response, the stem of its file name
+    """
+    return posixpath.splitext(posixpath.basename(urlsplit(url).path))[0]
+
+
+def get_mixin_key(img_key: str, sub_key: str) -> str:
+    raw_key = img_key + sub_key
+    return ''.join(raw_key[index] for index in WBI_MIXIN_KEY_ENC_TAB)[:WBI_MIXIN_KEY_LENGTH]
+
+
+def sign_params(
+    params: Dict[str, Any],
+    mixin_key: str,
+    timestamp: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    params with wts and w_rid added, sorted by name as the signature requires
+    """
+    signed = {
+        key: str(value).translate(_FILTER_TABLE)
+        for key, value in params.items() if key not in (WBI_TIMESTAMP_PARAM, WBI_SIGNATURE_PARAM)
+    }
+    signed[WBI_TIMESTAMP_PARAM] = str(timestamp if timestamp is not None else int(time.time()))
+    signed = dict(sorted(signed.items()))
+    query = urlencode(signed)
+    signed[WBI_SIGNATURE_PARAM] = hashlib.md5((query + mixin_key).encode('utf-8')).hexdigest()
+    return signed
+
+
+class WbiKeyCache:
+    """
+    Mixin key kept for ttl seconds, keys of nav rotate daily,
+    so signing a request costs a hash instead of a nav request
+    """
+
+    def __init__(self, ttl: float = DEFAULT_WBI_KEY_TTL):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._mixin_key: Optional[str] = None
+        self._expires_at = 0.0
+
+    def get(self) -> Optional[str]:
+        """
+        mixin key, None when absent or expired
+        """
+        with self._lock:
+            if self._mixin_key is None or self._expires_at <= time.monotonic():
+                return None
+            return self._mixin_key
+
+    def set(self, img_url: str, sub_url: str) -> str:
+        mixin_key = get_mixin_key(get_wbi_key(img_url), get_wbi_key(sub_url))
+        with self._lock:
+            self._mixin_key = mixin_key
+            self._expires_at = time.monotonic() + self._ttl
+        return mixin_key
+
+    def invalidate(self) -> None:
+        """
+        drop the mixin key, e.g. when a request signed by it is rejected
+        """
+        with self._lock:
+            self._mixin_key = None
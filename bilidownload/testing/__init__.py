@@ -0,0 +1,16 @@
+"""
+Utilities on running bilidownload without Bilibili
+"""
+from .payloads import build_payload  # NOQA
+from .server import FakeBilibiliServer  # NOQA
+from .transport import (
+    AsyncRecordingTransport,  # NOQA
+    AsyncRedirectTransport,  # NOQA
+    AsyncReplayTransport,  # NOQA
+    FixtureMissingError,  # NOQA
+    FixtureStore,  # NOQA
+    RecordingAdapter,  # NOQA
+    RedirectAdapter,  # NOQA
+    RedirectTransport,  # NOQA
+    ReplayAdapter  # NOQA
+)
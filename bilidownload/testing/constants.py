@@ -0,0 +1,15 @@
+"""
+Constants of testing utilities
+"""
+
+
+DEFAULT_FAKE_MEDIA_SIZE = 4 * 1024 * 1024  # bytes of each media file served by FakeBilibiliServer
+DEFAULT_FAKE_EPISODES = 20                 # pages or episodes of each work
+DEFAULT_FAKE_MIRRORS = 2                   # backup_url of each media
+FAKE_QUALITIES = (80, 64, 32, 16)          # qn of fake video streams, best first
+FAKE_AUDIO_ID = 30280
+FAKE_DURATION = 100                        # seconds of each work
+DEFAULT_FAKE_URL_LIFETIME = 7200           # seconds media URLs are valid for, as deadline of them tells
+FAKE_MEDIA_CHUNK = 64 * 1024
+FAKE_WBI_IMG_KEY = '7cd084941338484aae1ad9425b84077c'  # WBI keys nav of FakeBilibiliServer carries
+FAKE_WBI_SUB_KEY = '4932caff0ff746eab6f01bf08b70ac45'
@@ -0,0 +1,78 @@
+"""
+Synthetic Bilibili API payloads built from response models
+"""
+import itertools
+import types
+import typing
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+
+__all__ = ['build_payload']
+
+
+URL_FIELD_HINTS = ('url', 'cover', 'link', 'face', 'avatar', 'pic', 'image', 'img', 'icon')
+
+
+class _PayloadBuilder:
+
+    def __init__(self, list_sizes: Dict[str, int], default_list_size: int):
+        self._list_sizes = list_sizes
+        self._default_list_size = default_list_size
+        self._counter = itertools.count(1)
+
+    def build(self, annotation: Any, name: str) -> Any:
+        origin = typing.get_origin(annotation)
+        args = typing.get_args(annotation)
+        if origin in (typing.Union, types.UnionType):
+            candidates = [arg for arg in args if arg is not type(None)]
+            return self.build(candidates[0], name) if candidates else None
+        if origin in (list, typing.List):
+            size = self._list_sizes.get(name, self._default_list_size)
+            return [self.build(args[0], name) for _ in range(size)]
+        if annotation is typing.Any or annotation is type(None) or annotation is None:
+            return None
+        if annotation is dict:
+            return {}
+        if annotation is bool:
+            return next(self._counter) % 2 == 0
+        if annotation is int:
+            return 100000 + next(self._counter)
+        if annotation is float:
+            return next(self._counter) / 10
+        if annotation is str:
+            index = next(self._counter)
+            if any(hint in name.lower() for hint in URL_FIELD_HINTS):
+                return f'https://i0.hdslb.com/bfs/archive/{index:040x}.jpg'
+            return f'{name} {index}'
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            return self.build_model(annotation)
+        raise TypeError(f'unsupported annotation {annotation!r} of field {name}')
+
+    def build_model(self, model: typing.Type[BaseModel]) -> Dict[str, Any]:
+        return {
+            field.alias or name: self.build(field.annotation, name)
+            for name, field in model.model_fields.items()
+        }
+
+
+def build_payload(
+    model: typing.Type[BaseModel],
+    list_sizes: Optional[Dict[str, int]] = None,
+    default_list_size: int = 2,
+    **overrides: Any
+) -> Dict[str, Any]:
+    """
+    JSON-compatible dict which validates against model,
+    values are synthetic but sized like real responses
+
+    list_sizes: item count of list fields by field name, e.g. {'episodes': 500}
+    default_list_size: item count of other list fields
+    overrides: top level fields replacing the synthetic ones, 'code' is 0 by default
+    """
+    payload = _PayloadBuilder(list_sizes or {}, default_list_size).build_model(model)
+    if 'code' in payload:
+        payload['code'] = 0
+    payload.update(overrides)
+    return payload
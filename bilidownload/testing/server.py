@@ -0,0 +1,406 @@
+"""
+Local stand-in of Bilibili APIs and CDN
+"""
+import copy
+from http.cookies import SimpleCookie
+import http.server
+import json
+import re
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Type
+from urllib.parse import parse_qsl, urlsplit
+
+from pydantic import BaseModel
+
+from .constants import (
+    DEFAULT_FAKE_EPISODES,
+    DEFAULT_FAKE_MEDIA_SIZE,
+    DEFAULT_FAKE_MIRRORS,
+    DEFAULT_FAKE_URL_LIFETIME,
+    FAKE_AUDIO_ID,
+    FAKE_DURATION,
+    FAKE_MEDIA_CHUNK,
+    FAKE_QUALITIES,
+    FAKE_WBI_IMG_KEY,
+    FAKE_WBI_SUB_KEY
+)
+from .payloads import build_payload
+from .transport import AsyncRedirectTransport, RedirectAdapter, RedirectTransport
+from ..proxy import (
+    GetBangumiDetailResponse,
+    GetBangumiStreamMetaResponse,
+    GetCheeseDetailResponse,
+    GetCheeseStreamMetaResponse,
+    GetUserInfoLoginResponse,
+    GetVideoInfoResponse,
+    GetVideoStreamMetaResponse
+)
+from ..proxy.constants import (
+    PGC_AVAILABLE_EPISODE_STATUS_CODE,
+    PUGV_AVAILABLE_EPISODE_STATUS_CODE,
+    REQUEST_PGC_INFO_URL,
+    REQUEST_PGC_STREAM_META_URL,
+    REQUEST_PUGV_INFO_URL,
+    REQUEST_PUGV_STREAM_META_URL,
+    REQUEST_VIDEO_INFO_URL,
+    REQUEST_VIDEO_STREAM_META_URL,
+    REQUEST_WEB_USER_INFO_URL,
+    WBI_REJECTED_CODE,
+    WBI_SIGNATURE_PARAM,
+    WBI_TIMESTAMP_PARAM
+)
+from ..proxy.wbi import get_mixin_key, sign_params
+
+
+__all__ = ['FakeBilibiliServer']
+
+
+MEDIA_PATH_PREFIX = '/cdn/'
+# replaced by Unix time when media URLs expire, on each response
+DEADLINE_PLACEHOLDER = '{deadline}'
+RANGE_PATTERN = re.compile(r'bytes=(\d+)-(\d*)')
+NOT_FOUND_BODY = json.dumps({'code': -404, 'message': '啥都木有', 'ttl': 1}).encode('utf-8')
+WBI_REJECTED_BODY = json.dumps(
+    {'code': WBI_REJECTED_CODE, 'message': '访问权限不足', 'ttl': 1}
+).encode('utf-8')
+WBI_PATHS = (urlsplit(REQUEST_VIDEO_STREAM_META_URL).path,)
+USER_INFO_PATH = urlsplit(REQUEST_WEB_USER_INFO_URL).path
+NOT_LOGIN_CODE = -101
+# media bytes are i % 256 at offset i, sliced from this block whatever the offset
+MEDIA_BLOCK = bytes(range(256)) * (FAKE_MEDIA_CHUNK // 256) * 2
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    server: '_HTTPServer'
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def _send(self, status_code: int, headers: Dict[str, str], body: bytes = b'') -> None:
+        self.send_response(status_code)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        fake = self.server.fake
+        path = urlsplit(self.path).path
+        fake.count_hit(path)
+        session_data = self._get_session_data()
+        if session_data is not None:
+            fake.count_session_hit(session_data)
+        if fake.latency:
+            time.sleep(fake.latency)
+        if path.startswith(MEDIA_PATH_PREFIX):
+            self._send_media(fake)
+            return
+        body = fake.payloads.get(path)
+        if path == USER_INFO_PATH and fake.accounts is not None:
+            body = fake.get_user_info(session_data)
+        if body is None:
+            self._send(404, {'Content-Type': 'application/json'}, NOT_FOUND_BODY)
+            return
+        if path in WBI_PATHS and not fake.is_signed(urlsplit(self.path).query):
+            self._send(200, {'Content-Type': 'application/json; charset=utf-8'}, WBI_REJECTED_BODY)
+            return
+        deadline = str(int(time.time() + fake.url_lifetime))
+        body = body.replace(DEADLINE_PLACEHOLDER.encode('ascii'), deadline.encode('ascii'))
+        self._send(200, {'Content-Type': 'application/json; charset=utf-8'}, body)
+
+    def _get_session_data(self) -> Optional[str]:
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        morsel = cookie.get('SESSDATA')
+        return morsel.value if morsel is not None else None
+
+    def do_HEAD(self) -> None:
+        fake = self.server.fake
+        path = urlsplit(self.path).path
+        fake.count_hit(path)
+        if not path.startswith(MEDIA_PATH_PREFIX):
+            self.send_response(405)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self._send_media(fake, has_body=False)
+
+    def _send_media(self, fake: 'FakeBilibiliServer', has_body: bool = True) -> None:
+        size = fake.media_size
+        start, end, status_code = 0, size - 1, 200
+        range_header = self.headers.get('Range')
+        if range_header:
+            search_result = RANGE_PATTERN.fullmatch(range_header.strip())
+            if search_result is None or int(search_result.group(1)) >= size:
+                self._send(416, {'Content-Range': f'bytes */{size}'})
+                return
+            start = int(search_result.group(1))
+            if search_result.group(2):
+                end = min(int(search_result.group(2)), size - 1)
+            status_code = 206
+
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Accept-Ranges', 'bytes')
+        # changes along with the stream, as a CDN's does
+        self.send_header('ETag', f'"{size:x}"')
+        self.send_header('Content-Length', str(end - start + 1))
+        if status_code == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        self.end_headers()
+        if not has_body:
+            return
+
+        started_at, sent = time.monotonic(), 0
+        offset = start
+        while offset <= end:
+            length = min(FAKE_MEDIA_CHUNK, end - offset + 1)
+            block_offset = offset % FAKE_MEDIA_CHUNK
+            self.wfile.write(MEDIA_BLOCK[block_offset:block_offset + length])
+            offset += length
+            sent += length
+            if fake.bandwidth:
+                delay = started_at + sent / fake.bandwidth - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+
+class _HTTPServer(http.server.ThreadingHTTPServer):
+
+    daemon_threads = True
+    fake: 'FakeBilibiliServer'
+
+    def handle_error(self, request, client_address) -> None:
+        # clients drop connections of streams on purpose, e.g. a cancelled download
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeBilibiliServer:
+    """
+    Local stand-in of Bilibili, serving synthetic but valid responses of
+    video, bangumi and cheese info and stream meta, and user info,
+    on the same paths as Bilibili,
+    and media files under /cdn/ whose stream meta points to, with Range supported.
+
+    Requests are sent to it by RedirectAdapter and AsyncRedirectTransport, e.g.
+
+        with FakeBilibiliServer(latency=0.05) as server:
+            ProxyService.configure_session_pool(adapter_factory=server.create_adapter)
+            AsyncProxyService.configure(transport_factory=server.create_async_transport)
+
+    or ProxyService.configure_backend('httpx', transport=server.create_transport()) instead.
+
+    latency: seconds before each response
+    bandwidth: bytes per second of each media response, None means unlimited
+    media_size: bytes of each media file
+    episodes: count of pages of each video, or episodes of each bangumi and cheese
+    mirrors: count of backup_url of each media
+    url_lifetime: seconds media URLs are valid for since the stream meta is served,
+    by the deadline query parameter of them, which the server itself does not check
+    accounts: SESSDATA of logged-in accounts mapped to whether each is VIP,
+    nav tells others are not logged in, None means every request is logged in
+    """
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        latency: float = 0,
+        bandwidth: Optional[float] = None,
+        media_size: int = DEFAULT_FAKE_MEDIA_SIZE,
+        episodes: int = DEFAULT_FAKE_EPISODES,
+        mirrors: int = DEFAULT_FAKE_MIRRORS,
+        url_lifetime: float = DEFAULT_FAKE_URL_LIFETIME,
+        accounts: Optional[Dict[str, bool]] = None
+    ):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.media_size = media_size
+        self.url_lifetime = url_lifetime
+        self._host = host
+        self._port = port
+        self._episodes = episodes
+        self._mirrors = mirrors
+        self._server: Optional[_HTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self.accounts = dict(accounts) if accounts is not None else None
+        self._hits: Dict[str, int] = {}
+        self._session_hits: Dict[str, int] = {}
+        self._hits_lock = threading.Lock()
+        self.payloads: Dict[str, bytes] = {}
+        # nav of VIP, non-VIP and not logged-in accounts
+        self._user_infos: Dict[Optional[bool], bytes] = {}
+
+    @property
+    def url(self) -> str:
+        if self._server is None:
+            raise RuntimeError('server is not started')
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def count_hit(self, path: str) -> None:
+        with self._hits_lock:
+            self._hits[path] = self._hits.get(path, 0) + 1
+
+    def get_hits(self) -> Dict[str, int]:
+        """
+        count of requests by path
+        """
+        with self._hits_lock:
+            return dict(self._hits)
+
+    def count_session_hit(self, session_data: str) -> None:
+        with self._hits_lock:
+            self._session_hits[session_data] = self._session_hits.get(session_data, 0) + 1
+
+    def get_session_hits(self) -> Dict[str, int]:
+        """
+        count of requests by SESSDATA they carry
+        """
+        with self._hits_lock:
+            return dict(self._session_hits)
+
+    def reset_hits(self) -> None:
+        with self._hits_lock:
+            self._hits.clear()
+            self._session_hits.clear()
+
+    def get_user_info(self, session_data: Optional[str]) -> bytes:
+        return self._user_infos[self.accounts.get(session_data) if self.accounts is not None else True]
+
+    def create_adapter(self) -> RedirectAdapter:
+        return RedirectAdapter(self.url)
+
+    def create_transport(self) -> RedirectTransport:
+        """
+        transport of HTTPXBackend sending requests to this server
+        """
+        return RedirectTransport(self.url)
+
+    def create_async_transport(self) -> AsyncRedirectTransport:
+        return AsyncRedirectTransport(self.url)
+
+    def is_signed(self, query: str) -> bool:
+        """
+        whether query is signed by WBI keys of this server, unsigned ones pass as well
+        """
+        params = dict(parse_qsl(query, keep_blank_values=True))
+        signature = params.pop(WBI_SIGNATURE_PARAM, None)
+        if signature is None:
+            return True
+        timestamp = params.pop(WBI_TIMESTAMP_PARAM, None)
+        if timestamp is None or not timestamp.isdigit():
+            return False
+        mixin_key = get_mixin_key(FAKE_WBI_IMG_KEY, FAKE_WBI_SUB_KEY)
+        return sign_params(params, mixin_key, int(timestamp))[WBI_SIGNATURE_PARAM] == signature
+
+    def _get_media_urls(self, name: str) -> List[str]:
+        query = f'?deadline={DEADLINE_PLACEHOLDER}'
+        return [
+            f'{self.url}{MEDIA_PATH_PREFIX}{name}{query}',
+            *[
+                f'{self.url}{MEDIA_PATH_PREFIX}mirror{index}/{name}{query}'
+                for index in range(1, self._mirrors + 1)
+            ]
+        ]
+
+    def _build_stream_meta(self, model: Type[BaseModel], key: str) -> Dict[str, Any]:
+        payload = build_payload(
+            model,
+            list_sizes={
+                'support_formats': len(FAKE_QUALITIES),
+                'video': len(FAKE_QUALITIES),
+                'audio': 1,
+                'backup_url': self._mirrors
+            }
+        )
+        data = payload[key]
+        data['quality'] = FAKE_QUALITIES[0]
+        data['accept_quality'] = list(FAKE_QUALITIES)
+        for item, qn in zip(data['support_formats'], FAKE_QUALITIES):
+            item['quality'] = qn
+        for item, qn in zip(data['dash']['video'], FAKE_QUALITIES):
+            base_url, *backup_url = self._get_media_urls(f'video-{qn}.m4s')
+            item.update({'id': qn, 'base_url': base_url, 'backup_url': backup_url})
+        for item in data['dash']['audio']:
+            base_url, *backup_url = self._get_media_urls(f'audio-{FAKE_AUDIO_ID}.m4s')
+            item.update({'id': FAKE_AUDIO_ID, 'base_url': base_url, 'backup_url': backup_url})
+        # bandwidth times duration estimates the size of media as real stream meta does
+        data['dash']['duration'] = FAKE_DURATION
+        for item in (*data['dash']['video'], *data['dash']['audio']):
+            item['bandwidth'] = self.media_size * 8 // FAKE_DURATION
+        data['dash']['dolby']['audio'] = None
+        data['dash']['flac'] = None
+        return payload
+
+    def _build_payloads(self) -> Dict[str, bytes]:
+        video_info = build_payload(GetVideoInfoResponse, list_sizes={'pages': self._episodes})
+        # cid of a video is the one of its first page
+        video_info['data']['cid'] = video_info['data']['pages'][0]['cid']
+        bangumi_info = build_payload(GetBangumiDetailResponse, list_sizes={'episodes': self._episodes})
+        for episode in bangumi_info['result']['episodes']:
+            episode['status'] = PGC_AVAILABLE_EPISODE_STATUS_CODE
+        cheese_info = build_payload(GetCheeseDetailResponse, list_sizes={'episodes': self._episodes})
+        for episode in cheese_info['data']['episodes']:
+            episode['status'] = PUGV_AVAILABLE_EPISODE_STATUS_CODE
+        wbi_img = {
+            'img_url': f'https://i0.hdslb.com/bfs/wbi/{FAKE_WBI_IMG_KEY}.png',
+            'sub_url': f'https://i0.hdslb.com/bfs/wbi/{FAKE_WBI_SUB_KEY}.png'
+        }
+        user_info = build_payload(GetUserInfoLoginResponse)
+        user_info['data'].update({'isLogin': True, 'wbi_img': wbi_img, 'vipStatus': 1})
+        non_vip_user_info = copy.deepcopy(user_info)
+        non_vip_user_info['data'].update({'vipStatus': 0, 'vipType': 0})
+        not_login_user_info = {
+            'code': NOT_LOGIN_CODE,
+            'message': '账号未登录',
+            'ttl': 1,
+            'data': {'isLogin': False, 'wbi_img': wbi_img}
+        }
+        self._user_infos = {
+            key: json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            for key, payload in ((True, user_info), (False, non_vip_user_info), (None, not_login_user_info))
+        }
+        payloads = {
+            REQUEST_VIDEO_INFO_URL: video_info,
+            REQUEST_VIDEO_STREAM_META_URL: self._build_stream_meta(GetVideoStreamMetaResponse, 'data'),
+            REQUEST_PGC_INFO_URL: bangumi_info,
+            REQUEST_PGC_STREAM_META_URL: self._build_stream_meta(GetBangumiStreamMetaResponse, 'result'),
+            REQUEST_PUGV_INFO_URL: cheese_info,
+            REQUEST_PUGV_STREAM_META_URL: self._build_stream_meta(GetCheeseStreamMetaResponse, 'data'),
+            REQUEST_WEB_USER_INFO_URL: user_info
+        }
+        return {
+            urlsplit(url).path: json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            for url, payload in payloads.items()
+        }
+
+    def start(self) -> 'FakeBilibiliServer':
+        if self._server is not None:
+            return self
+        self._server = _HTTPServer((self._host, self._port), _Handler)
+        self._server.fake = self
+        self.payloads = self._build_payloads()
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        server, self._server = self._server, None
+        if server is None:
+            return
+        server.shutdown()
+        server.server_close()
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self) -> 'FakeBilibiliServer':
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
@@ -0,0 +1,284 @@
+"""
+Transports recording real responses to fixture files and replaying them,
+or redirecting requests to a local server, for requests and httpx
+"""
+import hashlib
+import io
+import json
+import os
+import re
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from requests import PreparedRequest, Response
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from ..proxy.constants import WBI_SIGNATURE_PARAM, WBI_TIMESTAMP_PARAM
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+__all__ = [
+    'AsyncRecordingTransport',
+    'AsyncRedirectTransport',
+    'AsyncReplayTransport',
+    'FixtureMissingError',
+    'FixtureStore',
+    'RecordingAdapter',
+    'RedirectAdapter',
+    'RedirectTransport',
+    'ReplayAdapter'
+]
+
+
+# headers describing the wire encoding, which no longer applies to stored bodies
+WIRE_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'connection')
+RANGE_PATTERN = re.compile(r'bytes=(\d+)-(\d*)')
+
+
+class FixtureMissingError(LookupError):
+    pass
+
+
+class FixtureStore:
+    """
+    Responses keyed by method and URL, query parameters sorted,
+    each is saved as <name>.json of status and headers beside <name>.body
+
+    Range of requests is not a part of the key, so a recorded full body
+    serves ranges of it as well. Neither are WBI timestamp and signature,
+    which differ on every request.
+    """
+
+    def __init__(self, directory: str):
+        self._directory = directory
+
+    def get_name(self, method: str, url: str) -> str:
+        parts = urlsplit(url)
+        query = urlencode(sorted(
+            (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if key not in (WBI_SIGNATURE_PARAM, WBI_TIMESTAMP_PARAM)
+        ))
+        normalized = urlunsplit((parts.scheme, parts.netloc, parts.path, query, ''))
+        digest = hashlib.sha256(f'{method.upper()} {normalized}'.encode('utf-8')).hexdigest()[:16]
+        readable = re.sub(r'[^a-zA-Z0-9]+', '_', f'{parts.hostname}{parts.path}').strip('_')
+        return f'{method.lower()}_{readable}_{digest}'
+
+    def _get_paths(self, method: str, url: str) -> Tuple[str, str]:
+        path = os.path.join(self._directory, self.get_name(method, url))
+        return f'{path}.json', f'{path}.body'
+
+    def load(self, method: str, url: str) -> Tuple[int, Dict[str, str], bytes]:
+        meta_path, body_path = self._get_paths(method, url)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except FileNotFoundError:
+            raise FixtureMissingError(f'no fixture of {method} {url} in {self._directory}') from None
+        return meta['status_code'], meta['headers'], body
+
+    def save(self, method: str, url: str, status_code: int, headers: Dict[str, str], body: bytes) -> None:
+        os.makedirs(self._directory, exist_ok=True)
+        meta_path, body_path = self._get_paths(method, url)
+        with open(body_path, 'wb') as f:
+            f.write(body)
+        meta = {
+            'method': method.upper(),
+            'url': url,
+            'status_code': status_code,
+            'headers': {key: value for key, value in headers.items() if key.lower() not in WIRE_HEADERS}
+        }
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    def replay(
+        self,
+        method: str,
+        url: str,
+        range_header: Optional[str] = None
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        stored response, sliced into a partial one when a range is requested
+        """
+        status_code, headers, body = self.load(method, url)
+        headers = dict(headers)
+        search_result = RANGE_PATTERN.fullmatch(range_header.strip()) if range_header else None
+        if search_result is not None and status_code == 200:
+            start = int(search_result.group(1))
+            end = int(search_result.group(2)) if search_result.group(2) else len(body) - 1
+            end = min(end, len(body) - 1)
+            headers['Content-Range'] = f'bytes {start}-{end}/{len(body)}'
+            status_code, body = 206, body[start:end + 1]
+        headers['Content-Length'] = str(len(body))
+        return status_code, headers, body
+
+
+def _build_response(
+    request: PreparedRequest,
+    status_code: int,
+    headers: Dict[str, str],
+    body: bytes,
+    adapter: BaseAdapter
+) -> Response:
+    response = Response()
+    response.status_code = status_code
+    response.headers = CaseInsensitiveDict(headers)
+    response.raw = io.BytesIO(body)
+    response.url = request.url
+    response.request = request
+    response.connection = adapter
+    response.reason = 'Replayed'
+    return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Serve requests from fixtures only, FixtureMissingError is raised for unknown ones
+    """
+
+    def __init__(self, directory: str):
+        super().__init__()
+        self._store = FixtureStore(directory)
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        status_code, headers, body = self._store.replay(
+            request.method, request.url, request.headers.get('Range')
+        )
+        return _build_response(request, status_code, headers, body, self)
+
+    def close(self) -> None:
+        pass
+
+
+class RecordingAdapter(HTTPAdapter):
+    """
+    Send requests as HTTPAdapter does, saving each complete response to fixtures,
+    partial responses of Range requests are not saved
+    """
+
+    def __init__(self, directory: str, **kwargs):
+        super().__init__(**kwargs)
+        self._store = FixtureStore(directory)
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        response = super().send(request, **kwargs)
+        if response.status_code != 206:
+            # body is kept by response, so it could still be iterated when streamed
+            self._store.save(
+                request.method, request.url, response.status_code, dict(response.headers), response.content
+            )
+        return response
+
+
+class RedirectAdapter(HTTPAdapter):
+    """
+    Send requests of any host to base_url instead, keeping their paths and queries,
+    e.g. to a FakeBilibiliServer
+    """
+
+    def __init__(self, base_url: str, **kwargs):
+        super().__init__(**kwargs)
+        parts = urlsplit(base_url)
+        self._scheme, self._netloc = parts.scheme, parts.netloc
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        parts = urlsplit(request.url)
+        redirected = request.copy()
+        redirected.url = urlunsplit((self._scheme, self._netloc, parts.path, parts.query, ''))
+        return super().send(redirected, **kwargs)
+
+
+def _check_httpx() -> None:
+    if httpx is None:
+        raise ImportError('httpx is required by asynchronous transports, install bilidownload[async]')
+
+
+_AsyncBaseTransport = httpx.AsyncBaseTransport if httpx is not None else object
+_AsyncHTTPTransport = httpx.AsyncHTTPTransport if httpx is not None else object
+_HTTPTransport = httpx.HTTPTransport if httpx is not None else object
+
+
+def _redirect(request: 'httpx.Request', base_url: 'httpx.URL') -> None:
+    request.url = request.url.copy_with(scheme=base_url.scheme, host=base_url.host, port=base_url.port)
+    request.headers['Host'] = base_url.netloc.decode('ascii')
+
+
+class RedirectTransport(_HTTPTransport):
+    """
+    Send requests of any host to base_url instead, keeping their paths and queries,
+    for HTTPXBackend
+    """
+
+    def __init__(self, base_url: str, **kwargs):
+        _check_httpx()
+        super().__init__(**kwargs)
+        self._base_url = httpx.URL(base_url)
+
+    def handle_request(self, request: 'httpx.Request') -> 'httpx.Response':
+        _redirect(request, self._base_url)
+        return super().handle_request(request)
+
+
+class AsyncReplayTransport(_AsyncBaseTransport):
+    """
+    Serve requests from fixtures only, FixtureMissingError is raised for unknown ones
+    """
+
+    def __init__(self, directory: str):
+        _check_httpx()
+        self._store = FixtureStore(directory)
+
+    async def handle_async_request(self, request: 'httpx.Request') -> 'httpx.Response':
+        status_code, headers, body = self._store.replay(
+            request.method, str(request.url), request.headers.get('Range')
+        )
+        return httpx.Response(status_code, headers=headers, content=body, request=request)
+
+
+class AsyncRecordingTransport(_AsyncBaseTransport):
+    """
+    Send requests by transport, AsyncHTTPTransport by default,
+    saving each complete response to fixtures
+    """
+
+    def __init__(self, directory: str, transport: Optional['httpx.AsyncBaseTransport'] = None):
+        _check_httpx()
+        self._store = FixtureStore(directory)
+        self._transport = transport if transport is not None else httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: 'httpx.Request') -> 'httpx.Response':
+        response = await self._transport.handle_async_request(request)
+        # decoded body, whose wire headers are dropped
+        body = await httpx.Response(
+            response.status_code, headers=response.headers, stream=response.stream
+        ).aread()
+        headers = {
+            key: value for key, value in response.headers.items() if key.lower() not in WIRE_HEADERS
+        }
+        if response.status_code != 206:
+            self._store.save(request.method, str(request.url), response.status_code, headers, body)
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class AsyncRedirectTransport(_AsyncHTTPTransport):
+    """
+    Send requests of any host to base_url instead, keeping their paths and queries
+    """
+
+    def __init__(self, base_url: str, **kwargs):
+        _check_httpx()
+        super().__init__(**kwargs)
+        self._base_url = httpx.URL(base_url)
+
+    async def handle_async_request(self, request: 'httpx.Request') -> 'httpx.Response':
+        _redirect(request, self._base_url)
+        return await super().handle_async_request(request)
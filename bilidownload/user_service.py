@@ -3,31 +3,41 @@ Components on Bilibili User actions
 """
 import base64
 from collections import namedtuple
-import json
 from typing import Optional, Tuple, Union
 
 from requests.cookies import RequestsCookieJar
 import rsa
 
 from .proxy import (
+    ExpiringValue,
     ProxyService,
     GetUserInfoLoginData,
     GetUserInfoNotLoginData,
     WebLoginResponse
 )
+from .proxy.constants import DEFAULT_WEB_PUBLIC_KEY_TTL, LOGIN_KEY_EXPIRED_CODES
+from .proxy.utils import sniff_response_code
 
 CaptchaParams = namedtuple('CaptchaParams', ['token', 'gt', 'challenge'])
 
 
 class UserService:
 
+    # parsed public key and salt, reused by logins within its TTL
+    _public_key: ExpiringValue[Tuple[rsa.PublicKey, str]] = ExpiringValue(DEFAULT_WEB_PUBLIC_KEY_TTL)
+
     @staticmethod
-    def _encrypt_password(password: str) -> str:
+    def _load_public_key() -> Tuple[rsa.PublicKey, str]:
         pubkey_response_dm = ProxyService.get_web_public_key_data()
         pubkey_data = pubkey_response_dm.data
         pubkey_string, salt_string = pubkey_data.key, pubkey_data.hash
 
         pubkey = rsa.PublicKey.load_pkcs1_openssl_pem(pubkey_string.encode('utf-8'))
+        return pubkey, salt_string
+
+    @classmethod
+    def _encrypt_password(cls, password: str) -> str:
+        pubkey, salt_string = cls._public_key.get(cls._load_public_key)
         salted_password = salt_string + password
 
         encrypted_pwd = rsa.encrypt(
@@ -62,8 +72,9 @@ class UserService:
         response = ProxyService.login(
             username, password, token, challenge, validate, seccode
         )
-        data = json.loads(response.content.decode('utf-8'))
-        login_response_dm = WebLoginResponse.model_validate(data)
+        if sniff_response_code(response.content) in LOGIN_KEY_EXPIRED_CODES:
+            self._public_key.invalidate()
+        login_response_dm = WebLoginResponse.model_validate_json(response.content)
         return login_response_dm, response.cookies
 
     @staticmethod
@@ -1,4 +1,4 @@
 from .bangumi import BangumiVideoComponent  # NOQA
 from .cheese import CheeseVideoComponent  # NOQA
 from .video import CommonVideoComponent  # NOQA
-from .video_service import VideoService  # NOQA
+from .video_service import VideoMetaResult, VideoService  # NOQA
@@ -2,12 +2,13 @@
 Component on Bangumi video
 """
 import os
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from .base import AbstractVideoComponent, register_component
 from .constants import (
     DEFAULT_STAFF_TITLE,
-    UNIT_CHUNK,
+    META_STREAM_FNVAL,
+    META_STREAM_QN,
     RAW_FILE_EXT,
     VideoType,
     VideoFormatNumber,
@@ -20,10 +21,12 @@ from .schemes import (
     VideoPageLiteItemData
 )
 from ..proxy import (
-    GetBangumiDetailResponse,
+    AsyncProxyService,
+    GetBangumiDetailLiteResponse,
     GetBangumiStreamMetaResponse,
     PGC_AVAILABLE_EPISODE_STATUS_CODE,
-    ProxyService
+    ProxyService,
+    SessionData
 )
 
 
@@ -37,11 +40,7 @@ class BangumiVideoComponent(AbstractVideoComponent):
         return title if title else long_title
 
     @classmethod
-    def _get_video_info(
-        cls,
-        url: str,
-        session_data: Optional[str] = None
-    ) -> GetBangumiDetailResponse:
+    def _get_video_info_params(cls, url: str) -> Dict[str, Any]:
         params = {}
         ssid = cls._get_ssid(url)
         if ssid is None:
@@ -49,9 +48,46 @@ class BangumiVideoComponent(AbstractVideoComponent):
             params.update({'epid': epid})
         else:
             params.update({'ssid': ssid})
-        res_dm = ProxyService.get_bangumi_info_data(session_data=session_data, **params)
+        return params
+
+    @classmethod
+    def _get_video_info(
+        cls,
+        url: str,
+        session_data: SessionData = None
+    ) -> GetBangumiDetailLiteResponse:
+        params = cls._get_video_info_params(url)
+        res_dm = ProxyService.get_bangumi_info_data(
+            session_data=session_data, model=GetBangumiDetailLiteResponse, **params
+        )
+        return res_dm
+
+    @classmethod
+    async def _get_video_info_async(
+        cls,
+        url: str,
+        session_data: SessionData = None
+    ) -> GetBangumiDetailLiteResponse:
+        params = cls._get_video_info_params(url)
+        res_dm = await AsyncProxyService.get_bangumi_info_data(
+            session_data=session_data, model=GetBangumiDetailLiteResponse, **params
+        )
         return res_dm
 
+    @classmethod
+    def _get_video_stream_meta_params(
+        cls,
+        epid: Optional[int] = None,
+        qn: int = VideoQualityNumber.P480.value,
+        fnval: int = VideoFormatNumber.DASH.value
+    ) -> Dict[str, Any]:
+        params = {'epid': epid}
+        params.update({
+            'qn': qn,
+            'fnval': fnval
+        })
+        return params
+
     @classmethod
     def get_video_stream_meta(
         cls,
@@ -61,16 +97,27 @@ class BangumiVideoComponent(AbstractVideoComponent):
         epid: Optional[int] = None,
         qn: int = VideoQualityNumber.P480.value,
         fnval: int = VideoFormatNumber.DASH.value,
-        session_data: Optional[str] = None,
+        session_data: SessionData = None,
     ) -> GetBangumiStreamMetaResponse:
-        params = {'epid': epid}
-        params.update({
-            'qn': qn,
-            'fnval': fnval
-        })
+        params = cls._get_video_stream_meta_params(epid, qn, fnval)
         res_dm = ProxyService.get_bangumi_stream_meta_data(session_data=session_data, **params)
         return res_dm
 
+    @classmethod
+    async def get_video_stream_meta_async(
+        cls,
+        cid: int,
+        bvid: Optional[str] = None,
+        aid: Optional[int] = None,
+        epid: Optional[int] = None,
+        qn: int = VideoQualityNumber.P480.value,
+        fnval: int = VideoFormatNumber.DASH.value,
+        session_data: SessionData = None,
+    ) -> GetBangumiStreamMetaResponse:
+        params = cls._get_video_stream_meta_params(epid, qn, fnval)
+        res_dm = await AsyncProxyService.get_bangumi_stream_meta_data(session_data=session_data, **params)
+        return res_dm
+
     @classmethod
     def _parse_work_formats(
         cls,
@@ -89,7 +136,7 @@ class BangumiVideoComponent(AbstractVideoComponent):
     @classmethod
     def _parse_work_pages(
         cls,
-        dm: GetBangumiDetailResponse
+        dm: GetBangumiDetailLiteResponse
     ) -> List[VideoPageLiteItemData]:
         pages = dm.result.episodes
         result = [
@@ -127,7 +174,7 @@ class BangumiVideoComponent(AbstractVideoComponent):
     @classmethod
     def _parse_work_staff(
         cls,
-        dm: GetBangumiDetailResponse
+        dm: GetBangumiDetailLiteResponse
     ) -> List[VideoMetaStaffItem]:
         work_staff = [dm.result.up_info]
         return [
@@ -140,15 +187,12 @@ class BangumiVideoComponent(AbstractVideoComponent):
         ]
 
     @classmethod
-    def get_video_meta(cls, url: str, session_data: Optional[str] = None) -> VideoMetaModel:
-        video_info = cls._get_video_info(url, session_data)
-        sample_episode, *_ = video_info.result.episodes
-
-        video_stream_meta = cls.get_video_stream_meta(
-            cid=sample_episode.cid,
-            epid=sample_episode.id_field,
-            session_data=session_data
-        )
+    def _build_video_meta(
+        cls,
+        url: str,
+        video_info: GetBangumiDetailLiteResponse,
+        video_stream_meta: GetBangumiStreamMetaResponse
+    ) -> VideoMetaModel:
         return VideoMetaModel(
             work_cover_url=video_info.result.cover,
             work_description=video_info.result.evaluate,
@@ -160,6 +204,59 @@ class BangumiVideoComponent(AbstractVideoComponent):
             work_has_hires_audio=True if video_stream_meta.result.dash.flac is not None else False
         )
 
+    @classmethod
+    def _get_work_id(cls, url: str) -> Optional[int]:
+        return cls._get_ssid(url)
+
+    @classmethod
+    def _get_work_id_by_info(cls, video_info: GetBangumiDetailLiteResponse) -> int:
+        return video_info.result.season_id
+
+    @classmethod
+    def _get_video_meta_by_info(
+        cls,
+        url: str,
+        video_info: GetBangumiDetailLiteResponse,
+        session_data: SessionData = None
+    ) -> VideoMetaModel:
+        sample_episode, *_ = video_info.result.episodes
+
+        video_stream_meta = cls.get_video_stream_meta(
+            cid=sample_episode.cid,
+            epid=sample_episode.id_field,
+            qn=META_STREAM_QN,
+            fnval=META_STREAM_FNVAL,
+            session_data=session_data
+        )
+        return cls._build_video_meta(url, video_info, video_stream_meta)
+
+    @classmethod
+    def get_video_meta(cls, url: str, session_data: SessionData = None) -> VideoMetaModel:
+        return cls._get_video_meta_by_info(url, cls._get_video_info(url, session_data), session_data)
+
+    @classmethod
+    async def _get_video_meta_by_info_async(
+        cls,
+        url: str,
+        video_info: GetBangumiDetailLiteResponse,
+        session_data: SessionData = None
+    ) -> VideoMetaModel:
+        sample_episode, *_ = video_info.result.episodes
+
+        video_stream_meta = await cls.get_video_stream_meta_async(
+            cid=sample_episode.cid,
+            epid=sample_episode.id_field,
+            qn=META_STREAM_QN,
+            fnval=META_STREAM_FNVAL,
+            session_data=session_data
+        )
+        return cls._build_video_meta(url, video_info, video_stream_meta)
+
+    @classmethod
+    async def get_video_meta_async(cls, url: str, session_data: SessionData = None) -> VideoMetaModel:
+        video_info = await cls._get_video_info_async(url, session_data)
+        return await cls._get_video_meta_by_info_async(url, video_info, session_data)
+
     @classmethod
     def download_data(
         cls,
@@ -171,7 +268,7 @@ class BangumiVideoComponent(AbstractVideoComponent):
         title: str = '',
         qn: int = VideoQualityNumber.P480.value,
         is_hires_audio: bool = False,
-        session_data: Optional[str] = None
+        session_data: SessionData = None
     ) -> None:
         video_stream_meta = cls.get_video_stream_meta(
             cid=cid,
@@ -183,26 +280,40 @@ class BangumiVideoComponent(AbstractVideoComponent):
             session_data=session_data
         )
 
-        video_stocks = [item for item in video_stream_meta.result.dash.video if item.id_field <= qn]
-        if not video_stocks:
-            video_stocks = [video_stream_meta.result.dash.video[0]]
-        video_src, *_ = video_stocks
-        file_path = os.path.join(location_path, title + RAW_FILE_EXT)
-        with open(file_path, 'wb') as f:
-            with ProxyService.get_video_stream_response(video_src.base_url) as response:
-                for chunk in response.iter_content(chunk_size=UNIT_CHUNK):
-                    f.write(chunk)
-
-        if is_hires_audio:
-            audio_src = video_stream_meta.result.dash.flac.audio
-        else:
-            dolby_audios = video_stream_meta.result.dash.dolby.audio
-            if dolby_audios:
-                audio_src, *_ = dolby_audios
-            else:
-                audio_src, *_ = video_stream_meta.result.dash.audio
-        audio_file_path = os.path.join(location_path, f'{title}_audio{RAW_FILE_EXT}')
-        with open(audio_file_path, 'wb') as f:
-            with ProxyService.get_video_stream_response(audio_src.base_url) as response:
-                for chunk in response.iter_content(chunk_size=UNIT_CHUNK):
-                    f.write(chunk)
+        cls._download_dash(
+            video_stream_meta.result.dash,
+            video_file_path=os.path.join(location_path, title + RAW_FILE_EXT),
+            audio_file_path=os.path.join(location_path, f'{title}_audio{RAW_FILE_EXT}'),
+            qn=qn,
+            is_hires_audio=is_hires_audio
+        )
+
+    @classmethod
+    async def download_data_async(
+        cls,
+        location_path: str,
+        cid: int,
+        bvid: Optional[str] = None,
+        aid: Optional[int] = None,
+        epid: Optional[int] = None,
+        title: str = '',
+        qn: int = VideoQualityNumber.P480.value,
+        is_hires_audio: bool = False,
+        session_data: SessionData = None
+    ) -> None:
+        video_stream_meta = await cls.get_video_stream_meta_async(
+            cid=cid,
+            bvid=bvid,
+            aid=aid,
+            epid=epid,
+            qn=qn,
+            fnval=VideoFormatNumber.get_format(qn, True),
+            session_data=session_data
+        )
+        await cls._download_dash_async(
+            video_stream_meta.result.dash,
+            video_file_path=os.path.join(location_path, title + RAW_FILE_EXT),
+            audio_file_path=os.path.join(location_path, f'{title}_audio{RAW_FILE_EXT}'),
+            qn=qn,
+            is_hires_audio=is_hires_audio
+        )
@@ -2,9 +2,13 @@
 Base of Video component
 """
 from abc import ABC, abstractmethod
-from typing import Optional, TypeVar
+import asyncio
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+import threading
+from typing import List, Optional, TypeVar
 
 from .constants import (
+    UNIT_CHUNK,
     VideoType,
     VideoQualityNumber,
     VideoFormatNumber,
@@ -15,6 +19,8 @@ from .constants import (
 )
 from .schemes import VideoMetaModel
 from ..constants import ModelType
+from ..download import SegmentedDownloader, StreamDownloader
+from ..proxy import SessionData, VideoDashData, VideoDashMediaItemData
 
 
 __all__ = [
@@ -27,18 +33,101 @@ __all__ = [
 
 class AbstractVideoComponent(ABC):
 
+    _downloader: StreamDownloader = SegmentedDownloader(chunk_size=UNIT_CHUNK)
+
+    @classmethod
+    def get_downloader(cls) -> StreamDownloader:
+        return AbstractVideoComponent._downloader
+
+    @classmethod
+    def configure_downloader(
+        cls,
+        downloader: Optional[StreamDownloader] = None,
+        **kwargs
+    ) -> StreamDownloader:
+        """
+        replace the downloader shared by all components,
+        kwargs are passed to SegmentedDownloader when no downloader is given,
+        e.g. retry_policy=RetryPolicy(attempts=8, min_throughput=256 * 1024) or segments=8,
+        StreamDownloader() downloads each stream over one connection instead
+        """
+        if downloader is None:
+            kwargs.setdefault('chunk_size', UNIT_CHUNK)
+            downloader = SegmentedDownloader(**kwargs)
+        AbstractVideoComponent._downloader = downloader
+        return downloader
+
+    @classmethod
+    @abstractmethod
+    def _get_work_id(cls, url: str) -> Optional[int]:
+        """
+        ID shared by every URL of the work, e.g. AV ID of a video or season ID of a bangumi,
+        None when only the work info tells
+        """
+        pass
+
+    @classmethod
+    @abstractmethod
+    def _get_work_id_by_info(cls, video_info: ModelType) -> int:
+        pass
+
+    @classmethod
+    @abstractmethod
+    def _get_video_info(cls, url: str, session_data: SessionData = None) -> ModelType:
+        pass
+
+    @classmethod
+    @abstractmethod
+    async def _get_video_info_async(cls, url: str, session_data: SessionData = None) -> ModelType:
+        pass
+
+    @classmethod
+    @abstractmethod
+    def _get_video_meta_by_info(
+        cls,
+        url: str,
+        video_info: ModelType,
+        session_data: SessionData = None
+    ) -> VideoMetaModel:
+        """
+        video's meta of work info already fetched
+        """
+        pass
+
+    @classmethod
+    @abstractmethod
+    async def _get_video_meta_by_info_async(
+        cls,
+        url: str,
+        video_info: ModelType,
+        session_data: SessionData = None
+    ) -> VideoMetaModel:
+        pass
+
     @classmethod
     @abstractmethod
     def get_video_meta(
         cls,
         url: str,
-        session_data: Optional[str] = None
+        session_data: SessionData = None
     ) -> VideoMetaModel:
         """
         get video's meta, including cover, link, staff, pages, etc
         """
         pass
 
+    @classmethod
+    @abstractmethod
+    async def get_video_meta_async(
+        cls,
+        url: str,
+        session_data: SessionData = None
+    ) -> VideoMetaModel:
+        """
+        asynchronous version of get_video_meta
+        """
+        pass
+
     @classmethod
     @abstractmethod
     def get_video_stream_meta(
@@ -49,13 +138,30 @@ class AbstractVideoComponent(ABC):
         epid: Optional[int] = None,
         qn: int = VideoQualityNumber.P480.value,
         fnval: int = VideoFormatNumber.DASH.value,
-        session_data: Optional[str] = None,
+        session_data: SessionData = None,
     ) -> ModelType:
         """
         get video's stream meta, including source url
         """
         pass
 
+    @classmethod
+    @abstractmethod
+    async def get_video_stream_meta_async(
+        cls,
+        cid: int,
+        bvid: Optional[str] = None,
+        aid: Optional[int] = None,
+        epid: Optional[int] = None,
+        qn: int = VideoQualityNumber.P480.value,
+        fnval: int = VideoFormatNumber.DASH.value,
+        session_data: SessionData = None,
+    ) -> ModelType:
+        """
+        asynchronous version of get_video_stream_meta
+        """
+        pass
+
     @classmethod
     @abstractmethod
     def download_data(
@@ -68,13 +174,148 @@ class AbstractVideoComponent(ABC):
         title: str = '',
         qn: int = VideoQualityNumber.P480.value,
         is_hires_audio: bool = False,
-        session_data: Optional[str] = None
+        session_data: SessionData = None
     ) -> None:
         """
         Download data from remote source
         """
         pass
 
+    @classmethod
+    @abstractmethod
+    async def download_data_async(
+        cls,
+        location_path: str,
+        cid: int,
+        bvid: Optional[str] = None,
+        aid: Optional[int] = None,
+        epid: Optional[int] = None,
+        title: str = '',
+        qn: int = VideoQualityNumber.P480.value,
+        is_hires_audio: bool = False,
+        session_data: SessionData = None
+    ) -> None:
+        """
+        asynchronous version of download_data
+        """
+        pass
+
+    @classmethod
+    def _select_video_source(cls, dash: VideoDashData, qn: int) -> VideoDashMediaItemData:
+        video_stocks = [item for item in dash.video if item.id_field <= qn]
+        if not video_stocks:
+            video_stocks = [dash.video[0]]
+        video_src, *_ = video_stocks
+        return video_src
+
+    @classmethod
+    def _select_audio_source(cls, dash: VideoDashData, is_hires_audio: bool) -> VideoDashMediaItemData:
+        if is_hires_audio:
+            return dash.flac.audio
+        dolby_audios = dash.dolby.audio
+        if dolby_audios:
+            audio_src, *_ = dolby_audios
+        else:
+            audio_src, *_ = dash.audio
+        return audio_src
+
+    @classmethod
+    def _get_source_urls(cls, src: VideoDashMediaItemData) -> List[str]:
+        return [src.base_url, *src.backup_url]
+
+    @classmethod
+    def _get_size_hint(cls, dash: VideoDashData, src: VideoDashMediaItemData) -> Optional[int]:
+        """
+        estimated bytes of a stream, bandwidth in bits per second times duration
+        """
+        if src.bandwidth <= 0 or dash.duration <= 0:
+            return None
+        return src.bandwidth * dash.duration // 8
+
+    @classmethod
+    def _download_stream(
+        cls,
+        urls: List[str],
+        file_path: str,
+        size_hint: Optional[int] = None,
+        stop: Optional[threading.Event] = None
+    ) -> None:
+        cls.get_downloader().download(urls, file_path, size_hint, stop)
+
+    @classmethod
+    async def _download_stream_async(
+        cls,
+        urls: List[str],
+        file_path: str,
+        size_hint: Optional[int] = None
+    ) -> None:
+        await cls.get_downloader().download_async(urls, file_path, size_hint)
+
+    @classmethod
+    def _download_dash(
+        cls,
+        dash: VideoDashData,
+        video_file_path: str,
+        audio_file_path: str,
+        qn: int = VideoQualityNumber.P480.value,
+        is_hires_audio: bool = False
+    ) -> None:
+        """
+        video and audio streams are downloaded at the same time, so it takes as long as the longer one.
+        When either fails, the other is stopped, both are left as .part files
+        which the next download of them resumes
+        """
+        video_src = cls._select_video_source(dash, qn)
+        audio_src = cls._select_audio_source(dash, is_hires_audio)
+        stop = threading.Event()
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix='dash') as executor:
+            futures = [
+                executor.submit(
+                    cls._download_stream,
+                    cls._get_source_urls(src),
+                    file_path,
+                    cls._get_size_hint(dash, src),
+                    stop
+                )
+                for src, file_path in ((video_src, video_file_path), (audio_src, audio_file_path))
+            ]
+            try:
+                done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+                for future in done:
+                    future.result()
+            finally:
+                # the other stream stops at its next chunk, when one failed or the caller is interrupted
+                stop.set()
+
+    @classmethod
+    async def _download_dash_async(
+        cls,
+        dash: VideoDashData,
+        video_file_path: str,
+        audio_file_path: str,
+        qn: int = VideoQualityNumber.P480.value,
+        is_hires_audio: bool = False
+    ) -> None:
+        """
+        asynchronous version of _download_dash, the other stream is cancelled when either fails
+        """
+        video_src = cls._select_video_source(dash, qn)
+        audio_src = cls._select_audio_source(dash, is_hires_audio)
+        tasks = [
+            asyncio.ensure_future(cls._download_stream_async(
+                cls._get_source_urls(src), file_path, cls._get_size_hint(dash, src)
+            ))
+            for src, file_path in ((video_src, video_file_path), (audio_src, audio_file_path))
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
     @classmethod
     def _get_bvid(cls, url: str) -> Optional[str]:
         search_result = VIDEO_URL_BV_PATTERN.search(url)
@@ -2,13 +2,14 @@
 Component on Cheese video
 """
 import os
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from .base import AbstractVideoComponent, register_component
 from .constants import (
     DEFAULT_STAFF_TITLE,
+    META_STREAM_FNVAL,
+    META_STREAM_QN,
     RAW_FILE_EXT,
-    UNIT_CHUNK,
     VideoType,
     VideoFormatNumber,
     VideoQualityNumber
@@ -20,10 +21,12 @@ from .schemes import (
     VideoPageLiteItemData
 )
 from ..proxy import (
-    GetCheeseDetailResponse,
+    AsyncProxyService,
+    GetCheeseDetailLiteResponse,
     GetCheeseStreamMetaResponse,
     PUGV_AVAILABLE_EPISODE_STATUS_CODE,
-    ProxyService
+    ProxyService,
+    SessionData
 )
 
 
@@ -31,11 +34,7 @@ from ..proxy import (
 class CheeseVideoComponent(AbstractVideoComponent):
 
     @classmethod
-    def _get_video_info(
-        cls,
-        url: str,
-        session_data: Optional[str] = None
-    ) -> GetCheeseDetailResponse:
+    def _get_video_info_params(cls, url: str) -> Dict[str, Any]:
         params = {}
         ssid = cls._get_ssid(url)
         if ssid is None:
@@ -43,20 +42,41 @@ class CheeseVideoComponent(AbstractVideoComponent):
             params.update({'epid': epid})
         else:
             params.update({'ssid': ssid})
-        res_dm = ProxyService.get_cheese_info_data(session_data=session_data, **params)
+        return params
+
+    @classmethod
+    def _get_video_info(
+        cls,
+        url: str,
+        session_data: SessionData = None
+    ) -> GetCheeseDetailLiteResponse:
+        params = cls._get_video_info_params(url)
+        res_dm = ProxyService.get_cheese_info_data(
+            session_data=session_data, model=GetCheeseDetailLiteResponse, **params
+        )
         return res_dm
 
     @classmethod
-    def get_video_stream_meta(
+    async def _get_video_info_async(
+        cls,
+        url: str,
+        session_data: SessionData = None
+    ) -> GetCheeseDetailLiteResponse:
+        params = cls._get_video_info_params(url)
+        res_dm = await AsyncProxyService.get_cheese_info_data(
+            session_data=session_data, model=GetCheeseDetailLiteResponse, **params
+        )
+        return res_dm
+
+    @classmethod
+    def _get_video_stream_meta_params(
         cls,
         cid: int,
-        bvid: Optional[str] = None,
         aid: Optional[int] = None,
         epid: Optional[int] = None,
         qn: int = VideoQualityNumber.P480.value,
-        fnval: int = VideoFormatNumber.DASH.value,
-        session_data: Optional[str] = None,
-    ) -> GetCheeseStreamMetaResponse:
+        fnval: int = VideoFormatNumber.DASH.value
+    ) -> Dict[str, Any]:
         if any([item is None for item in (aid, epid)]):
             raise
         params = {
@@ -68,9 +88,38 @@ class CheeseVideoComponent(AbstractVideoComponent):
             'qn': qn,
             'fnval': fnval
         })
+        return params
+
+    @classmethod
+    def get_video_stream_meta(
+        cls,
+        cid: int,
+        bvid: Optional[str] = None,
+        aid: Optional[int] = None,
+        epid: Optional[int] = None,
+        qn: int = VideoQualityNumber.P480.value,
+        fnval: int = VideoFormatNumber.DASH.value,
+        session_data: SessionData = None,
+    ) -> GetCheeseStreamMetaResponse:
+        params = cls._get_video_stream_meta_params(cid, aid, epid, qn, fnval)
         res_dm = ProxyService.get_cheese_stream_meta_data(session_data=session_data, **params)
         return res_dm
 
+    @classmethod
+    async def get_video_stream_meta_async(
+        cls,
+        cid: int,
+        bvid: Optional[str] = None,
+        aid: Optional[int] = None,
+        epid: Optional[int] = None,
+        qn: int = VideoQualityNumber.P480.value,
+        fnval: int = VideoFormatNumber.DASH.value,
+        session_data: SessionData = None,
+    ) -> GetCheeseStreamMetaResponse:
+        params = cls._get_video_stream_meta_params(cid, aid, epid, qn, fnval)
+        res_dm = await AsyncProxyService.get_cheese_stream_meta_data(session_data=session_data, **params)
+        return res_dm
+
     @classmethod
     def _parse_work_formats(
         cls,
@@ -89,7 +138,7 @@ class CheeseVideoComponent(AbstractVideoComponent):
     @classmethod
     def _parse_work_pages(
         cls,
-        dm: GetCheeseDetailResponse
+        dm: GetCheeseDetailLiteResponse
     ) -> List[VideoPageLiteItemData]:
         pages = dm.data.episodes
         return [
@@ -108,7 +157,7 @@ class CheeseVideoComponent(AbstractVideoComponent):
     @classmethod
     def _parse_work_staff(
         cls,
-        dm: GetCheeseDetailResponse
+        dm: GetCheeseDetailLiteResponse
     ) -> List[VideoMetaStaffItem]:
         work_staff = [dm.data.up_info]
         return [
@@ -121,18 +170,12 @@ class CheeseVideoComponent(AbstractVideoComponent):
         ]
 
     @classmethod
-    def get_video_meta(
+    def _build_video_meta(
         cls,
         url: str,
-        session_data: Optional[str] = None
+        video_info: GetCheeseDetailLiteResponse,
+        video_stream_meta: GetCheeseStreamMetaResponse
     ) -> VideoMetaModel:
-        video_info = cls._get_video_info(url, session_data)
-        sample_episode, *_ = video_info.data.episodes
-        video_stream_meta = cls.get_video_stream_meta(
-            cid=sample_episode.cid,
-            aid=sample_episode.aid,
-            epid=sample_episode.id_field
-        )
         return VideoMetaModel(
             work_cover_url=video_info.data.cover,
             work_description=video_info.data.subtitle,
@@ -144,6 +187,67 @@ class CheeseVideoComponent(AbstractVideoComponent):
             work_has_hires_audio=True if video_stream_meta.data.dash.flac is not None else False
         )
 
+    @classmethod
+    def _get_work_id(cls, url: str) -> Optional[int]:
+        return cls._get_ssid(url)
+
+    @classmethod
+    def _get_work_id_by_info(cls, video_info: GetCheeseDetailLiteResponse) -> int:
+        return video_info.data.season_id
+
+    @classmethod
+    def _get_video_meta_by_info(
+        cls,
+        url: str,
+        video_info: GetCheeseDetailLiteResponse,
+        session_data: SessionData = None
+    ) -> VideoMetaModel:
+        sample_episode, *_ = video_info.data.episodes
+        video_stream_meta = cls.get_video_stream_meta(
+            cid=sample_episode.cid,
+            aid=sample_episode.aid,
+            epid=sample_episode.id_field,
+            qn=META_STREAM_QN,
+            fnval=META_STREAM_FNVAL,
+            session_data=session_data
+        )
+        return cls._build_video_meta(url, video_info, video_stream_meta)
+
+    @classmethod
+    def get_video_meta(
+        cls,
+        url: str,
+        session_data: SessionData = None
+    ) -> VideoMetaModel:
+        return cls._get_video_meta_by_info(url, cls._get_video_info(url, session_data), session_data)
+
+    @classmethod
+    async def _get_video_meta_by_info_async(
+        cls,
+        url: str,
+        video_info: GetCheeseDetailLiteResponse,
+        session_data: SessionData = None
+    ) -> VideoMetaModel:
+        sample_episode, *_ = video_info.data.episodes
+        video_stream_meta = await cls.get_video_stream_meta_async(
+            cid=sample_episode.cid,
+            aid=sample_episode.aid,
+            epid=sample_episode.id_field,
+            qn=META_STREAM_QN,
+            fnval=META_STREAM_FNVAL,
+            session_data=session_data
+        )
+        return cls._build_video_meta(url, video_info, video_stream_meta)
+
+    @classmethod
+    async def get_video_meta_async(
+        cls,
+        url: str,
+        session_data: SessionData = None
+    ) -> VideoMetaModel:
+        video_info = await cls._get_video_info_async(url, session_data)
+        return await cls._get_video_meta_by_info_async(url, video_info, session_data)
+
     @classmethod
     def download_data(
         cls,
@@ -155,7 +259,7 @@ class CheeseVideoComponent(AbstractVideoComponent):
         title: str = '',
         qn: int = VideoQualityNumber.P480.value,
         is_hires_audio: bool = False,
-        session_data: Optional[str] = None
+        session_data: SessionData = None
     ) -> None:
         video_stream_meta = cls.get_video_stream_meta(
             cid=cid,
@@ -167,26 +271,40 @@ class CheeseVideoComponent(AbstractVideoComponent):
             session_data=session_data
         )
 
-        video_stocks = [item for item in video_stream_meta.data.dash.video if item.id_field <= qn]
-        if not video_stocks:
-            video_stocks = [video_stream_meta.data.dash.video[0]]
-        video_src, *_ = video_stocks
-        file_path = os.path.join(location_path, title + RAW_FILE_EXT)
-        with open(file_path, 'wb') as f:
-            with ProxyService.get_video_stream_response(video_src.base_url) as response:
-                for chunk in response.iter_content(chunk_size=UNIT_CHUNK):
-                    f.write(chunk)
-
-        if is_hires_audio:
-            audio_src = video_stream_meta.data.dash.flac.audio
-        else:
-            dolby_audios = video_stream_meta.data.dash.dolby.audio
-            if dolby_audios:
-                audio_src, *_ = dolby_audios
-            else:
-                audio_src, *_ = video_stream_meta.data.dash.audio
-        audio_file_path = os.path.join(location_path, f'{title}_audio{RAW_FILE_EXT}')
-        with open(audio_file_path, 'wb') as f:
-            with ProxyService.get_video_stream_response(audio_src.base_url) as response:
-                for chunk in response.iter_content(chunk_size=UNIT_CHUNK):
-                    f.write(chunk)
+        cls._download_dash(
+            video_stream_meta.data.dash,
+            video_file_path=os.path.join(location_path, title + RAW_FILE_EXT),
+            audio_file_path=os.path.join(location_path, f'{title}_audio{RAW_FILE_EXT}'),
+            qn=qn,
+            is_hires_audio=is_hires_audio
+        )
+
+    @classmethod
+    async def download_data_async(
+        cls,
+        location_path: str,
+        cid: int,
+        bvid: Optional[str] = None,
+        aid: Optional[int] = None,
+        epid: Optional[int] = None,
+        title: str = '',
+        qn: int = VideoQualityNumber.P480.value,
+        is_hires_audio: bool = False,
+        session_data: SessionData = None
+    ) -> None:
+        video_stream_meta = await cls.get_video_stream_meta_async(
+            cid=cid,
+            bvid=bvid,
+            aid=aid,
+            epid=epid,
+            qn=qn,
+            fnval=VideoFormatNumber.get_format(qn, True),
+            session_data=session_data
+        )
+        await cls._download_dash_async(
+            video_stream_meta.data.dash,
+            video_file_path=os.path.join(location_path, title + RAW_FILE_EXT),
+            audio_file_path=os.path.join(location_path, f'{title}_audio{RAW_FILE_EXT}'),
+            qn=qn,
+            is_hires_audio=is_hires_audio
+        )
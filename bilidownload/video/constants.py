@@ -83,7 +83,19 @@ class VideoFormatNumber(IntEnum):
         return result
 
 
+# stream meta requested for formats of a work, same as downloading in default quality,
+# so that one response serves both when the stream meta cache is enabled
+META_STREAM_QN = VideoQualityNumber.P480.value
+META_STREAM_FNVAL = VideoFormatNumber.get_format(META_STREAM_QN, True)
+
+
 BVID_LENGTH = 9
+# BV ID is AV ID encoded in base 58, by which a BV URL tells its AV ID without a request
+BVID_ALPHABET = 'FcwAPNKTMug3GV5Lj7EJnHpWsx4tb8haYeviqBz6rkCy12mUSDQX9RdoZf'
+BVID_XOR_CODE = 23442827791579
+BVID_MASK_CODE = (1 << 51) - 1
+BVID_SWAPPED_INDEXES = ((3, 9), (4, 7))
+BVID_PREFIX_LENGTH = 3  # of 'BV1'
 VIDEO_URL_BV_PATTERN = re.compile(fr'/video/(BV1[a-zA-Z0-9]{{{BVID_LENGTH}}})')
 VIDEO_URL_AV_PATTERN = re.compile(r'/video/av(\d+)')
 VIDEO_URL_EP_PATTERN_STRING = r'/play/ep(\d+)'
@@ -115,3 +127,8 @@ UNIT_CHUNK = 8192
 
 
 RAW_FILE_EXT = '.m4s'
+
+
+# Batch resolution of video metas
+DEFAULT_BATCH_MAX_WORKERS = 16    # threads of VideoService.get_video_meta_many
+DEFAULT_BATCH_CONCURRENCY = 64    # coroutines of VideoService.get_video_meta_many_async
@@ -2,12 +2,18 @@
 Component on common video
 """
 import os
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from .base import AbstractVideoComponent, register_component
 from .constants import (
+    BVID_ALPHABET,
+    BVID_MASK_CODE,
+    BVID_PREFIX_LENGTH,
+    BVID_SWAPPED_INDEXES,
+    BVID_XOR_CODE,
     DEFAULT_STAFF_TITLE,
-    UNIT_CHUNK,
+    META_STREAM_FNVAL,
+    META_STREAM_QN,
     RAW_FILE_EXT,
     VideoType,
     VideoQualityNumber,
@@ -20,9 +26,11 @@ from .schemes import (
     VideoPageLiteItemData
 )
 from ..proxy import (
-    GetVideoInfoResponse,
+    AsyncProxyService,
+    GetVideoInfoLiteResponse,
     GetVideoStreamMetaResponse,
-    ProxyService
+    ProxyService,
+    SessionData
 )
 
 
@@ -30,11 +38,7 @@ from ..proxy import (
 class CommonVideoComponent(AbstractVideoComponent):
 
     @classmethod
-    def _get_video_info(
-        cls,
-        url: str,
-        session_data: Optional[str] = None
-    ) -> GetVideoInfoResponse:
+    def _get_video_info_params(cls, url: str) -> Dict[str, Any]:
         params = {}
         aid = cls._get_aid(url)
         if aid is None:
@@ -42,20 +46,41 @@ class CommonVideoComponent(AbstractVideoComponent):
             params.update({'bvid': bvid})
         else:
             params.update({'aid': aid})
-        res_dm = ProxyService.get_video_info_data(session_data=session_data, **params)
+        return params
+
+    @classmethod
+    def _get_video_info(
+        cls,
+        url: str,
+        session_data: SessionData = None
+    ) -> GetVideoInfoLiteResponse:
+        params = cls._get_video_info_params(url)
+        res_dm = ProxyService.get_video_info_data(
+            session_data=session_data, model=GetVideoInfoLiteResponse, **params
+        )
         return res_dm
 
     @classmethod
-    def get_video_stream_meta(
+    async def _get_video_info_async(
+        cls,
+        url: str,
+        session_data: SessionData = None
+    ) -> GetVideoInfoLiteResponse:
+        params = cls._get_video_info_params(url)
+        res_dm = await AsyncProxyService.get_video_info_data(
+            session_data=session_data, model=GetVideoInfoLiteResponse, **params
+        )
+        return res_dm
+
+    @classmethod
+    def _get_video_stream_meta_params(
         cls,
         cid: int,
         bvid: Optional[str] = None,
         aid: Optional[int] = None,
-        epid: Optional[int] = None,
         qn: int = VideoQualityNumber.P480.value,
-        fnval: int = VideoFormatNumber.DASH.value,
-        session_data: Optional[str] = None,
-    ) -> GetVideoStreamMetaResponse:
+        fnval: int = VideoFormatNumber.DASH.value
+    ) -> Dict[str, Any]:
         params = {}
         if aid is None:
             params.update({'bvid': bvid})
@@ -67,10 +92,38 @@ class CommonVideoComponent(AbstractVideoComponent):
             'qn': qn,
             'fnval': fnval
         })
+        return params
 
+    @classmethod
+    def get_video_stream_meta(
+        cls,
+        cid: int,
+        bvid: Optional[str] = None,
+        aid: Optional[int] = None,
+        epid: Optional[int] = None,
+        qn: int = VideoQualityNumber.P480.value,
+        fnval: int = VideoFormatNumber.DASH.value,
+        session_data: SessionData = None,
+    ) -> GetVideoStreamMetaResponse:
+        params = cls._get_video_stream_meta_params(cid, bvid, aid, qn, fnval)
         res_dm = ProxyService.get_video_stream_meta_data(session_data=session_data, **params)
         return res_dm
 
+    @classmethod
+    async def get_video_stream_meta_async(
+        cls,
+        cid: int,
+        bvid: Optional[str] = None,
+        aid: Optional[int] = None,
+        epid: Optional[int] = None,
+        qn: int = VideoQualityNumber.P480.value,
+        fnval: int = VideoFormatNumber.DASH.value,
+        session_data: SessionData = None,
+    ) -> GetVideoStreamMetaResponse:
+        params = cls._get_video_stream_meta_params(cid, bvid, aid, qn, fnval)
+        res_dm = await AsyncProxyService.get_video_stream_meta_data(session_data=session_data, **params)
+        return res_dm
+
     @classmethod
     def _parse_work_formats(
         cls,
@@ -89,7 +142,7 @@ class CommonVideoComponent(AbstractVideoComponent):
     @classmethod
     def _parse_work_pages(
         cls,
-        dm: GetVideoInfoResponse
+        dm: GetVideoInfoLiteResponse
     ) -> List[VideoPageLiteItemData]:
         pages = dm.data.pages
         return [
@@ -106,7 +159,7 @@ class CommonVideoComponent(AbstractVideoComponent):
         ]
 
     @classmethod
-    def _parse_work_staff(cls, dm: GetVideoInfoResponse) -> List[VideoMetaStaffItem]:
+    def _parse_work_staff(cls, dm: GetVideoInfoLiteResponse) -> List[VideoMetaStaffItem]:
         work_staff = dm.data.staff
         if work_staff is None:
             work_staff = [dm.data.owner]
@@ -120,14 +173,12 @@ class CommonVideoComponent(AbstractVideoComponent):
         ]
 
     @classmethod
-    def get_video_meta(cls, url: str, session_data: Optional[str] = None) -> VideoMetaModel:
-        video_info = cls._get_video_info(url, session_data)
-        video_stream_meta = cls.get_video_stream_meta(
-            cid=video_info.data.cid,
-            bvid=video_info.data.bvid,
-            aid=video_info.data.aid,
-            session_data=session_data
-        )
+    def _build_video_meta(
+        cls,
+        url: str,
+        video_info: GetVideoInfoLiteResponse,
+        video_stream_meta: GetVideoStreamMetaResponse
+    ) -> VideoMetaModel:
         return VideoMetaModel(
             work_cover_url=video_info.data.pic,
             work_description=video_info.data.desc,
@@ -139,6 +190,74 @@ class CommonVideoComponent(AbstractVideoComponent):
             work_has_hires_audio=True if video_stream_meta.data.dash.flac is not None else False
         )
 
+    @classmethod
+    def _get_aid_by_bvid(cls, bvid: str) -> Optional[int]:
+        chars = list(bvid)
+        for index, other_index in BVID_SWAPPED_INDEXES:
+            chars[index], chars[other_index] = chars[other_index], chars[index]
+        value = 0
+        for char in chars[BVID_PREFIX_LENGTH:]:
+            digit = BVID_ALPHABET.find(char)
+            if digit < 0:
+                return None
+            value = value * len(BVID_ALPHABET) + digit
+        return (value & BVID_MASK_CODE) ^ BVID_XOR_CODE
+
+    @classmethod
+    def _get_work_id(cls, url: str) -> Optional[int]:
+        aid = cls._get_aid(url)
+        if aid is not None:
+            return aid
+        bvid = cls._get_bvid(url)
+        return cls._get_aid_by_bvid(bvid) if bvid is not None else None
+
+    @classmethod
+    def _get_work_id_by_info(cls, video_info: GetVideoInfoLiteResponse) -> int:
+        return video_info.data.aid
+
+    @classmethod
+    def _get_video_meta_by_info(
+        cls,
+        url: str,
+        video_info: GetVideoInfoLiteResponse,
+        session_data: SessionData = None
+    ) -> VideoMetaModel:
+        video_stream_meta = cls.get_video_stream_meta(
+            cid=video_info.data.cid,
+            bvid=video_info.data.bvid,
+            aid=video_info.data.aid,
+            qn=META_STREAM_QN,
+            fnval=META_STREAM_FNVAL,
+            session_data=session_data
+        )
+        return cls._build_video_meta(url, video_info, video_stream_meta)
+
+    @classmethod
+    def get_video_meta(cls, url: str, session_data: SessionData = None) -> VideoMetaModel:
+        return cls._get_video_meta_by_info(url, cls._get_video_info(url, session_data), session_data)
+
+    @classmethod
+    async def _get_video_meta_by_info_async(
+        cls,
+        url: str,
+        video_info: GetVideoInfoLiteResponse,
+        session_data: SessionData = None
+    ) -> VideoMetaModel:
+        video_stream_meta = await cls.get_video_stream_meta_async(
+            cid=video_info.data.cid,
+            bvid=video_info.data.bvid,
+            aid=video_info.data.aid,
+            qn=META_STREAM_QN,
+            fnval=META_STREAM_FNVAL,
+            session_data=session_data
+        )
+        return cls._build_video_meta(url, video_info, video_stream_meta)
+
+    @classmethod
+    async def get_video_meta_async(cls, url: str, session_data: SessionData = None) -> VideoMetaModel:
+        video_info = await cls._get_video_info_async(url, session_data)
+        return await cls._get_video_meta_by_info_async(url, video_info, session_data)
+
     @classmethod
     def download_data(
         cls,
@@ -150,7 +269,7 @@ class CommonVideoComponent(AbstractVideoComponent):
         title: str = '',
         qn: int = VideoQualityNumber.P480.value,
         is_hires_audio: bool = False,
-        session_data: Optional[str] = None
+        session_data: SessionData = None
     ) -> None:
         video_stream_meta = cls.get_video_stream_meta(
             cid=cid,
@@ -162,26 +281,40 @@ class CommonVideoComponent(AbstractVideoComponent):
             session_data=session_data
         )
 
-        video_stocks = [item for item in video_stream_meta.data.dash.video if item.id_field <= qn]
-        if not video_stocks:
-            video_stocks = [video_stream_meta.data.dash.video[0]]
-        video_src, *_ = video_stocks
-        video_file_path = os.path.join(location_path, f'{title}_video{RAW_FILE_EXT}')
-        with open(video_file_path, 'wb') as f:
-            with ProxyService.get_video_stream_response(video_src.base_url) as response:
-                for chunk in response.iter_content(chunk_size=UNIT_CHUNK):
-                    f.write(chunk)
-
-        if is_hires_audio:
-            audio_src = video_stream_meta.data.dash.flac.audio
-        else:
-            dolby_audios = video_stream_meta.data.dash.dolby.audio
-            if dolby_audios:
-                audio_src, *_ = dolby_audios
-            else:
-                audio_src, *_ = video_stream_meta.data.dash.audio
-        audio_file_path = os.path.join(location_path, f'{title}_audio{RAW_FILE_EXT}')
-        with open(audio_file_path, 'wb') as f:
-            with ProxyService.get_video_stream_response(audio_src.base_url) as response:
-                for chunk in response.iter_content(chunk_size=UNIT_CHUNK):
-                    f.write(chunk)
+        cls._download_dash(
+            video_stream_meta.data.dash,
+            video_file_path=os.path.join(location_path, f'{title}_video{RAW_FILE_EXT}'),
+            audio_file_path=os.path.join(location_path, f'{title}_audio{RAW_FILE_EXT}'),
+            qn=qn,
+            is_hires_audio=is_hires_audio
+        )
+
+    @classmethod
+    async def download_data_async(
+        cls,
+        location_path: str,
+        cid: int,
+        bvid: Optional[str] = None,
+        aid: Optional[int] = None,
+        epid: Optional[int] = None,
+        title: str = '',
+        qn: int = VideoQualityNumber.P480.value,
+        is_hires_audio: bool = False,
+        session_data: SessionData = None
+    ) -> None:
+        video_stream_meta = await cls.get_video_stream_meta_async(
+            cid=cid,
+            bvid=bvid,
+            aid=aid,
+            epid=epid,
+            qn=qn,
+            fnval=VideoFormatNumber.get_format(qn, True),
+            session_data=session_data
+        )
+        await cls._download_dash_async(
+            video_stream_meta.data.dash,
+            video_file_path=os.path.join(location_path, f'{title}_video{RAW_FILE_EXT}'),
+            audio_file_path=os.path.join(location_path, f'{title}_audio{RAW_FILE_EXT}'),
+            qn=qn,
+            is_hires_audio=is_hires_audio
+        )
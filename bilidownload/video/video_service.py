@@ -1,11 +1,113 @@
 """
 Components on Bilibili videos
 """
-from typing import Optional, Type
+import asyncio
+from concurrent.futures import as_completed, ThreadPoolExecutor
+from itertools import chain, zip_longest
+import threading
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Type
+)
 
-from .base import REGISTERED_TYPE_VIDEO_COMPONENT, VideoComponentType
-from .constants import VIDEO_TYPE_MAPPING, VideoQualityNumber
+from .base import AbstractVideoComponent, REGISTERED_TYPE_VIDEO_COMPONENT, VideoComponentType
+from .constants import (
+    DEFAULT_BATCH_CONCURRENCY,
+    DEFAULT_BATCH_MAX_WORKERS,
+    VIDEO_TYPE_MAPPING,
+    VideoQualityNumber,
+    VideoType
+)
 from .schemes import VideoMetaModel
+from ..download import StreamDownloader
+from ..proxy import SessionData
+
+
+__all__ = ['VideoMetaResult', 'VideoService']
+
+
+class VideoMetaResult(NamedTuple):
+
+    url: str
+    meta: Optional[VideoMetaModel] = None
+    error: Optional[BaseException] = None
+
+
+class _Work(NamedTuple):
+
+    video_type: VideoType
+    component_kls: Type[AbstractVideoComponent]
+    work_id: Optional[int]  # None when only the work info tells
+    urls: List[str]
+
+    @property
+    def key(self) -> Optional[Tuple[VideoType, int]]:
+        return (self.video_type, self.work_id) if self.work_id is not None else None
+
+
+class _WorkClaims:
+    """
+    works of a batch by key, so a work whose key is learned from its info,
+    e.g. a bangumi episode URL, is resolved once along with other URLs of the same season
+    """
+
+    def __init__(self):
+        self._keys: Set[Hashable] = set()
+        self._lock = threading.Lock()
+        self._results: Dict[Hashable, Tuple[Optional[VideoMetaModel], Optional[BaseException]]] = {}
+        self._waiting: Dict[Hashable, List[str]] = {}
+
+    def claim(self, key: Hashable) -> bool:
+        """
+        whether the caller resolves the work of key, False when another one does
+        """
+        with self._lock:
+            if key in self._keys:
+                return False
+            self._keys.add(key)
+            return True
+
+    def wait(self, key: Hashable, urls: List[str]) -> List[str]:
+        """
+        URLs to take the result of key when it comes, all of them when it came already
+        """
+        if key in self._results:
+            return urls
+        self._waiting.setdefault(key, []).extend(urls)
+        return []
+
+    def finish(
+        self,
+        key: Hashable,
+        meta: Optional[VideoMetaModel],
+        error: Optional[BaseException]
+    ) -> List[str]:
+        """
+        URLs waiting for the result of key
+        """
+        self._results[key] = (meta, error)
+        return self._waiting.pop(key, [])
+
+    def get_result(self, key: Hashable) -> Tuple[Optional[VideoMetaModel], Optional[BaseException]]:
+        return self._results[key]
+
+
+class _WorkResult(NamedTuple):
+
+    key: Optional[Hashable]
+    meta: Optional[VideoMetaModel] = None
+    error: Optional[BaseException] = None
+    is_merged: bool = False  # the work is resolved by another one of the same key
 
 
 class VideoService:
@@ -27,16 +129,172 @@ class VideoService:
             raise
         return REGISTERED_TYPE_VIDEO_COMPONENT[video_type_name]
 
+    @classmethod
+    def _group_urls(
+        cls,
+        urls: Iterable[str]
+    ) -> Tuple[List[_Work], List[VideoMetaResult]]:
+        """
+        URLs grouped by work, e.g. pages of one video, or its BV and AV URLs, are one work,
+        works of different video types are interleaved to spread load on their APIs,
+        and failed results of unsupported URLs.
+        URLs whose work ID only the work info tells, e.g. bangumi episode ones,
+        are grouped by their parameters, and merged with their work once resolved
+        """
+        type_works: Dict[VideoType, Dict[Any, _Work]] = {}
+        unsupported = []
+        for url in urls:
+            video_type = cls._get_video_type(url)
+            if video_type is None:
+                unsupported.append(VideoMetaResult(url, error=ValueError(f'unsupported video URL: {url}')))
+                continue
+            component_kls = cls._get_video_component(video_type.name.lower())
+            work_id = component_kls._get_work_id(url)
+            if work_id is not None:
+                group_key: Any = work_id
+            else:
+                params = component_kls._get_video_info_params(url)
+                group_key = '&'.join(f'{key}={params[key]}' for key in sorted(params))
+            works = type_works.setdefault(video_type, {})
+            if group_key not in works:
+                works[group_key] = _Work(video_type, component_kls, work_id, [])
+            works[group_key].urls.append(url)
+        works = [
+            work
+            for work in chain.from_iterable(
+                zip_longest(*[list(works.values()) for works in type_works.values()])
+            )
+            if work is not None
+        ]
+        return works, unsupported
+
+    @classmethod
+    def _resolve_work(
+        cls,
+        work: _Work,
+        claims: _WorkClaims,
+        session_data: SessionData = None
+    ) -> _WorkResult:
+        key, url = work.key, work.urls[0]
+        try:
+            video_info = None
+            if key is None:
+                video_info = work.component_kls._get_video_info(url, session_data)
+                key = (work.video_type, work.component_kls._get_work_id_by_info(video_info))
+            if not claims.claim(key):
+                return _WorkResult(key, is_merged=True)
+            if video_info is None:
+                video_info = work.component_kls._get_video_info(url, session_data)
+            return _WorkResult(key, work.component_kls._get_video_meta_by_info(url, video_info, session_data))
+        except Exception as e:
+            return _WorkResult(key, error=e)
+
+    @classmethod
+    async def _resolve_work_async(
+        cls,
+        work: _Work,
+        claims: _WorkClaims,
+        session_data: SessionData = None
+    ) -> _WorkResult:
+        key, url = work.key, work.urls[0]
+        try:
+            video_info = None
+            if key is None:
+                video_info = await work.component_kls._get_video_info_async(url, session_data)
+                key = (work.video_type, work.component_kls._get_work_id_by_info(video_info))
+            if not claims.claim(key):
+                return _WorkResult(key, is_merged=True)
+            if video_info is None:
+                video_info = await work.component_kls._get_video_info_async(url, session_data)
+            meta = await work.component_kls._get_video_meta_by_info_async(url, video_info, session_data)
+            return _WorkResult(key, meta)
+        except Exception as e:
+            return _WorkResult(key, error=e)
+
+    @classmethod
+    def _build_work_results(
+        cls,
+        work: _Work,
+        result: _WorkResult,
+        claims: _WorkClaims
+    ) -> Iterator[VideoMetaResult]:
+        """
+        results of the URLs of work, along with the ones of works merged into it
+        """
+        if result.is_merged:
+            urls = claims.wait(result.key, work.urls)
+            if urls:
+                yield from cls._build_results(urls, *claims.get_result(result.key))
+            return
+        yield from cls._build_results(work.urls, result.meta, result.error)
+        if result.key is not None:
+            waiting_urls = claims.finish(result.key, result.meta, result.error)
+            yield from cls._build_results(waiting_urls, result.meta, result.error)
+
+    @classmethod
+    def _build_results(
+        cls,
+        work_urls: List[str],
+        meta: Optional[VideoMetaModel] = None,
+        error: Optional[BaseException] = None
+    ) -> Iterator[VideoMetaResult]:
+        for url in work_urls:
+            if meta is not None and meta.work_url != url:
+                yield VideoMetaResult(url, meta=meta.model_copy(update={'work_url': url}))
+            else:
+                yield VideoMetaResult(url, meta=meta, error=error)
+
     @classmethod
     def get_video_meta(
         cls,
         url: str,
-        session_data: Optional[str] = None
+        session_data: SessionData = None
     ) -> VideoMetaModel:
         video_type = cls._get_video_type(url)
         component_kls = cls._get_video_component(video_type.name.lower())
         return component_kls.get_video_meta(url, session_data)
 
+    @classmethod
+    def get_video_meta_many(
+        cls,
+        urls: Iterable[str],
+        session_data: SessionData = None,
+        max_workers: int = DEFAULT_BATCH_MAX_WORKERS
+    ) -> Iterator[VideoMetaResult]:
+        """
+        resolve metas of many URLs by at most max_workers threads,
+        each work is resolved once however many of its URLs are given,
+        results are yielded as they finish, one per URL carrying its own error
+        """
+        works, unsupported = cls._group_urls(urls)
+        yield from unsupported
+        if not works:
+            return
+
+        claims = _WorkClaims()
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {
+                executor.submit(cls._resolve_work, work, claims, session_data): work
+                for work in works
+            }
+            for future in as_completed(futures):
+                yield from cls._build_work_results(futures[future], future.result(), claims)
+        finally:
+            # stop resolving the rest when the caller stops iterating
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @classmethod
+    def configure_downloader(
+        cls,
+        downloader: Optional[StreamDownloader] = None,
+        **kwargs
+    ) -> StreamDownloader:
+        """
+        replace the downloader of media streams, e.g. to change its retry policy
+        """
+        return AbstractVideoComponent.configure_downloader(downloader, **kwargs)
+
     @classmethod
     def download_data(
         cls,
@@ -49,7 +307,7 @@ class VideoService:
         qn: int = VideoQualityNumber.P480.value,
         is_hires_audio: bool = False,
         title: str = '',
-        session_data: Optional[str] = None
+        session_data: SessionData = None
     ) -> None:
         component_kls = cls._get_video_component(video_type_name)
         component_kls.download_data(
@@ -63,3 +321,74 @@ class VideoService:
             is_hires_audio=is_hires_audio,
             session_data=session_data
         )
+
+    @classmethod
+    async def get_video_meta_async(
+        cls,
+        url: str,
+        session_data: SessionData = None
+    ) -> VideoMetaModel:
+        video_type = cls._get_video_type(url)
+        component_kls = cls._get_video_component(video_type.name.lower())
+        return await component_kls.get_video_meta_async(url, session_data)
+
+    @classmethod
+    async def get_video_meta_many_async(
+        cls,
+        urls: Iterable[str],
+        session_data: SessionData = None,
+        concurrency: int = DEFAULT_BATCH_CONCURRENCY
+    ) -> AsyncIterator[VideoMetaResult]:
+        """
+        asynchronous version of get_video_meta_many,
+        with at most concurrency works resolved at a time
+        """
+        works, unsupported = cls._group_urls(urls)
+        for result in unsupported:
+            yield result
+        if not works:
+            return
+
+        semaphore = asyncio.Semaphore(concurrency)
+        claims = _WorkClaims()
+
+        async def resolve(work: _Work) -> Tuple[_Work, _WorkResult]:
+            async with semaphore:
+                return work, await cls._resolve_work_async(work, claims, session_data)
+
+        tasks = [asyncio.ensure_future(resolve(work)) for work in works]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                work, work_result = await next_done
+                for result in cls._build_work_results(work, work_result, claims):
+                    yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @classmethod
+    async def download_data_async(
+        cls,
+        location_path: str,
+        video_type_name: str,
+        cid: int,
+        bvid: Optional[str] = None,
+        aid: Optional[int] = None,
+        epid: Optional[int] = None,
+        qn: int = VideoQualityNumber.P480.value,
+        is_hires_audio: bool = False,
+        title: str = '',
+        session_data: SessionData = None
+    ) -> None:
+        component_kls = cls._get_video_component(video_type_name)
+        await component_kls.download_data_async(
+            location_path=location_path,
+            cid=cid,
+            bvid=bvid,
+            aid=aid,
+            epid=epid,
+            title=title,
+            qn=qn,
+            is_hires_audio=is_hires_audio,
+            session_data=session_data
+        )